@@ -0,0 +1,237 @@
+"""Bulk draft generation from bullet-point files.
+
+Usage:
+    python batch_generate.py test_emails.txt --output drafts.jsonl
+    python batch_generate.py cases.jsonl --output drafts.jsonl --mode creative_variations --workers 4
+
+Inputs are streamed one case at a time, results are appended to the output
+JSONL as each case finishes, and a small checkpoint file records progress so
+a crashed run picks up where it stopped when started again with the same
+arguments. Cases that failed are retried by that next run; their successful
+result is appended after the earlier error record.
+"""
+import argparse
+import bisect
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Tuple
+
+from email_agent import AgenticEmailAgent, DEFAULT_MAX_CONCURRENCY
+from generation_plan import MODE_PLANS, run_mode
+from similarity_index import AnalysisIndex, DEFAULT_MAX_ENTRIES
+
+JSONL_TEXT_FIELDS = ("bullet_points", "bullets", "text", "body")
+JSONL_ID_FIELDS = ("id", "request_id", "case_id")
+
+
+def read_text_cases(path: str) -> Iterator[Tuple[str, str]]:
+    """Yield (case_id, bullet_points) from a test_emails.txt style file.
+
+    Cases are separated by blank lines or `#` comment lines; the most
+    recent comment becomes the case id.
+    """
+    header, lines, count = None, [], 0
+    with open(path, encoding="utf-8") as f:
+        for raw in f:
+            line = raw.strip()
+            if line and not line.startswith("#"):
+                lines.append(line)
+                continue
+            if lines:
+                count += 1
+                yield header or f"case-{count}", "\n".join(lines)
+                header, lines = None, []
+            if line.startswith("#"):
+                header = line.lstrip("#").strip() or header
+    if lines:
+        count += 1
+        yield header or f"case-{count}", "\n".join(lines)
+
+
+def read_jsonl_cases(path: str) -> Iterator[Tuple[str, str]]:
+    """Yield (case_id, bullet_points) from a JSONL file, one object per line"""
+    with open(path, encoding="utf-8") as f:
+        for line_number, raw in enumerate(f, 1):
+            if not raw.strip():
+                continue
+            record = json.loads(raw)
+            text = next((record[field] for field in JSONL_TEXT_FIELDS if record.get(field)), None)
+            if text is None:
+                raise ValueError(f"{path}:{line_number} has none of the fields {', '.join(JSONL_TEXT_FIELDS)}")
+            case_id = next((record[field] for field in JSONL_ID_FIELDS if record.get(field)), f"line-{line_number}")
+            yield str(case_id), text
+
+
+def read_cases(path: str) -> Iterator[Tuple[str, str]]:
+    """Pick the reader from the file extension"""
+    if path.endswith((".jsonl", ".json", ".ndjson")):
+        return read_jsonl_cases(path)
+    return read_text_cases(path)
+
+
+class IndexRanges:
+    """Set of case indices kept as sorted, merged [start, end) ranges, so runs of indices stay small"""
+
+    def __init__(self, ranges: Iterable = ()):
+        self.ranges = []
+        # A bare index is a range of one
+        for start, end in sorted(list(item) if isinstance(item, list) else [item, item + 1] for item in ranges):
+            if self.ranges and start <= self.ranges[-1][1]:
+                self.ranges[-1][1] = max(self.ranges[-1][1], end)
+            else:
+                self.ranges.append([start, end])
+
+    def __contains__(self, index: int) -> bool:
+        position = self._position(index)
+        return position >= 0 and index < self.ranges[position][1]
+
+    def __len__(self) -> int:
+        return sum(end - start for start, end in self.ranges)
+
+    def add(self, index: int):
+        if index in self:
+            return
+        position = self._position(index) + 1
+        before = self.ranges[position - 1] if position else None
+        after = self.ranges[position] if position < len(self.ranges) else None
+        if before and before[1] == index:
+            before[1] = index + 1
+            if after and after[0] == index + 1:
+                before[1] = after[1]
+                del self.ranges[position]
+        elif after and after[0] == index + 1:
+            after[0] = index
+        else:
+            self.ranges.insert(position, [index, index + 1])
+
+    def discard(self, index: int):
+        position = self._position(index)
+        if position < 0 or index >= self.ranges[position][1]:
+            return
+        start, end = self.ranges[position]
+        self.ranges[position:position + 1] = [[a, b] for a, b in ((start, index), (index + 1, end)) if a < b]
+
+    def _position(self, index: int) -> int:
+        """Position of the last range starting at or before `index`, or -1"""
+        return bisect.bisect_right(self.ranges, [index, float("inf")]) - 1
+
+
+class Checkpoint:
+    """Resumable progress marker whose size is bounded by the in-flight window.
+
+    Every case index below `low_water` is finished; `done_above` holds the
+    finished indices past it, which can never exceed the number of cases
+    in flight at once. A failed case counts as finished for the marker but
+    is kept in `failed` until a later run retries it successfully; runs of
+    failures are stored as ranges, so a mostly failing batch stays small.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.low_water = 0
+        self.done_above = set()
+        self.failed = IndexRanges()
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            self.low_water = state["low_water"]
+            self.done_above = set(state["done_above"])
+            self.failed = IndexRanges(state.get("failed", []))
+
+    def is_done(self, index: int) -> bool:
+        return (index < self.low_water or index in self.done_above) and index not in self.failed
+
+    def mark_done(self, index: int, failed: bool = False):
+        """Record a finished case and atomically rewrite the checkpoint file"""
+        with self._lock:
+            if failed:
+                self.failed.add(index)
+            else:
+                self.failed.discard(index)
+            if index >= self.low_water:
+                self.done_above.add(index)
+            while self.low_water in self.done_above:
+                self.done_above.remove(self.low_water)
+                self.low_water += 1
+
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"low_water": self.low_water, "done_above": sorted(self.done_above), "failed": self.failed.ranges}, f
+                )
+            os.replace(tmp_path, self.path)
+
+
+def run_batch(
+    agent,
+    input_path: str,
+    output_path: str,
+    mode: str = "full_autonomy",
+    workers: int = DEFAULT_MAX_CONCURRENCY,
+    checkpoint_path: str = None
+) -> Dict:
+    """Generate a draft for every case in `input_path`, appending results to `output_path`"""
+    checkpoint = Checkpoint(checkpoint_path or f"{output_path}.checkpoint")
+    write_lock = threading.Lock()
+    # Bounds how many cases are read ahead of the workers, keeping memory flat
+    window = threading.BoundedSemaphore(workers * 2)
+    stats = {"processed": 0, "failed": 0, "skipped": 0}
+
+    def process(index: int, case_id: str, bullet_points: str, output):
+        try:
+            try:
+                record = {"index": index, "id": case_id, "mode": mode, "result": run_mode(agent, mode, bullet_points)}
+            except Exception as e:
+                record = {"index": index, "id": case_id, "mode": mode, "error": str(e)}
+
+            with write_lock:
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+                stats["failed" if "error" in record else "processed"] += 1
+            checkpoint.mark_done(index, failed="error" in record)
+        finally:
+            window.release()
+
+    with open(output_path, "a", encoding="utf-8") as output, ThreadPoolExecutor(max_workers=workers) as pool:
+        for index, (case_id, bullet_points) in enumerate(read_cases(input_path)):
+            if checkpoint.is_done(index):
+                stats["skipped"] += 1
+                continue
+            window.acquire()
+            pool.submit(process, index, case_id, bullet_points, output)
+
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate email drafts in bulk from bullet-point files")
+    parser.add_argument("input", help="test_emails.txt style text file or JSONL file")
+    parser.add_argument("--output", required=True, help="JSONL file results are appended to")
+    parser.add_argument("--mode", default="full_autonomy", choices=sorted(MODE_PLANS))
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_CONCURRENCY, help="cases processed concurrently")
+    parser.add_argument("--checkpoint", help="progress file (default: <output>.checkpoint)")
+    parser.add_argument("--metrics-file", help="write Prometheus-text inference metrics here when done")
+    parser.add_argument(
+        "--analysis-index-entries", type=int, default=DEFAULT_MAX_ENTRIES,
+        help="near-duplicate analyses remembered for reuse, about 2 KB each; 0 turns reuse off"
+    )
+    args = parser.parse_args(argv)
+
+    index = AnalysisIndex(max_entries=args.analysis_index_entries) if args.analysis_index_entries > 0 else None
+    agent = AgenticEmailAgent(
+        max_concurrency=args.workers, analysis_index=index, reuse_analysis=args.analysis_index_entries > 0
+    )
+    stats = run_batch(agent, args.input, args.output, args.mode, args.workers, args.checkpoint)
+    if args.metrics_file:
+        agent.metrics.write_prometheus(args.metrics_file)
+    print(f" Batch finished: {stats['processed']} generated, {stats['failed']} failed, {stats['skipped']} already done")
+    return 0 if not stats["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
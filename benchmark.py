@@ -0,0 +1,467 @@
+"""Micro-benchmarks for the agent against a local fake Ollama server.
+
+Times every public AgenticEmailAgent method and every Streamlit mode
+pipeline, reporting model calls, end-to-end latency, client-side overhead
+(wall time not spent inside the server) and response parsing time.
+check: cases assert behaviour instead, and any failure fails the run.
+
+Usage:
+    python benchmark.py --output bench_results.json
+    python benchmark.py --baseline bench_baseline.json --threshold 0.25
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from deadlines import DeadlineExceeded
+from email_agent import AgenticEmailAgent, AsyncAgenticEmailAgent
+from examples import EXAMPLES
+from fake_ollama import CANNED_RESPONSES, FAKE_DIGEST, FakeOllamaServer, count_tokens
+from generation_plan import MODE_PLANS, run_mode
+from prefetcher import Prefetcher
+from response_cache import ResponseCache
+from response_parser import StreamingEmailParser
+from scheduler import BACKGROUND_SLOTS
+from similarity_index import AnalysisIndex
+
+BENCH_BULLETS = (
+    "meeting with sarah next friday\n"
+    "discuss q4 budget planning\n"
+    "need her input on new proposals\n"
+    "bring financial reports"
+)
+BENCH_CONTEXT = {
+    "purpose": "meeting_request",
+    "tone": "formal",
+    "relationship": "boss",
+    "urgency": "high",
+    "reasoning": "benchmark context"
+}
+# Absolute floors, in each metric's own unit, so timer noise never fails a run
+MIN_REGRESSION = {"e2e_ms": 0.5, "overhead_ms": 0.5, "parse_us": 0.5, "lookup_us": 20.0, "bytes_per_entry": 100}
+PARSE_ITERATIONS = 2000
+PARSE_TRIALS = 5
+# The analysis index must answer in under a millisecond at this size
+INDEX_ENTRIES = 100000
+INDEX_TARGET_US = 1000.0
+INDEX_TARGET_BYTES = 2048
+INDEX_LOOKUPS = 2000
+
+
+def busy_seconds(intervals: List[Tuple[float, float]]) -> float:
+    """Length of the union of (start, end) intervals, i.e. time the server was working"""
+    total, current_start, current_end = 0.0, None, None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def method_cases(agent) -> Dict[str, Callable]:
+    """Every public agent method with representative arguments"""
+    email = run_mode(agent, "full_autonomy", BENCH_BULLETS)["data"]["full_email"]
+    return {
+        "analyze_context_agentically": lambda: agent.analyze_context_agentically(BENCH_BULLETS),
+        "simple_analysis_prompt": lambda: agent.simple_analysis_prompt(BENCH_BULLETS),
+        "generate_email_agentically": lambda: agent.generate_email_agentically(BENCH_BULLETS),
+        "generate_email_agentically_with_context": lambda: agent.generate_email_agentically(BENCH_BULLETS, BENCH_CONTEXT),
+        "stream_email_agentically": lambda: list(agent.stream_email_agentically(BENCH_BULLETS, BENCH_CONTEXT)),
+        "generate_smart_subject": lambda: agent.generate_smart_subject(BENCH_BULLETS, BENCH_CONTEXT),
+        "improve_email_agentically": lambda: agent.improve_email_agentically(email),
+        "generate_tone_variations_agentically": lambda: agent.generate_tone_variations_agentically(BENCH_BULLETS),
+        "stream_tone_variations_agentically": lambda: list(agent.stream_tone_variations_agentically(BENCH_BULLETS)),
+        "fallback_variations": lambda: agent.fallback_variations(BENCH_BULLETS),
+        "generate_email_package": lambda: agent.generate_email_package(BENCH_BULLETS),
+        "generate_email_structured": lambda: agent.generate_email_structured(BENCH_BULLETS),
+        "autonomous_email_strategy": lambda: agent.autonomous_email_strategy(BENCH_BULLETS),
+    }
+
+
+def mode_cases(agent) -> Dict[str, Callable]:
+    """Every Streamlit generation mode pipeline"""
+    return {
+        f"mode:{mode}": (lambda mode=mode: run_mode(agent, mode, BENCH_BULLETS))
+        for mode in MODE_PLANS
+    }
+
+
+def time_case(run: Callable, server: FakeOllamaServer, repeat: int) -> Dict:
+    """Run one case `repeat` times and summarise latency, overhead, call and prompt-token counts"""
+    e2e, overhead, calls, prompt_tokens = [], [], [], []
+    for _ in range(repeat):
+        server.reset()
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+
+        generate_calls = server.generate_calls()
+        server_busy = busy_seconds([(call["start"], call["end"]) for call in generate_calls])
+        e2e.append(elapsed * 1000)
+        overhead.append(max(0.0, elapsed - server_busy) * 1000)
+        calls.append(len(generate_calls))
+        prompt_tokens.append(sum(count_tokens(call["body"].get("prompt", "")) for call in generate_calls))
+
+    return {
+        "calls": max(calls),
+        "prompt_tokens": max(prompt_tokens),
+        "e2e_ms": round(statistics.median(e2e), 3),
+        "e2e_p95_ms": round(sorted(e2e)[int(0.95 * (len(e2e) - 1))], 3),
+        "overhead_ms": round(statistics.median(overhead), 3),
+    }
+
+
+def check_prefetch_click(token_latency: float = 0.002, mode: str = "full_autonomy") -> Dict:
+    """A click while the same mode is being prefetched must not repeat any of its model calls"""
+    with FakeOllamaServer(token_latency=token_latency) as server:
+        agent = AgenticEmailAgent(
+            host=server.host, warm_up=False, cache=ResponseCache(path=None), reuse_analysis=False, fast_classify=False
+        )
+        run_mode(agent, mode, BENCH_BULLETS + "\nreference run")
+        expected = len(server.generate_calls())
+        server.reset()
+
+        prefetcher = Prefetcher(agent)
+        future = prefetcher.prefetch(mode, BENCH_BULLETS)
+        while not len(agent.async_agent._inflight) and not future.done():
+            time.sleep(0.001)
+        taken = prefetcher.take(mode, BENCH_BULLETS)
+        run_mode(agent, mode, BENCH_BULLETS)
+        concurrent.futures.wait([future])
+        prefetcher.shutdown()
+        calls = len(server.generate_calls())
+
+    coalesced = sum(row.get("coalesced", 0) + row.get("cached", 0) for row in agent.metrics.summary())
+    failures = []
+    if taken is not None:
+        failures.append("take() handed out a result before the prefetch finished")
+    if calls > expected:
+        failures.append(f"{calls - expected} duplicate model calls")
+    return {"calls": calls, "expected_calls": expected, "joined": coalesced, "failures": failures}
+
+
+def check_background_yields(token_latency: float = 0.002, mode: str = "full_autonomy") -> Dict:
+    """With one decoding slot, a click during example prefetching shares the server with at most BACKGROUND_SLOTS calls"""
+    with FakeOllamaServer(token_latency=token_latency, num_parallel=1) as server:
+        agent = AgenticEmailAgent(
+            host=server.host, warm_up=False, cache=ResponseCache(path=None), reuse_analysis=False, fast_classify=False
+        )
+        run_mode(agent, mode, BENCH_BULLETS + "\nreference run")
+        expected = len(server.generate_calls())
+        server.reset()
+
+        prefetcher = Prefetcher(agent)
+        prefetcher.prefetch_examples(EXAMPLES.values())
+        while not agent.async_agent.scheduler.background_running:
+            time.sleep(0.001)
+        clicked = time.perf_counter()
+        run_mode(agent, mode, BENCH_BULLETS)
+        done = time.perf_counter()
+        prefetcher.shutdown()
+        # Let the cancelled requests finish logging
+        time.sleep(0.1)
+        overlapping = sum(call["start"] < done and call["end"] > clicked for call in server.generate_calls())
+
+    speculative = overlapping - expected
+    failures = []
+    if speculative > BACKGROUND_SLOTS:
+        failures.append(f"{speculative} speculative calls shared the server with the click's {expected}")
+    return {"calls": expected, "speculative_overlap": speculative, "failures": failures}
+
+
+def check_call_timeout_at_dispatch(token_latency: float = 0.005, calls: int = 5) -> Dict:
+    """Time queued for a scheduler slot must not count against call_timeout"""
+    failures = []
+
+    async def run(host: str):
+        agent = AsyncAgenticEmailAgent(
+            max_concurrency=1, host=host, use_cache=False, reuse_analysis=False, fast_classify=False
+        )
+        await agent.setup()
+        started = time.perf_counter()
+        await agent.analyze_context_agentically(f"{BENCH_BULLETS}\nalone")
+        # Each call fits its timeout easily, but the last one waits for all the others first
+        agent.call_timeout = (time.perf_counter() - started) * 2.5
+        results = await asyncio.gather(
+            *[agent.analyze_context_agentically(f"{BENCH_BULLETS}\nqueued {i}") for i in range(calls)],
+            return_exceptions=True
+        )
+        timed_out = sum(isinstance(result, DeadlineExceeded) for result in results)
+        if timed_out:
+            failures.append(f"{timed_out} of {calls} calls timed out while queued")
+
+    with FakeOllamaServer(token_latency=token_latency) as server:
+        asyncio.run(run(server.host))
+    return {"failures": failures}
+
+
+def check_analysis_preamble() -> Dict:
+    """Analysis replies with a preamble and blank lines between fields must still yield the model's fields"""
+    completion = (
+        "Here is the analysis:\n\nPurpose: complaint\n\nTone: apologetic\n\nUrgency: critical\n\nRelationship: client"
+    )
+    expected = {"purpose": "complaint", "tone": "apologetic", "urgency": "critical", "relationship": "client"}
+    with FakeOllamaServer(responses=[("analyze", completion)] + CANNED_RESPONSES) as server:
+        agent = AgenticEmailAgent(
+            host=server.host, warm_up=False, use_cache=False, reuse_analysis=False, fast_classify=False
+        )
+        results = {
+            "analysis": agent.analyze_context_agentically(BENCH_BULLETS),
+            "simple_analysis": agent.simple_analysis_prompt(BENCH_BULLETS),
+        }
+
+    failures = []
+    for task, result in results.items():
+        wrong = {field: result.get(field) for field, value in expected.items() if result.get(field) != value}
+        if wrong:
+            failures.append(f"{task} parsed {wrong} instead of the model's fields")
+    return {"failures": failures}
+
+
+def check_multi_host(fast_latency: float = 0.001, slow_latency: float = 0.02, burst: int = 30) -> Dict:
+    """Routing, failover, ejection and recovery across fake Ollama hosts of different speeds.
+
+    The third host serves a different build of the model and must never get traffic.
+    """
+    fast = FakeOllamaServer(token_latency=fast_latency).start()
+    slow = FakeOllamaServer(token_latency=slow_latency).start()
+    other = FakeOllamaServer(token_latency=fast_latency, digest="other" + FAKE_DIGEST[5:]).start()
+    slow_port = slow._server.server_address[1]
+    failures, served = [], {}
+
+    async def analyses(agent, label: str):
+        return await asyncio.gather(*[agent.analyze_context_agentically(f"{label} {i}") for i in range(burst)])
+
+    async def run():
+        nonlocal slow
+        agent = AsyncAgenticEmailAgent(
+            host=[fast.host, slow.host, other.host], use_cache=False, reuse_analysis=False, fast_classify=False
+        )
+        await agent.setup()
+        agent.pool.stop_health_checks()
+        hosts = dict(zip(("fast", "slow", "other"), agent.pool.hosts))
+        try:
+            if not hosts["other"].ejected:
+                failures.append("host with a different model digest was not ejected")
+
+            await analyses(agent, "routing")
+            served["routing"] = {name: host.served for name, host in hosts.items()}
+            if not served["routing"]["fast"] > served["routing"]["slow"] > 0:
+                failures.append(f"least-outstanding routing did not favour the fast host: {served['routing']}")
+
+            slow.stop()
+            try:
+                await analyses(agent, "failover")
+            except Exception as e:
+                failures.append(f"calls failed instead of failing over: {e}")
+            if not hosts["slow"].ejected:
+                failures.append("stopped host was not ejected")
+
+            slow = FakeOllamaServer(port=slow_port, token_latency=slow_latency).start()
+            for host in agent.pool.hosts:
+                await agent.pool.check(host, agent._recover_host)
+            if hosts["slow"].ejected:
+                failures.append("restarted host was not reinstated by the health check")
+            if not hosts["other"].ejected:
+                failures.append("health check reinstated the host with a different model digest")
+
+            before = hosts["slow"].served
+            await analyses(agent, "recovered")
+            if hosts["slow"].served == before:
+                failures.append("reinstated host received no traffic")
+            served["final"] = {name: host.served for name, host in hosts.items()}
+            if served["final"]["other"]:
+                failures.append("host with a different model digest served calls")
+        finally:
+            agent.pool.stop_health_checks()
+
+    try:
+        asyncio.run(run())
+    finally:
+        for server in (fast, slow, other):
+            server.stop()
+    return {"hosts": 3, "served": served, "failures": failures}
+
+
+def parse_cases(agent) -> Dict[str, Callable]:
+    """Pure parsing steps fed with the canned completions"""
+    responses = {needle: completion for needle, completion in CANNED_RESPONSES}
+    email_text = responses[""]
+    chunks = [email_text[i:i + 4] for i in range(0, len(email_text), 4)]
+
+    def stream_parse():
+        parser = StreamingEmailParser("Professional Email")
+        for chunk in chunks:
+            parser.feed(chunk)
+        parser.finish()
+
+    async_agent = agent.async_agent
+    return {
+        "analysis": lambda: async_agent._analysis_result(responses["analyze"]),
+        "email": lambda: async_agent._email_result(email_text, BENCH_CONTEXT),
+        "variation": lambda: async_agent._variation_result(email_text, "FORMAL"),
+        "suggestions": lambda: async_agent._suggestions_result(responses["email optimization agent"]),
+        "stream_email": stream_parse,
+    }
+
+
+def time_parser(parse: Callable, iterations: int = PARSE_ITERATIONS, trials: int = PARSE_TRIALS) -> Dict:
+    """Best-of-trials microseconds per parse; the minimum is the least noisy estimate"""
+    best = float("inf")
+    for _ in range(trials):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            parse()
+        best = min(best, time.perf_counter() - started)
+    return {"parse_us": round(best / iterations * 1e6, 3)}
+
+
+def time_index(entries: int = INDEX_ENTRIES, lookups: int = INDEX_LOOKUPS) -> Dict:
+    """Microseconds per near-duplicate lookup, and memory per entry, in an index holding `entries` bullet lists"""
+    rng = random.Random(0)
+    words = BENCH_BULLETS.split() + [
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9))) for _ in range(5000)
+    ]
+    texts = ["\n".join(" ".join(rng.choice(words) for _ in range(6)) for _ in range(4)) for _ in range(entries)]
+    tracemalloc.start()
+    try:
+        index = AnalysisIndex(max_entries=entries + 1)
+        before = tracemalloc.get_traced_memory()[0]
+        for text in texts:
+            index.add(text, BENCH_CONTEXT)
+        bytes_per_entry = round((tracemalloc.get_traced_memory()[0] - before) / max(1, entries))
+    finally:
+        tracemalloc.stop()
+    index.add(BENCH_BULLETS, BENCH_CONTEXT)
+
+    # Half near-duplicates that should hit, half fresh inputs that should miss
+    probes = [
+        BENCH_BULLETS.replace("sarah", "sara") if i % 2 else " ".join(rng.choice(words) for _ in range(24))
+        for i in range(lookups)
+    ]
+    started = time.perf_counter()
+    for probe in probes:
+        index.lookup(probe)
+    elapsed = time.perf_counter() - started
+    lookup_us = round(elapsed / lookups * 1e6, 3)
+    failures = [f"{lookup_us} us per lookup, target {INDEX_TARGET_US:g}"] if lookup_us >= INDEX_TARGET_US else []
+    if bytes_per_entry >= INDEX_TARGET_BYTES:
+        failures.append(f"{bytes_per_entry} bytes per entry, target {INDEX_TARGET_BYTES}")
+    hit_rate = round(index.stats()["hit_rate"], 3)
+    return {"entries": entries, "lookup_us": lookup_us, "bytes_per_entry": bytes_per_entry, "hit_rate": hit_rate,
+            "failures": failures}
+
+
+def run_benchmarks(token_latency: float = 0.0, repeat: int = 20, index_entries: int = INDEX_ENTRIES) -> Dict:
+    """Start a fake server, run every case against it and return the results document"""
+    with FakeOllamaServer(token_latency=token_latency) as server:
+        # Every repeat sends the same bullets; measure the model path, not the caches
+        agent = AgenticEmailAgent(
+            use_cache=False, host=server.host, warm_up=False, reuse_analysis=False, fast_classify=False
+        )
+        results = {"config": {"token_latency": token_latency, "repeat": repeat}, "cases": {}}
+
+        for name, run in {**method_cases(agent), **mode_cases(agent)}.items():
+            run()  # warm the connection pool and code paths
+            results["cases"][name] = time_case(run, server, repeat)
+
+        for name, parse in parse_cases(agent).items():
+            results["cases"][f"parse:{name}"] = time_parser(parse)
+    
+    results["cases"]["index:analysis_lookup"] = time_index(index_entries)
+    results["cases"]["check:analysis_preamble"] = check_analysis_preamble()
+    results["cases"]["check:prefetch_click"] = check_prefetch_click()
+    results["cases"]["check:background_yields"] = check_background_yields()
+    results["cases"]["check:call_timeout_at_dispatch"] = check_call_timeout_at_dispatch()
+    results["cases"]["check:multi_host"] = check_multi_host()
+
+    return results
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """List every metric that regressed beyond `threshold` relative to the baseline"""
+    regressions = []
+    for name, base in baseline.get("cases", {}).items():
+        current = results["cases"].get(name)
+        if current is None:
+            continue
+
+        if current.get("calls", 0) > base.get("calls", 0):
+            regressions.append(f"{name}: model calls {base['calls']} -> {current['calls']}")
+        if current.get("prompt_tokens", 0) > base.get("prompt_tokens", current.get("prompt_tokens", 0)):
+            regressions.append(f"{name}: prompt tokens {base['prompt_tokens']} -> {current['prompt_tokens']}")
+
+        for metric, floor in MIN_REGRESSION.items():
+            if metric not in base or metric not in current:
+                continue
+            if current[metric] > base[metric] * (1 + threshold) and current[metric] - base[metric] > floor:
+                regressions.append(f"{name}: {metric} {base[metric]} -> {current[metric]}")
+    return regressions
+
+
+def print_report(results: Dict):
+    print(
+        f"{'case':<45} {'calls':>5} {'prompt tok':>10} {'e2e ms':>10} {'p95 ms':>10} {'overhead ms':>12} "
+        f"{'parse us':>10} {'lookup us':>10} {'B/entry':>8} {'check':>6}"
+    )
+    for name, case in results["cases"].items():
+        check = ("FAIL" if case["failures"] else "ok") if "failures" in case else ""
+        print(
+            f"{name:<45} {case.get('calls', ''):>5} {case.get('prompt_tokens', ''):>10} {case.get('e2e_ms', ''):>10} "
+            f"{case.get('e2e_p95_ms', ''):>10} {case.get('overhead_ms', ''):>12} {case.get('parse_us', ''):>10} "
+            f"{case.get('lookup_us', ''):>10} {case.get('bytes_per_entry', ''):>8} {check:>6}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the email agent against a fake Ollama server")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the results JSON")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown before failing")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="fake seconds per decoded token")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--index-entries", type=int, default=INDEX_ENTRIES, help="analysis index size for the lookup case")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.token_latency, args.repeat, args.index_entries)
+    print_report(results)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n Results written to {args.output}")
+
+    failures = [
+        f"{name}: {failure}" for name, case in results["cases"].items() for failure in case.get("failures", [])
+    ]
+    if failures:
+        print("\n❌ Failed checks:")
+        for failure in failures:
+            print(f"   - {failure}")
+        return 1
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print("\n❌ Regressions against baseline:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            return 1
+        print(" No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""Skip rate and model agreement of the keyword context classifier.
+
+Classifies every sample with context_rules and with the model's own
+analysis, then reports, for a range of confidence thresholds, how many
+analyses the rules would settle alone, how many fields they answer, and
+how often their labels agree with the model's.
+
+Usage:
+    python classifier_benchmark.py                         # test_emails.txt against the local Ollama
+    python classifier_benchmark.py cases.jsonl --output classifier.json
+    python classifier_benchmark.py --fake                  # smoke run against fake_ollama.py
+    python classifier_benchmark.py classifier_cases.jsonl --labels   # against hand-labelled cases, no model
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from typing import Dict, List
+
+from batch_generate import read_cases
+from context_rules import ContextClassifier, DEFAULT_CONFIDENCE_THRESHOLD, REQUIRED_FIELDS
+from email_agent import AgenticEmailAgent
+from fake_ollama import FakeOllamaServer
+
+FIELDS = ("purpose", "urgency", "tone", "relationship")
+THRESHOLDS = (0.4, 0.5, 0.6, 0.65, 0.7, 0.8)
+TIMING_ITERATIONS = 2000
+
+
+def label_words(value: str) -> List[str]:
+    """Lowercase words of a label, so "Meeting request" and "meeting_request" compare equal"""
+    return re.findall(r"[a-z0-9]+", value.lower().replace("_", " "))
+
+
+def agrees(rule_label: str, model_label: str) -> bool:
+    """The model's answer opens with the rule's label; models often explain after it"""
+    expected = label_words(rule_label)
+    return label_words(model_label)[:len(expected)] == expected
+
+
+def read_labels(path: str) -> Dict[str, Dict]:
+    """case id -> hand-written analysis labels, from the "labels" objects of a JSONL case file"""
+    labels = {}
+    with open(path, encoding="utf-8") as f:
+        for raw in f:
+            if raw.strip():
+                record = json.loads(raw)
+                labels[str(record["id"])] = record["labels"]
+    return labels
+
+
+def classify_cases(agent, classifier: ContextClassifier, cases: List, labels: Dict[str, Dict] = None) -> List[Dict]:
+    """Rule analysis of every case next to the model's, or next to the hand labels when given"""
+    rows = []
+    for case_id, bullet_points in cases:
+        rules, confidence = classifier.classify(bullet_points)
+
+        started = time.perf_counter()
+        for _ in range(TIMING_ITERATIONS):
+            classifier.classify(bullet_points)
+        rules_us = (time.perf_counter() - started) / TIMING_ITERATIONS * 1e6
+
+        started = time.perf_counter()
+        model = labels[case_id] if labels else agent.analyze_context_agentically(bullet_points)
+        model_ms = (time.perf_counter() - started) * 1000
+
+        rows.append({
+            "id": case_id,
+            "rules": {field: rules[field] for field in FIELDS},
+            "confidence": confidence,
+            "model": {field: model.get(field, "") for field in FIELDS},
+            "agrees": {field: agrees(rules[field], model.get(field, "")) for field in FIELDS},
+            "rules_us": round(rules_us, 2),
+            "model_ms": round(model_ms, 1),
+        })
+    return rows
+
+
+def summarize(rows: List[Dict], thresholds=THRESHOLDS) -> List[Dict]:
+    """Per threshold: analyses the rules settle alone, fields they answer, and agreement on both"""
+    summary = []
+    for threshold in thresholds:
+        answered = [
+            {field: row["agrees"][field] for field in FIELDS if row["confidence"][field] >= threshold} for row in rows
+        ]
+        skipped = [checks for checks in answered if all(field in checks for field in REQUIRED_FIELDS)]
+        field_checks = [agree for checks in answered for agree in checks.values()]
+        summary.append({
+            "threshold": threshold,
+            "skip_rate": round(len(skipped) / len(rows), 3) if rows else 0.0,
+            "skipped": len(skipped),
+            "field_answer_rate": round(len(field_checks) / (len(rows) * len(FIELDS)), 3) if rows else 0.0,
+            "field_agreement": round(sum(field_checks) / len(field_checks), 3) if field_checks else None,
+            "full_agreement": round(sum(all(checks.values()) for checks in skipped) / len(skipped), 3) if skipped else None,
+        })
+    return summary
+
+
+def print_report(rows: List[Dict], summary: List[Dict]):
+    for row in rows:
+        print(f"\n{row['id']}  (rules {row['rules_us']} us, model {row['model_ms']} ms)")
+        for field in FIELDS:
+            mark = "✓" if row["agrees"][field] else "✗"
+            print(
+                f"   {field:<13} rules={row['rules'][field] or '-':<16} {row['confidence'][field]:>5.2f}  "
+                f"model={row['model'][field]:<20} {mark}"
+            )
+
+    overall = [row["agrees"][field] for row in rows for field in FIELDS]
+    if overall:
+        print(f"\n Field agreement on all cases: {sum(overall) / len(overall):.0%}")
+    print(f"\n{'threshold':>9} {'skip rate':>10} {'skipped':>8} {'fields':>7} {'field agree':>12} {'skip agree':>11}")
+    for line in summary:
+        field_agreement = "-" if line["field_agreement"] is None else f"{line['field_agreement']:.0%}"
+        full_agreement = "-" if line["full_agreement"] is None else f"{line['full_agreement']:.0%}"
+        marker = " <- default" if line["threshold"] == DEFAULT_CONFIDENCE_THRESHOLD else ""
+        print(
+            f"{line['threshold']:>9} {line['skip_rate']:>10.0%} {line['skipped']:>8} {line['field_answer_rate']:>7.0%} "
+            f"{field_agreement:>12} {full_agreement:>11}{marker}"
+        )
+    print(
+        "\nskip rate: analyses the rules settle alone (purpose, tone and urgency all confident); fields: share of "
+        "fields the rules answer; agreement (with the model or the labels) is on the fields the rules answered"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the keyword context classifier against the model")
+    parser.add_argument("input", nargs="?", default="test_emails.txt", help="test_emails.txt style text file or JSONL file")
+    parser.add_argument("--output", help="write per-case rows and the threshold summary as JSON")
+    parser.add_argument("--fake", action="store_true", help="use fake_ollama.py's canned analysis instead of a real model")
+    parser.add_argument(
+        "--labels", action="store_true",
+        help="compare with the \"labels\" of each JSONL case instead of a model, e.g. classifier_cases.jsonl"
+    )
+    args = parser.parse_args(argv)
+
+    cases = list(read_cases(args.input))
+    if args.labels:
+        rows = classify_cases(None, ContextClassifier(), cases, read_labels(args.input))
+    else:
+        server = FakeOllamaServer().start() if args.fake else None
+        try:
+            # The model's own answer every time: no rules, near-duplicate reuse or response cache
+            agent = AgenticEmailAgent(
+                use_cache=False, host=server.host if server else None, warm_up=False,
+                reuse_analysis=False, fast_classify=False
+            )
+            rows = classify_cases(agent, ContextClassifier(), cases)
+        finally:
+            if server:
+                server.stop()
+
+    summary = summarize(rows)
+    print_report(rows, summary)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"cases": rows, "thresholds": summary}, f, indent=2)
+        print(f"\n Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import os
+import re
+import threading
+from typing import Dict, Tuple
+
+# A field's rule label is used once its confidence reaches this; EMAIL_AGENT_RULES_CONFIDENCE overrides.
+# The lowest threshold at which every analysis the rules settle alone matches the hand labels in
+# classifier_cases.jsonl (classifier_benchmark.py --labels): 15% of cases skip the model, 55% of
+# fields are answered and 93% of those agree. At 0.6, one skipped case in four had a wrong field.
+DEFAULT_CONFIDENCE_THRESHOLD = float(os.environ.get("EMAIL_AGENT_RULES_CONFIDENCE", "0.65"))
+# Pseudo-score for "something the rules don't know about", so one weak cue is never certain
+UNKNOWN_PRIOR = 1.0
+# Longest cue phrase, in words
+MAX_CUE_WORDS = 3
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+# Fields the generation prompts depend on; once the rules know these the model is skipped and
+# an unknown relationship, which is only displayed, keeps its default
+REQUIRED_FIELDS = ("purpose", "tone", "urgency")
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday")
+
+# field -> label -> {cue phrase: weight}; phrases are matched on whole lowercase words with
+# apostrophes dropped, and labels follow the ones the analysis prompt offers the model.
+# Weight 3 cues settle a field alone, 2 nearly so, 1 only tips a close call.
+RULES = {
+    "purpose": {
+        "meeting_request": {
+            "meeting": 3, "meet": 3, "schedule": 2, "reschedule": 2, "catch up": 2, "sync": 2,
+            "calendar": 2, "availability": 2, "available": 1, "discuss": 1, "agenda": 2, "coffee": 1, "lunch": 1,
+        },
+        "follow_up": {
+            "follow up": 3, "following up": 3, "checking in": 3, "reminder": 3, "any update": 3, "any updates": 3,
+            "still waiting": 2, "circle back": 2, "as discussed": 2, "havent heard": 2,
+        },
+        "request": {
+            "please": 1, "request": 2, "requesting": 2, "could you": 2, "can you": 2, "approval": 2,
+            "approve": 2, "sign off": 2, "permission": 2, "review": 1, "send me": 2,
+        },
+        "complaint": {
+            "complaint": 3, "unacceptable": 3, "disappointed": 3, "frustrated": 3, "outage": 2, "not working": 2,
+            "broken": 2, "again": 1, "refund": 2, "issue": 1, "problem": 1, "down": 1,
+        },
+        "thank_you": {
+            "thanks": 3, "thank you": 3, "grateful": 3, "appreciate": 3, "appreciated": 3, "kudos": 3,
+        },
+        "announcement": {
+            "announce": 3, "announcing": 3, "introducing": 3, "fyi": 2,
+        },
+    },
+    "urgency": {
+        "critical": {
+            "emergency": 3, "critical": 3, "immediately": 2, "right now": 3, "outage": 2, "down": 1,
+        },
+        "high": {
+            "asap": 3, "urgent": 3, "urgently": 3, "as soon as possible": 3, "today": 2, "tonight": 2,
+            "tomorrow": 2, "end of day": 3, "eod": 3, "deadline": 2, "by monday": 2, "by friday": 2,
+            "this morning": 2, "priority": 1,
+        },
+        "medium": {
+            "next week": 3, "this week": 2, "next month": 3, "soon": 1,
+            **{f"next {day}": 3 for day in WEEKDAYS}, **{f"this {day}": 2 for day in WEEKDAYS},
+        },
+        "low": {
+            "no rush": 3, "no hurry": 3, "whenever": 3, "when you can": 3, "when you get a chance": 3,
+            "low priority": 3, "sometime": 2, "fyi": 2, "maybe": 1,
+        },
+    },
+    "tone": {
+        "formal": {
+            "proposal": 2, "contract": 2, "budget": 2, "report": 2, "reports": 2, "policy": 2, "compliance": 2,
+            "board": 2, "quarterly": 2, "invoice": 2, "approval": 1, "review": 1, "legal": 2,
+        },
+        "casual": {
+            "hey": 3, "coffee": 2, "lunch": 2, "drinks": 3, "awesome": 3, "cool": 2, "fun": 2, "party": 2,
+            "thanks": 1, "maybe": 1,
+        },
+        "urgent": {
+            "asap": 3, "urgent": 3, "urgently": 3, "immediately": 3, "emergency": 3, "critical": 2,
+        },
+        "persuasive": {
+            "benefit": 2, "benefits": 2, "roi": 3, "savings": 2, "save": 1, "opportunity": 2, "convince": 3,
+            "value": 1, "improve": 1,
+        },
+        "apologetic": {
+            "sorry": 3, "apologize": 3, "apologies": 3, "my mistake": 3, "my fault": 3,
+        },
+    },
+    "relationship": {
+        "boss": {
+            "my boss": 3, "my manager": 3, "manager": 2, "director": 2, "ceo": 3, "vp": 2, "performance review": 3,
+            "promotion": 2, "raise": 1,
+        },
+        "client": {
+            "client": 3, "clients": 3, "customer": 2, "customers": 2, "account": 1, "contract": 1,
+        },
+        "vendor": {
+            "vendor": 3, "supplier": 3, "invoice": 2, "sla": 3, "service provider": 3, "our order": 2,
+        },
+        "colleague": {
+            "colleague": 3, "colleagues": 3, "coworker": 3, "coworkers": 3, "teammate": 3, "team": 2,
+            "team member": 3, "peer": 2,
+        },
+    },
+}
+
+
+class ContextClassifier:
+    """Keyword rules that answer the context analysis, field by field, where they are sure.
+
+    Each field's labels are scored by the weights of the cue phrases found
+    in the bullets; confidence is the winning score over the sum of all scores plus
+    UNKNOWN_PRIOR, so competing cues or a lone weak cue stay below the
+    threshold and the model decides that field instead.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_CONFIDENCE_THRESHOLD, rules: Dict = None):
+        self.threshold = threshold
+        self.fields = list(rules or RULES)
+        # phrase -> [(field, label, weight)], so matching is one dict lookup per word n-gram
+        self._cues = {}
+        for field, labels in (rules or RULES).items():
+            for label, cues in labels.items():
+                for phrase, weight in cues.items():
+                    self._cues.setdefault(phrase, []).append((field, label, weight))
+        self._lock = threading.Lock()
+        self.counters = {"answered": 0, "partial": 0, "fell_through": 0}
+
+    def classify(self, bullet_points: str) -> Tuple[Dict, Dict[str, float]]:
+        """Best label and confidence for every field, shaped like the model's analysis"""
+        words = WORD_PATTERN.findall(bullet_points.lower().replace("'", ""))
+        phrases = set(words)
+        for size in range(2, MAX_CUE_WORDS + 1):
+            phrases.update(" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+
+        scores = {field: {} for field in self.fields}
+        for phrase in phrases:
+            for field, label, weight in self._cues.get(phrase, ()):
+                scores[field][label] = scores[field].get(label, 0) + weight
+
+        labels, confidence, cues = {}, {}, []
+        for field, field_scores in scores.items():
+            if not field_scores:
+                labels[field], confidence[field] = None, 0.0
+                continue
+            best = max(field_scores, key=field_scores.get)
+            labels[field] = best
+            confidence[field] = round(field_scores[best] / (sum(field_scores.values()) + UNKNOWN_PRIOR), 3)
+            cues.append(f"{field} {best} ({confidence[field]:.0%})")
+
+        analysis = {
+            "purpose": labels["purpose"] or "request",
+            "tone": labels["tone"] or "professional",
+            "relationship": labels["relationship"] or "colleague",
+            "urgency": labels["urgency"] or "medium",
+            "formality": "medium",
+            "reasoning": "Rules decided: " + ", ".join(cues)
+        }
+        return analysis, confidence
+
+    def answer(self, bullet_points: str) -> Dict[str, str]:
+        """Labels of the fields whose confidence clears the threshold; the model decides the rest"""
+        analysis, confidence = self.classify(bullet_points)
+        known = {field: analysis[field] for field in self.fields if confidence[field] >= self.threshold}
+        outcome = "answered" if self.decided(known) else "partial" if known else "fell_through"
+        with self._lock:
+            self.counters[outcome] += 1
+        return known
+
+    def decided(self, known: Dict[str, str]) -> bool:
+        """Whether answer()'s labels settle every field the prompts need, so the model can be skipped"""
+        return all(field in known for field in REQUIRED_FIELDS)
+
+    def analysis(self, known: Dict[str, str]) -> Dict:
+        """Full analysis dict from rule labels, defaults filling any field they leave open"""
+        return {
+            "purpose": known.get("purpose", "request"),
+            "tone": known.get("tone", "professional"),
+            "relationship": known.get("relationship", "colleague"),
+            "urgency": known.get("urgency", "medium"),
+            "formality": "medium",
+            "reasoning": "Rules decided: " + ", ".join(f"{field} {label}" for field, label in known.items())
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+        total = counters["answered"] + counters["partial"] + counters["fell_through"]
+        counters["skip_rate"] = counters["answered"] / total if total else 0.0
+        return counters
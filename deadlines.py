@@ -0,0 +1,31 @@
+"""Time limits for model calls.
+
+Every call gives up after a per-call timeout, counted from when it gets
+a scheduler slot. A view made with with_deadline() also shares one end
+time across all of its calls, so a whole generation mode can be bounded,
+queueing included.
+"""
+import os
+import time
+from typing import Optional
+
+# Longest any single model call may run once dispatched; EMAIL_AGENT_CALL_TIMEOUT overrides
+DEFAULT_CALL_TIMEOUT_SECONDS = float(os.environ.get("EMAIL_AGENT_CALL_TIMEOUT", "120"))
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a model call, or the mode it belongs to, runs out of time"""
+
+
+def deadline_after(seconds: float, deadline: float = None) -> float:
+    """Monotonic end time `seconds` from now, never later than an existing `deadline`"""
+    end = time.monotonic() + seconds
+    return end if deadline is None else min(deadline, end)
+
+
+def time_left(deadline: Optional[float], timeout: Optional[float] = None) -> Optional[float]:
+    """Seconds until `deadline`, capped at `timeout`; None means no limit"""
+    if deadline is not None:
+        left = deadline - time.monotonic()
+        timeout = left if timeout is None else min(timeout, left)
+    return timeout
@@ -1,86 +1,696 @@
-import ollama
+import httpx
+import os
 import json
+import time
+import hashlib
+import copy
+import asyncio
+import threading
+import concurrent.futures
+from collections import OrderedDict
 from datetime import datetime
 from typing import Dict, List
+from response_cache import ResponseCache
+from metrics import MetricsRecorder
+from token_budgets import TokenBudgets, hit_budget
+from single_flight import SingleFlight
+from scheduler import DEFAULT_MAX_QUEUE, FairScheduler
+from similarity_index import AnalysisIndex
+from context_rules import ContextClassifier
+from host_pool import HostPool
+from prompts import analysis_fields_prompt, render as render_prompt
+from deadlines import DEFAULT_CALL_TIMEOUT_SECONDS, DeadlineExceeded, deadline_after, time_left
+from response_parser import (
+    ANALYSIS_FIELDS, EmailParser, FieldParser, FIELDS_COMPLETE, StreamingEmailParser, SuggestionParser, TASK_PARSERS,
+    parser_for
+)
 
-class AgenticEmailAgent:
-    def __init__(self):
-        self.client = ollama.Client()
-        self.model = self.find_working_model()
+DEFAULT_MAX_CONCURRENCY = 3
+DEFAULT_POOL_CONNECTIONS = 20
+# How long Ollama keeps the model loaded after each call; well past a quiet hour by default
+DEFAULT_KEEP_ALIVE = os.environ.get("EMAIL_AGENT_KEEP_ALIVE", "24h")
+HEALTH_CHECK_TTL_SECONDS = 5
+# Ollama `context` token lists kept for follow-up calls (analysis -> draft -> suggestions)
+KV_CONTEXT_ENTRIES = 128
+MODEL_DISCOVERY_TTL_SECONDS = 300
+# A duplicate request goes out once a call is slower than this share of the task's recent calls
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY_SECONDS = 0.1
+
+# host -> (discovered_at, model, digest); shared by every agent in the process
+_model_discovery_cache = {}
+_model_discovery_lock = threading.Lock()
+
+TONE_APPROACHES = [
+    ("FORMAL", "professional and corporate"),
+    ("FRIENDLY", "warm and collaborative"), 
+    ("URGENT", "direct and action-oriented")
+]
+
+STRUCTURED_EMAIL_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "purpose": {"type": "string"},
+        "tone": {"type": "string"},
+        "urgency": {"type": "string"},
+        "relationship": {"type": "string"},
+        "subject": {"type": "string"},
+        "body": {"type": "string"},
+        "suggestions": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["purpose", "tone", "urgency", "relationship", "subject", "body", "suggestions"]
+}
+
+
+def _validate_structured(data) -> Dict:
+    """Check a structured response against STRUCTURED_EMAIL_SCHEMA, raising ValueError on mismatch"""
+    if not isinstance(data, dict):
+        raise ValueError("response is not a JSON object")
+    
+    for key in STRUCTURED_EMAIL_SCHEMA["required"]:
+        expected = STRUCTURED_EMAIL_SCHEMA["properties"][key]["type"]
+        value = data.get(key)
+        if expected == "string" and not (isinstance(value, str) and value.strip()):
+            raise ValueError(f"'{key}' must be a non-empty string")
+        if expected == "array" and not (isinstance(value, list) and all(isinstance(item, str) for item in value)):
+            raise ValueError(f"'{key}' must be a list of strings")
+    return data
+
+
+class AsyncAgenticEmailAgent:
+    """Asyncio agent built on ollama.AsyncClient.
+
+    Independent model calls are fanned out with asyncio.gather; the
+    fair scheduler caps how many generations are in flight at once so the
+    agent never asks Ollama for more than OLLAMA_NUM_PARALLEL can serve,
+    and shares those slots round-robin between sessions. `host` may list
+    several Ollama servers (comma-separated or a list); calls then go to
+    the least loaded healthy one and `max_concurrency` applies per host.
+    Every call gives up after `call_timeout` seconds; with `hedge` (the
+    default when there are several hosts) a call slower than its task's
+    p95 is duplicated on spare capacity and the first answer wins.
+    """
+    
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        model: str = None,
+        cache: ResponseCache = None,
+        use_cache: bool = True,
+        host=None,
+        reuse_context: bool = True,
+        keep_alive=DEFAULT_KEEP_ALIVE,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        analysis_index: AnalysisIndex = None,
+        reuse_analysis: bool = True,
+        fast_classify: bool = True,
+        call_timeout: float = DEFAULT_CALL_TIMEOUT_SECONDS,
+        hedge: bool = None
+    ):
+        self.pool = HostPool(
+            host,
+            limits=httpx.Limits(max_connections=DEFAULT_POOL_CONNECTIONS, max_keepalive_connections=DEFAULT_POOL_CONNECTIONS)
+        )
+        self.max_concurrency = max_concurrency
+        self.scheduler = FairScheduler(max_concurrency * len(self.pool), max_queue)
+        # Whose calls these are, for fair queuing; views from for_session() set it
+        self.session = None
+        # Speculative calls wait behind interactive ones; views from as_background() set it
+        self.background = False
+        self.call_timeout = call_timeout
+        # Monotonic end time shared by every call of this view; views from with_deadline() set it
+        self.deadline = None
+        # A duplicate on the same server mostly adds load to the server that is already slow
+        self.hedge = len(self.pool) > 1 if hedge is None else hedge
+        self.model = model
+        self.model_digest = None
+        self.cache = cache or (ResponseCache() if use_cache else None)
+        # Near-duplicate bullet lists (a fixed typo, reordered lines) reuse an earlier analysis
+        if analysis_index is None and reuse_analysis:
+            analysis_index = AnalysisIndex()
+        self.analysis_index = analysis_index
+        # Keyword rules answer clear-cut analyses in microseconds; the model handles the rest
+        self.classifier = ContextClassifier() if fast_classify else None
+        self.metrics = MetricsRecorder()
+        self.reuse_context = reuse_context
+        self._kv_contexts = OrderedDict()
+        self.keep_alive = keep_alive
+        self.budgets = TokenBudgets()
+        # Identical calls already in progress, shared by every session using this agent
+        self._inflight = SingleFlight()
+        self.readiness = {"state": "cold", "error": None, "warmup_seconds": None}
+        self._health = None
+        self._health_checked = 0.0
+    
+    def with_budgets(self, budgets: TokenBudgets):
+        """Lightweight view of this agent that decodes under different token budgets.
+
+        The copy shares the host pool, scheduler, cache and metrics, so it can be
+        made per request (e.g. from the UI sliders) without any setup cost.
+        """
+        view = copy.copy(self)
+        view.budgets = budgets
+        return view
+    
+    def for_session(self, session):
+        """View of this agent whose calls queue fairly under `session` (any hashable id)"""
+        view = copy.copy(self)
+        view.session = session
+        return view
+    
+    def as_background(self):
+        """View of this agent for speculative work, queued behind every interactive call"""
+        view = copy.copy(self)
+        view.background = True
+        return view
+    
+    def with_deadline(self, seconds: float):
+        """View of this agent whose calls all give up `seconds` from now, e.g. one generation mode"""
+        view = copy.copy(self)
+        view.deadline = deadline_after(seconds, self.deadline)
+        return view
+    
+    async def queue_status(self) -> Dict:
+        """This view's session's place in the scheduler queue and estimated wait"""
+        return self.scheduler.status(self.session)
+    
+    async def setup(self):
+        """Discover the model; must be awaited before any generation call"""
+        if not self.model:
+            self.model = await self.find_working_model()
         
         if not self.model:
+            unreachable = [host for host in self.pool.hosts if (host.error or "").startswith("no answer")]
+            if len(unreachable) == len(self.pool.hosts):
+                raise Exception(f" Could not reach Ollama: {unreachable[0].error}")
             raise Exception(" qwen2.5:0.5b model not found. Please install it with: ollama pull qwen2.5:0.5b")
+        if len(self.pool) > 1:
+            self.pool.start_health_checks(self._recover_host)
+        return self
     
-    def find_working_model(self):
-        """Find qwen2.5:0.5b model specifically"""
+    async def _generate(
+        self,
+        prompt: str,
+        options: Dict = None,
+        task: str = "generate",
+        format: Dict = None,
+        kv_context: List[int] = None
+    ) -> Dict:
+        """Single choke point for every model call, bounded by the concurrency limit.
+
+        Without explicit `options`, the task's token budget supplies them.
+        Identical calls already in flight are joined rather than repeated.
+        Tasks with an early-stop parser are streamed under the hood, so
+        generation ends as soon as the fields they need are in.
+        """
+        if format is None and task in TASK_PARSERS:
+            final = {}
+            async for _ in self._generate_stream(prompt, options, task, kv_context, final):
+                pass
+            return final
+        
+        started = time.perf_counter()
+        if options is None:
+            options = self.budgets.options_for(task)
+        cache_key = self._cache_key(prompt, options, format, kv_context)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.metrics.record_call(task, cached, time.perf_counter() - started, cached=True)
+                return cached
+        
+        timeout = self._time_left(task)
+        flight_key = self._flight_key(prompt, options, format, kv_context)
+        joined = self._join_flight(flight_key)
         try:
-            models_response = self.client.list()
-            models = models_response.get('models', [])
-            
-            print(f"🔍 Looking for qwen2.5:0.5b model...")
-            
-            # Look specifically for qwen2.5:0.5b
-            for model in models:
-                # Extract just the name string, not the full object
-                if isinstance(model, dict):
-                    model_name = model.get('name', '')
-                else:
-                    # Handle case where model might be an object with name attribute
-                    model_name = str(model).split("'")[1] if "name=" in str(model) else str(model)
-                
-                print(f"   - Found model: {model_name}")
-                
-                if 'qwen2.5:0.5b' in model_name:
-                    # Return just the clean model name
-                    clean_name = "qwen2.5:0.5b"
-                    print(f" Using qwen2.5:0.5b model")
-                    return clean_name
+            # Giving up leaves the flight; the last caller leaving cancels the HTTP request
+            response = await asyncio.wait_for(self._inflight.do(
+                flight_key, lambda: self._call_model(prompt, options, task, format, kv_context, cache_key, started, flight_key)
+            ), timeout)
+        except DeadlineExceeded:
+            raise
+        except asyncio.TimeoutError:
+            raise self._timed_out(task, timeout) from None
+        if joined:
+            self.metrics.record_call(task, response, time.perf_counter() - started, coalesced=True)
+        return response
+    
+    async def _call_model(
+        self,
+        prompt: str,
+        options: Dict,
+        task: str,
+        format: Dict,
+        kv_context: List[int],
+        cache_key: str,
+        started: float,
+        flight_key: str
+    ):
+        """The one real generate request behind a (possibly coalesced) _generate call"""
+        waited = time.perf_counter()
+        async with self.scheduler.slot(self.session, self.background, flight_key):
+            self.metrics.record_queue_wait(task, time.perf_counter() - waited)
+            # call_timeout starts now: waiting for the slot doesn't count against it
+            try:
+                response = await asyncio.wait_for(self._hedged(task, lambda: self.pool.generate(
+                    model=self.model, prompt=prompt, options=options, format=format, context=kv_context,
+                    keep_alive=self.keep_alive
+                )), self.call_timeout)
+            except asyncio.TimeoutError:
+                raise self._timed_out(task, self.call_timeout) from None
+        
+        self.metrics.record_call(task, response, time.perf_counter() - started, truncated=hit_budget(response))
+        if cache_key:
+            self.cache.put(cache_key, _response_dict(response))
+        return response
+    
+    async def _generate_stream(
+        self,
+        prompt: str,
+        options: Dict = None,
+        task: str = "generate",
+        kv_context: List[int] = None,
+        final: Dict = None
+    ):
+        """Streaming counterpart of _generate yielding text chunks as they decode.
+
+        `final`, if given, is filled with the complete response (timing
+        fields, context tokens) once the stream has ended. A caller joining
+        an identical stream in flight replays its chunks so far, then follows it.
+        """
+        started = time.perf_counter()
+        if options is None:
+            options = self.budgets.options_for(task)
+        cache_key = self._cache_key(prompt, options, kv_context=kv_context)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.metrics.record_call(task, cached, time.perf_counter() - started, cached=True)
+                if final is not None:
+                    final.update(cached)
+                yield cached['response']
+                return
+        
+        timeout = self._time_left(task)
+        expires = time.monotonic() + timeout if timeout is not None else None
+        flight_key = self._flight_key(prompt, options, kv_context=kv_context)
+        joined = self._join_flight(flight_key)
+        shared_final = {}
+        chunks = self._inflight.stream(
+            flight_key,
+            lambda final: self._stream_model(prompt, options, task, kv_context, cache_key, started, final, flight_key),
+            shared_final
+        )
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), time_left(expires))
+                except StopAsyncIteration:
+                    break
+                except DeadlineExceeded:
+                    raise
+                except asyncio.TimeoutError:
+                    raise self._timed_out(task, timeout) from None
+                yield chunk
+        finally:
+            await chunks.aclose()
+        
+        if joined:
+            self.metrics.record_call(task, shared_final, time.perf_counter() - started, coalesced=True)
+        if final is not None:
+            final.update(shared_final)
+    
+    async def _stream_model(
+        self,
+        prompt: str,
+        options: Dict,
+        task: str,
+        kv_context: List[int],
+        cache_key: str,
+        started: float,
+        final: Dict,
+        flight_key: str
+    ):
+        """The one real streamed generate request behind a (possibly coalesced) stream.
+
+        The task's parser watches the text; once the model writes past the
+        fields the task needs, the stream is closed, which stops Ollama decoding.
+        """
+        parser = parser_for(task)
+        stopped_early = False
+        waited = time.perf_counter()
+        async with self.scheduler.slot(self.session, self.background, flight_key):
+            self.metrics.record_queue_wait(task, time.perf_counter() - waited)
+            # call_timeout starts now: waiting for the slot doesn't count against it
+            expires = deadline_after(self.call_timeout) if self.call_timeout is not None else None
+            try:
+                stream, part = await asyncio.wait_for(self._hedged(
+                    task, lambda: self._open_stream(prompt, options, kv_context),
+                    discard=lambda opened: opened[0].aclose()
+                ), time_left(expires))
+            except asyncio.TimeoutError:
+                raise self._timed_out(task, self.call_timeout) from None
+            first_token_at = time.perf_counter()
+            chunks = []
+            try:
+                while True:
+                    text = part['response']
+                    if parser is not None and parser.feed(text):
+                        text = text[:len(text) - parser.overflow]
+                        stopped_early = True
+                    chunks.append(text)
+                    if text:
+                        yield text
+                    if stopped_early:
+                        break
+                    try:
+                        part = await asyncio.wait_for(stream.__anext__(), time_left(expires))
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        raise self._timed_out(task, self.call_timeout) from None
+            finally:
+                await stream.aclose()
+        
+        complete = _response_dict(part)
+        complete['response'] = ''.join(chunks)
+        if stopped_early:
+            # Ollama only reports counts on the final chunk, and every streamed chunk is one token
+            complete.update(
+                done=True, done_reason=FIELDS_COMPLETE, eval_count=len(chunks),
+                eval_duration=int((time.perf_counter() - first_token_at) * 1e9)
+            )
+        self.metrics.record_call(
+            task, complete, time.perf_counter() - started, truncated=hit_budget(part), stopped_early=stopped_early
+        )
+        final.update(complete)
+        # Only completions that ran to the end, or to every field they need, are cached
+        if cache_key:
+            self.cache.put(cache_key, complete)
+    
+    async def _open_stream(self, prompt: str, options: Dict, kv_context: List[int]):
+        """Start a streamed generate and wait for its first part; returns (stream, first part)"""
+        stream = self.pool.stream(
+            model=self.model, prompt=prompt, options=options, context=kv_context, keep_alive=self.keep_alive
+        )
+        try:
+            return stream, await stream.__anext__()
+        except BaseException:
+            await stream.aclose()
+            raise
+    
+    async def _hedged(self, task: str, start, discard=None):
+        """Await start(), racing a duplicate on spare capacity if it is slower than usual for the task.
+
+        Whichever answers first wins; the other is cancelled, which closes
+        its HTTP request, and `discard` (a coroutine function) cleans up a
+        loser that finished at the same moment.
+        """
+        started = time.perf_counter()
+        first = asyncio.ensure_future(start())
+        racers = {first}
+        spare = False
+        try:
+            delay = self._hedge_delay(task)
+            if delay is not None:
+                done, _ = await asyncio.wait(racers, timeout=delay)
+                spare = not done and self.scheduler.try_acquire_spare(self.session)
+                if spare:
+                    racers.add(asyncio.ensure_future(start()))
             
-            # If qwen2.5:0.5b not found, fail
-            print(" qwen2.5:0.5b model not found")
-            print(" Please install it with: ollama pull qwen2.5:0.5b")
+            while True:
+                done, pending = await asyncio.wait(racers, return_when=asyncio.FIRST_COMPLETED)
+                winners = [racer for racer in done if not racer.cancelled() and racer.exception() is None]
+                if winners or not pending:
+                    break
+                # One side failed; the other may still answer
+                racers = pending
+        finally:
+            for racer in racers:
+                racer.cancel()
+            if spare:
+                self.scheduler.release(self.session, background=True)
+        
+        if not winners:
+            return done.pop().result()
+        winner = first if first in winners else winners[0]
+        if discard is not None:
+            for loser in winners:
+                if loser is not winner:
+                    await discard(loser.result())
+        if spare:
+            self.metrics.record_hedge(task, won=winner is not first)
+        self.metrics.record_model_latency(task, time.perf_counter() - started)
+        return winner.result()
+    
+    def _hedge_delay(self, task: str):
+        """How long to wait before hedging a call, or None not to hedge it"""
+        if not self.hedge or self.background:
             return None
-                
+        p95 = self.metrics.model_latency(task, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES)
+        return None if p95 is None else max(p95, HEDGE_MIN_DELAY_SECONDS)
+    
+    def _time_left(self, task: str):
+        """Seconds until the view's deadline, queueing included (None: no deadline); call_timeout starts at dispatch"""
+        timeout = time_left(self.deadline)
+        if timeout is not None and timeout <= 0:
+            raise self._timed_out(task, 0)
+        return timeout
+    
+    def _timed_out(self, task: str, timeout: float) -> DeadlineExceeded:
+        self.metrics.record_timeout(task)
+        if not timeout:
+            return DeadlineExceeded(f" {task} not started: the deadline has already passed")
+        return DeadlineExceeded(f" {task} took longer than {timeout:.1f}s")
+    
+    def _join_flight(self, flight_key: str) -> bool:
+        """Whether an identical call is already in flight; an interactive caller lifts it out of the background queue"""
+        if flight_key not in self._inflight:
+            return False
+        if not self.background:
+            self.scheduler.promote(flight_key)
+        return True
+    
+    def _flight_key(self, prompt: str, options: Dict = None, format: Dict = None, kv_context: List[int] = None) -> str:
+        """Exact identity of a call for coalescing; unlike the cache key it ignores temperature"""
+        payload = json.dumps(
+            {"model": self.model, "prompt": prompt, "options": options or {}, "format": format, "context": kv_context},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _cache_key(self, prompt: str, options: Dict = None, format: Dict = None, kv_context: List[int] = None):
+        """Cache key for a call, or None when the call must not be cached"""
+        if not self.cache or not self.cache.is_cacheable(options):
+            return None
+        extra = {}
+        if format:
+            extra['format'] = format
+        if kv_context:
+            extra['context'] = kv_context
+        return self.cache.make_key(self.model_digest or self.model, prompt, options, **extra)
+    
+    def _request_prefix(self, bullet_points: str) -> str:
+        """Stable opening shared by every prompt about the same bullets.
+
+        Putting the user's content first and task instructions last lets
+        Ollama reuse the already-evaluated prefix across related calls.
+        """
+        return f"Email Request:\n{bullet_points.strip()}\n\n"
+    
+    def _remember_kv_context(self, kind: str, text: str, response):
+        """Keep the `context` tokens of a finished call so a follow-up can continue from it"""
+        tokens = response.get('context') if response else None
+        if not self.reuse_context or not tokens:
+            return
+        key = (kind, hashlib.sha1(text.encode('utf-8')).hexdigest())
+        self._kv_contexts[key] = tokens
+        self._kv_contexts.move_to_end(key)
+        while len(self._kv_contexts) > KV_CONTEXT_ENTRIES:
+            self._kv_contexts.popitem(last=False)
+    
+    def _recall_kv_context(self, kind: str, text: str):
+        """Context tokens remembered for this text, or None"""
+        if not self.reuse_context:
+            return None
+        return self._kv_contexts.get((kind, hashlib.sha1(text.encode('utf-8')).hexdigest()))
+    
+    async def warm_up(self) -> bool:
+        """Load the model into memory on every host so the first real request skips load_duration"""
+        self.readiness.update(state="warming", error=None)
+        started = time.perf_counter()
+        hosts = [host for host in self.pool.hosts if not host.ejected] or self.pool.hosts
+        results = await asyncio.gather(*[self._warm_host(host) for host in hosts], return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if len(errors) == len(results):
+            self.readiness.update(state="error", error=str(errors[0]))
+            return False
+        
+        self.readiness.update(state="ready", warmup_seconds=round(time.perf_counter() - started, 3))
+        self._health = None
+        return True
+    
+    async def _warm_host(self, host):
+        started = time.perf_counter()
+        # An empty prompt makes Ollama load the model without generating anything
+        response = await host.client.generate(model=self.model, prompt="", keep_alive=self.keep_alive)
+        self.metrics.record_call("warmup", response, time.perf_counter() - started)
+        return response
+    
+    async def health(self) -> Dict:
+        """Readiness plus whether Ollama currently holds the model in memory (on every healthy host)"""
+        if self._health and time.time() - self._health_checked < HEALTH_CHECK_TTL_SECONDS:
+            return dict(self._health, **self.readiness)
+        
+        status = {"model": self.model, "keep_alive": self.keep_alive, "resident": None, "expires_at": None}
+        hosts = [host for host in self.pool.hosts if not host.ejected] or self.pool.hosts
+        try:
+            residency = await asyncio.gather(*[self._resident_until(host) for host in hosts])
+            status["resident"] = all(expires_at is not None for expires_at in residency)
+            if status["resident"]:
+                status["expires_at"] = min(residency)
         except Exception as e:
-            print(f" Error finding qwen2.5:0.5b model: {e}")
+            status["health_error"] = str(e)
+        if len(self.pool) > 1:
+            status["hosts"] = self.pool.status()
+        
+        self._health, self._health_checked = status, time.time()
+        return dict(status, **self.readiness)
+    
+    async def _resident_until(self, host):
+        """When the host will unload the model, or None if it isn't loaded"""
+        running = await host.probe.ps()
+        for model in running.get('models', []):
+            name = model.get('model') or model.get('name') or ''
+            if self.model and self.model in name:
+                return str(model.get('expires_at') or '')
+        return None
+    
+    async def refresh_model(self, force: bool = False):
+        """Re-run model discovery once the cached result is older than the refresh interval"""
+        model = await self.find_working_model(force=force)
+        if model:
+            self.model = model
+        return self.model
+    
+    async def find_working_model(self, force: bool = False):
+        """Find qwen2.5:0.5b model specifically on every host, reusing a recent discovery per host"""
+        for host in self.pool.hosts:
+            await self._discover_host(host, force)
+        
+        serving = [host for host in self.pool.hosts if host.model]
+        if not serving:
             return None
+        # The digest keys the response cache, so every host must serve the same build
+        self.model_digest = serving[0].digest
+        for host in serving[1:]:
+            self._check_digest(host)
+        return serving[0].model
     
-    def analyze_context_agentically(self, bullet_points: str) -> Dict:
+    async def _discover_host(self, host, force: bool = False) -> bool:
+        """Model discovery on one host; a host without the model is taken out of rotation"""
+        with _model_discovery_lock:
+            cached = _model_discovery_cache.get(host.url)
+        if cached and not force and time.time() - cached[0] < MODEL_DISCOVERY_TTL_SECONDS:
+            host.model, host.digest = cached[1], cached[2]
+        else:
+            # The probe client's short timeout: a host that accepts connections but never answers fails discovery
+            try:
+                host.model, host.digest = await self._discover_model(host.probe)
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                print(f" Error finding qwen2.5:0.5b model: {error}")
+                host.model, host.digest = None, None
+                self.pool.eject(host, f"no answer from Ollama ({error})")
+                return False
+            if host.model:
+                with _model_discovery_lock:
+                    _model_discovery_cache[host.url] = (time.time(), host.model, host.digest)
+        
+        if not host.model:
+            self.pool.eject(host, "qwen2.5:0.5b not available")
+            return False
+        return self._check_digest(host)
+    
+    def _check_digest(self, host) -> bool:
+        if self.model_digest and host.digest and host.digest != self.model_digest:
+            self.pool.eject(host, "serves a different build of qwen2.5:0.5b than the other hosts")
+            return False
+        return True
+    
+    async def _recover_host(self, host) -> bool:
+        """Health-check callback for a host answering again: rediscover and warm before it rejoins"""
+        if not await self._discover_host(host, force=True):
+            return False
+        try:
+            await self._warm_host(host)
+        except Exception:
+            return False
+        return True
+    
+    async def _discover_model(self, client):
+        """Ask one Ollama host which models are installed and pick qwen2.5:0.5b; returns (model, digest)
+        
+        Raises when the host cannot be reached or does not answer in time."""
+        models = (await client.list()).get('models', [])
+        
+        # Look specifically for qwen2.5:0.5b; entries are dicts or ollama models, both support get()
+        for model in models:
+            if 'qwen2.5:0.5b' in (model.get('model') or model.get('name') or ''):
+                # The digest keys the response cache, so a re-pulled model never serves stale entries
+                print(f" Using qwen2.5:0.5b model")
+                return "qwen2.5:0.5b", model.get('digest')
+        
+        # If qwen2.5:0.5b not found, fail
+        print(" qwen2.5:0.5b model not found")
+        print(" Please install it with: ollama pull qwen2.5:0.5b")
+        return None, None
+    
+    async def analyze_context_agentically(self, bullet_points: str) -> Dict:
         """AGENTIC: Let AI autonomously analyze and decide context"""
         
-        # Enhanced prompt for better models
-        prompt = f"""Analyze this email request and determine the appropriate context:
-
-Email Request:
-{bullet_points}
-
-Please analyze and determine:
-- Purpose: (meeting_request, follow_up, request, complaint, etc.)
-- Tone: (formal, casual, urgent, persuasive, etc.) 
-- Urgency: (low, medium, high, critical)
-- Relationship: (boss, colleague, client, vendor)
-
-Respond in this format:
-Purpose: [your analysis]
-Tone: [your decision]
-Urgency: [your assessment]
-Relationship: [your judgment]"""
-        
-        response = self.client.generate(
-            model=self.model,
-            prompt=prompt,
-            options={"temperature": 0.2, "num_predict": 150}
-        )
+        # Fields the keyword rules are sure of; the model is only asked about the rest
+        known = {}
+        if self.classifier is not None:
+            known = self.classifier.answer(bullet_points)
+            if self.classifier.decided(known):
+                return self.classifier.analysis(known)
         
-        # Parse the response
-        result_text = response['response'].strip()
-        lines = result_text.split('\n')
-        result = {}
+        if self.analysis_index is not None:
+            started = time.perf_counter()
+            similar = self.analysis_index.lookup(bullet_points)
+            if similar is not None:
+                self.metrics.record_call("analysis", {}, time.perf_counter() - started, cached=True)
+                return dict(similar, **known)
+        
+        if known:
+            prompt = self._request_prefix(bullet_points) + analysis_fields_prompt(
+                [field for field in ANALYSIS_FIELDS if field not in known]
+            )
+        else:
+            prompt = self._request_prefix(bullet_points) + render_prompt("analysis")
+        
+        response = await self._generate(
+            prompt,
+            task="analysis"
+        )
         
-        for line in lines:
-            if ':' in line:
-                key, value = line.split(':', 1)
-                result[key.strip().lower()] = value.strip()
+        self._remember_kv_context("analysis", bullet_points, response)
+        result = self._analysis_result(response['response'])
+        if known:
+            result.update(known)
+            result['reasoning'] = (
+                f"AI analyzed: {result['purpose']} with {result['urgency']} urgency "
+                f"(rules decided {', '.join(known)})"
+            )
+        if self.analysis_index is not None:
+            self.analysis_index.add(bullet_points, result)
+        return result
+    
+    def _analysis_result(self, completion: str) -> Dict:
+        """Parse the key: value analysis completion into the context dict"""
+        result = FieldParser().parse(completion.strip()).values
         
         return {
             "purpose": result.get('purpose', 'request'),
@@ -91,26 +701,14 @@ Relationship: [your judgment]"""
             "reasoning": f"AI analyzed: {result.get('purpose', 'request')} with {result.get('urgency', 'medium')} urgency"
         }
     
-    def simple_analysis_prompt(self, bullet_points: str) -> Dict:
+    async def simple_analysis_prompt(self, bullet_points: str) -> Dict:
         """Backup agentic analysis if JSON fails"""
-        prompt = f"""
-        Analyze: {bullet_points}
-        
-        Purpose: [your decision]
-        Tone: [your choice]  
-        Relationship: [your assessment]
-        Urgency: [your judgment]
-        """
+        prompt = self._request_prefix(bullet_points) + render_prompt("simple_analysis")
         
-        response = self.client.generate(model=self.model, prompt=prompt)
+        response = await self._generate(prompt, task="simple_analysis")
         
         # Parse simple format
-        lines = response['response'].split('\n')
-        result = {}
-        for line in lines:
-            if ':' in line:
-                key, value = line.split(':', 1)
-                result[key.strip().lower()] = value.strip()
+        result = FieldParser().parse(response['response']).values
         
         return {
             "purpose": result.get('purpose', 'communication'),
@@ -120,55 +718,70 @@ Relationship: [your judgment]"""
             "formality": "medium"
         }
     
-    def generate_email_agentically(self, bullet_points: str, context: Dict = None) -> Dict:
+    async def generate_email_agentically(self, bullet_points: str, context: Dict = None) -> Dict:
         """AGENTIC: Let AI autonomously craft the entire email strategy and content"""
         
         if not context:
-            context = self.analyze_context_agentically(bullet_points)
+            context = await self.analyze_context_agentically(bullet_points)
         
-        # Enhanced prompt for better models like qwen2.5
-        prompt = f"""Write a professional business email based on these requirements:
-
-Key Points:
-{bullet_points}
-
-Context: {context.get('tone', 'professional')} tone, {context.get('urgency', 'medium')} urgency
-
-Please write a complete email with:
-1. An effective subject line
-2. Proper greeting
-3. Clear, professional body
-4. Appropriate closing
-
-Format:
-Subject: [your subject line]
-
-Dear [Name],
-
-[Your email content here]
+        prompt, kv_context = self._email_prompt(bullet_points, context)
+        response = await self._generate(
+            prompt,
+            task="email",
+            kv_context=kv_context
+        )
+        
+        result = self._email_result(response['response'], context, hit_budget(response))
+        self._remember_kv_context("draft", result['full_email'], response)
+        return result
+    
+    async def stream_email_agentically(self, bullet_points: str, context: Dict = None):
+        """AGENTIC: Streaming twin of generate_email_agentically.
 
-Best regards,
-[Your name]"""
+        Yields {"type": "subject"} as soon as the Subject: line arrives,
+        {"type": "body"} chunks as they are decoded, and a final
+        {"type": "done"} event carrying the same dict the blocking call returns.
+        """
         
-        response = self.client.generate(
-            model=self.model,
-            prompt=prompt,
-            options={"temperature": 0.3, "num_predict": 300}
-        )
+        if not context:
+            context = await self.analyze_context_agentically(bullet_points)
         
-        email_content = response['response'].strip()
+        parser = StreamingEmailParser("Professional Email")
+        prompt, kv_context = self._email_prompt(bullet_points, context)
+        chunks = []
+        final = {}
+        async for chunk in self._generate_stream(
+            prompt,
+            task="email",
+            kv_context=kv_context,
+            final=final
+        ):
+            chunks.append(chunk)
+            for event in parser.feed(chunk):
+                yield event
         
+        for event in parser.finish():
+            yield event
+        result = self._email_result(''.join(chunks), context, hit_budget(final))
+        self._remember_kv_context("draft", result['full_email'], final)
+        yield {"type": "done", "result": result}
+    
+    def _email_prompt(self, bullet_points: str, context: Dict):
+        """Prompt for the main email draft, plus the analysis context tokens to continue from.
+
+        When the analysis of these bullets left its context behind, the draft
+        continues that conversation and only the new instructions are sent.
+        """
+        kv_context = self._recall_kv_context("analysis", bullet_points)
+        opening = "" if kv_context else self._request_prefix(bullet_points)
+        return opening + render_prompt(
+            "email", tone=context.get('tone', 'professional'), urgency=context.get('urgency', 'medium')
+        ), kv_context
+    
+    def _email_result(self, completion: str, context: Dict, truncated: bool = False) -> Dict:
+        """Turn a raw draft completion into the email result dict"""
         # Extract subject and body
-        subject = "Professional Email"
-        body = email_content
-        
-        # Look for subject line
-        lines = email_content.split('\n')
-        for i, line in enumerate(lines):
-            if line.lower().startswith('subject:'):
-                subject = line.replace('Subject:', '').replace('subject:', '').strip()
-                body = '\n'.join(lines[i+1:]).strip()
-                break
+        subject, body = EmailParser("Professional Email").parse(completion.strip()).email()
         
         # Clean up the email body
         if not body.startswith('Dear') and not body.startswith('Hi'):
@@ -180,155 +793,423 @@ Best regards,
             "subject": subject,
             "full_email": full_email,
             "body": body,
-            "ai_reasoning": context.get('reasoning', 'AI autonomous decision')
+            "ai_reasoning": context.get('reasoning', 'AI autonomous decision'),
+            "truncated": truncated
         }
     
-    def generate_smart_subject(self, bullet_points: str, context: Dict) -> str:
+    async def generate_smart_subject(self, bullet_points: str, context: Dict) -> str:
         """AGENTIC: Let AI decide the optimal subject line"""
         
-        prompt = f"""
-        You are a subject line optimization agent. Create the most effective subject line for this email.
-        
-        BULLET POINTS: {bullet_points}
-        CONTEXT: {context['purpose']}, {context['tone']}, {context['urgency']}
-        
-        Consider:
-        - What will get opened first in a busy inbox?
-        - What conveys the right urgency without being spammy?
-        - What gives enough context without being too long?
-        
-        Return ONLY the subject line, no quotes or explanations.
-        """
+        prompt = self._request_prefix(bullet_points) + render_prompt(
+            "subject", purpose=context['purpose'], tone=context['tone'], urgency=context['urgency']
+        )
         
-        response = self.client.generate(model=self.model, prompt=prompt)
+        response = await self._generate(prompt, task="subject")
         return response['response'].strip().strip('"\'')
     
-    def improve_email_agentically(self, email_content: str) -> List[str]:
+    async def improve_email_agentically(self, email_content: str) -> List[str]:
         """AGENTIC: AI analyzes and suggests intelligent improvements"""
         
-        prompt = f"""
-        You are an email optimization agent. Analyze this email and suggest intelligent improvements.
-        
-        EMAIL: {email_content}
+        # A draft we just wrote is already in the model's context; don't send it again
+        kv_context = self._recall_kv_context("draft", email_content)
+        if kv_context:
+            prompt = render_prompt("suggestions_followup")
+        else:
+            prompt = render_prompt("suggestions", email=email_content)
         
-        As an intelligent agent, assess:
-        1. Clarity and effectiveness
-        2. Tone appropriateness  
-        3. Structure and flow
-        4. Professional impact
-        5. Likelihood of achieving goals
+        response = await self._generate(prompt, task="suggestions", kv_context=kv_context)
+        return self._suggestions_result(response['response'])
+    
+    def _suggestions_result(self, completion: str) -> List[str]:
+        """Turn a suggestion list completion into at most five clean suggestions"""
+        return SuggestionParser().parse(completion).suggestions
+    
+    async def generate_tone_variations_agentically(self, bullet_points: str) -> List[Dict]:
+        """AGENTIC: AI autonomously creates variations with different strategic approaches"""
         
-        Provide 3-5 specific, actionable suggestions that demonstrate intelligent analysis.
-        Return as a simple list, one suggestion per line.
+        return list(await asyncio.gather(*[
+            self._tone_variation(bullet_points, approach_name, approach_desc)
+            for approach_name, approach_desc in TONE_APPROACHES
+        ]))
+    
+    async def stream_tone_variations_agentically(self, bullet_points: str):
+        """AGENTIC: Streaming twin of generate_tone_variations_agentically.
+
+        All three approaches decode concurrently; their subject/body events are
+        interleaved and tagged with "approach", then one {"type": "done"} event
+        carries the finished list of variations.
         """
         
-        response = self.client.generate(model=self.model, prompt=prompt)
+        queue = asyncio.Queue()
+        
+        async def pump(approach_name, approach_desc):
+            try:
+                async for event in self._stream_tone_variation(bullet_points, approach_name, approach_desc):
+                    await queue.put(event)
+            finally:
+                queue.put_nowait(None)
         
-        suggestions = [
-            line.strip().lstrip('•-*123456789.').strip() 
-            for line in response['response'].split('\n') 
-            if line.strip()
+        tasks = [
+            asyncio.ensure_future(pump(approach_name, approach_desc))
+            for approach_name, approach_desc in TONE_APPROACHES
         ]
+        variations = {}
+        finished = 0
+        try:
+            while finished < len(tasks):
+                event = await queue.get()
+                if event is None:
+                    finished += 1
+                elif event["type"] == "done":
+                    variations[event["approach"]] = event["result"]
+                else:
+                    yield event
+            for task in tasks:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
         
-        return suggestions[:5]
+        yield {"type": "done", "result": [variations[approach_name] for approach_name, _ in TONE_APPROACHES]}
     
-    def generate_tone_variations_agentically(self, bullet_points: str) -> List[Dict]:
-        """AGENTIC: AI autonomously creates variations with different strategic approaches"""
+    async def _tone_variation(self, bullet_points: str, approach_name: str, approach_desc: str) -> Dict:
+        """Write one strategic variation"""
+        response = await self._generate(
+            self._variation_prompt(bullet_points, approach_desc),
+            task="variation"
+        )
         
-        variations = []
-        approaches = [
-            ("FORMAL", "professional and corporate"),
-            ("FRIENDLY", "warm and collaborative"), 
-            ("URGENT", "direct and action-oriented")
-        ]
+        return self._variation_result(response['response'], approach_name, hit_budget(response))
+    
+    async def _stream_tone_variation(self, bullet_points: str, approach_name: str, approach_desc: str):
+        """Stream one strategic variation, tagging every event with its approach"""
+        parser = StreamingEmailParser(f"{approach_name.title()} Email")
+        chunks = []
+        final = {}
+        async for chunk in self._generate_stream(
+            self._variation_prompt(bullet_points, approach_desc),
+            task="variation",
+            final=final
+        ):
+            chunks.append(chunk)
+            for event in parser.feed(chunk):
+                yield dict(event, approach=approach_name)
         
-        for approach_name, approach_desc in approaches:
-            prompt = f"""Write a {approach_desc} email from these points:
-
-{bullet_points}
-
-Make it {approach_desc} style.
-
-Subject: [write subject]
-
-Dear [Name],
-
-[Write email body]
-
-Best regards,
-[Your name]
-
-Write the email:"""
-            
-            response = self.client.generate(
-                model=self.model,
-                prompt=prompt,
-                options={"temperature": 0.4, "num_predict": 200}
-            )
-            
-            email_content = response['response'].strip()
-            
-            # Extract subject
-            subject = f"{approach_name.title()} Email"
-            body = email_content
-            
-            lines = email_content.split('\n')
-            for i, line in enumerate(lines):
-                if line.lower().startswith('subject:'):
-                    subject = line.replace('Subject:', '').replace('subject:', '').strip()
-                    body = '\n'.join(lines[i+1:]).strip()
-                    break
-            
-            full_email = f"Subject: {subject}\n\n{body}"
-            
-            variations.append({
-                "subject": subject,
-                "full_email": full_email,
-                "body": body,
-                "tone_used": approach_name.lower(),
-                "approach": approach_name
-            })
+        for event in parser.finish():
+            yield dict(event, approach=approach_name)
+        yield {"type": "done", "approach": approach_name, "result": self._variation_result(''.join(chunks), approach_name, hit_budget(final))}
+    
+    def _variation_prompt(self, bullet_points: str, approach_desc: str) -> str:
+        """Prompt for one tone variation"""
+        return self._request_prefix(bullet_points) + render_prompt("variation", approach=approach_desc)
+    
+    def _variation_result(self, completion: str, approach_name: str, truncated: bool = False) -> Dict:
+        """Turn a raw variation completion into the variation dict"""
+        # Extract subject
+        subject, body = EmailParser(f"{approach_name.title()} Email").parse(completion.strip()).email()
+        
+        full_email = f"Subject: {subject}\n\n{body}"
         
-        return variations
+        return {
+            "subject": subject,
+            "full_email": full_email,
+            "body": body,
+            "tone_used": approach_name.lower(),
+            "approach": approach_name,
+            "truncated": truncated
+        }
     
-    def fallback_variations(self, bullet_points: str) -> List[Dict]:
+    async def fallback_variations(self, bullet_points: str) -> List[Dict]:
         """Create variations if parsing fails"""
         tones = ["formal", "persuasive", "collaborative"]
-        variations = []
         
-        for tone in tones:
+        async def variation(tone):
             context = {"tone": tone, "purpose": "communication", "relationship": "colleague"}
-            email = self.generate_email_agentically(bullet_points, context)
+            email = await self.generate_email_agentically(bullet_points, context)
             email['tone_used'] = tone
-            variations.append(email)
+            return email
         
-        return variations
+        return list(await asyncio.gather(*[variation(tone) for tone in tones]))
     
-    def autonomous_email_strategy(self, bullet_points: str) -> Dict:
-        """AGENTIC: AI creates complete communication strategy"""
+    async def generate_email_structured(self, bullet_points: str) -> Dict:
+        """AGENTIC: Analysis, email and suggestions from a single JSON-constrained call.
+
+        Falls back to the multi-call analyze -> draft -> improve path only
+        when the model's JSON is unparseable or fails the schema check.
+        """
         
-        prompt = f"""
-        You are a strategic communication agent. Develop a complete email strategy for these bullet points:
+        prompt = self._request_prefix(bullet_points) + render_prompt("structured")
+        
+        response = await self._generate(
+            prompt,
+            task="structured",
+            format=STRUCTURED_EMAIL_SCHEMA
+        )
         
-        BULLET POINTS: {bullet_points}
+        try:
+            fields = _validate_structured(json.loads(response['response']))
+        except (ValueError, TypeError) as e:
+            print(f" Structured generation unusable ({e}), falling back to multi-call path")
+            analysis = await self.analyze_context_agentically(bullet_points)
+            email = await self.generate_email_agentically(bullet_points, analysis)
+            suggestions = await self.improve_email_agentically(email.get('full_email', ''))
+            return {"analysis": analysis, "data": email, "suggestions": suggestions, "structured": False}
         
-        AUTONOMOUS STRATEGIC ANALYSIS:
-        1. What is the sender trying to achieve?
-        2. What obstacles might prevent success?
-        3. What approach will be most effective?
-        4. What follow-up actions should be planned?
-        5. How can this email strengthen the relationship?
+        analysis = self._analysis_result('\n'.join(
+            f"{key}: {fields[key]}" for key in ("purpose", "tone", "urgency", "relationship")
+        ))
+        email = self._email_result(f"Subject: {fields['subject']}\n\n{fields['body']}", analysis)
+        suggestions = self._suggestions_result('\n'.join(fields['suggestions']))
+        return {"analysis": analysis, "data": email, "suggestions": suggestions, "structured": True}
+    
+    async def generate_email_package(self, bullet_points: str) -> Dict:
+        """AGENTIC: Analysis first, then draft and subject side by side, then suggestions"""
+        analysis = await self.analyze_context_agentically(bullet_points)
         
-        Provide your strategic assessment and recommendations.
-        """
+        email, subject = await asyncio.gather(
+            self.generate_email_agentically(bullet_points, analysis),
+            self.generate_smart_subject(bullet_points, analysis)
+        )
+        suggestions = await self.improve_email_agentically(email.get('full_email', ''))
+        
+        return {
+            "analysis": analysis,
+            "data": email,
+            "subject": subject,
+            "suggestions": suggestions
+        }
+    
+    async def autonomous_email_strategy(self, bullet_points: str) -> Dict:
+        """AGENTIC: AI creates complete communication strategy"""
+        
+        prompt = self._request_prefix(bullet_points) + render_prompt("strategy")
         
-        response = self.client.generate(model=self.model, prompt=prompt)
+        response = await self._generate(prompt, task="strategy")
         
         return {
             "strategy_analysis": response['response'],
+            "truncated": hit_budget(response),
             "timestamp": datetime.now().isoformat()
         }
 
+
+def _response_dict(response) -> Dict:
+    """Plain, JSON-serialisable copy of an ollama response"""
+    if hasattr(response, 'model_dump'):
+        return response.model_dump(mode='json', exclude_none=True)
+    return dict(response)
+
+
+class _LoopThread:
+    """Private event loop on a daemon thread so sync callers can drive the async agent"""
+    
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="email-agent-loop", daemon=True)
+        self.thread.start()
+    
+    def run(self, coro):
+        """Run a coroutine on the loop and block the calling thread for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+    
+    def submit(self, coro):
+        """Start a coroutine on the loop without waiting; returns a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+    
+    def iterate(self, agen):
+        """Drive an async generator from a sync caller; closing early closes the generator"""
+        try:
+            while True:
+                try:
+                    yield self.run(agen.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            # Straight to the loop, so a cancelled runner still closes its generators
+            asyncio.run_coroutine_threadsafe(agen.aclose(), self.loop).result()
+
+
+class _CancellableRunner(_LoopThread):
+    """Front of a _LoopThread whose calls can all be cancelled at once, e.g. an abandoned request's"""
+    
+    def __init__(self, runner: _LoopThread):
+        self.loop = runner.loop
+        self.thread = runner.thread
+        self.cancelled = False
+        self._futures = set()
+        self._lock = threading.Lock()
+    
+    def run(self, coro):
+        future = self.submit(coro)
+        try:
+            return future.result()
+        finally:
+            with self._lock:
+                self._futures.discard(future)
+    
+    def submit(self, coro):
+        with self._lock:
+            if self.cancelled:
+                coro.close()
+                raise concurrent.futures.CancelledError()
+            future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+            self._futures.add(future)
+        return future
+    
+    def cancel(self):
+        """Cancel every call in progress and refuse new ones"""
+        with self._lock:
+            self.cancelled = True
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+
+
+class AgenticEmailAgent:
+    """Blocking facade over AsyncAgenticEmailAgent.
+
+    Every method is a thin wrapper that runs its async twin on a private
+    event loop, so the pooled AsyncClient connections are reused and calls
+    made from several threads share one concurrency limit. That makes a
+    single instance safe to share across every session in the process.
+    """
+    
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        cache: ResponseCache = None,
+        use_cache: bool = True,
+        host=None,
+        reuse_context: bool = True,
+        keep_alive=DEFAULT_KEEP_ALIVE,
+        warm_up: bool = True,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        analysis_index: AnalysisIndex = None,
+        reuse_analysis: bool = True,
+        fast_classify: bool = True,
+        call_timeout: float = DEFAULT_CALL_TIMEOUT_SECONDS,
+        hedge: bool = None
+    ):
+        self._runner = _LoopThread()
+        self.async_agent = AsyncAgenticEmailAgent(
+            max_concurrency=max_concurrency, cache=cache, use_cache=use_cache, host=host,
+            reuse_context=reuse_context, keep_alive=keep_alive, max_queue=max_queue,
+            analysis_index=analysis_index, reuse_analysis=reuse_analysis, fast_classify=fast_classify,
+            call_timeout=call_timeout, hedge=hedge
+        )
+        self._runner.run(self.async_agent.setup())
+        self._warmup = self._runner.submit(self.async_agent.warm_up()) if warm_up else None
+        self.model = self.async_agent.model
+        self.cache = self.async_agent.cache
+        self.analysis_index = self.async_agent.analysis_index
+        self.classifier = self.async_agent.classifier
+        self.metrics = self.async_agent.metrics
+    
+    def with_budgets(self, budgets: TokenBudgets):
+        """Blocking view of this agent that decodes under different token budgets"""
+        view = copy.copy(self)
+        view.async_agent = self.async_agent.with_budgets(budgets)
+        return view
+    
+    def for_session(self, session):
+        """Blocking view of this agent whose calls queue fairly under `session`"""
+        view = copy.copy(self)
+        view.async_agent = self.async_agent.for_session(session)
+        return view
+    
+    def with_deadline(self, seconds: float):
+        """Blocking view whose calls all give up `seconds` from now with DeadlineExceeded"""
+        view = copy.copy(self)
+        view.async_agent = self.async_agent.with_deadline(seconds)
+        return view
+    
+    def cancellable(self):
+        """Blocking view whose cancel() aborts every call made through it, down to the HTTP request"""
+        view = copy.copy(self)
+        view._runner = _CancellableRunner(self._runner)
+        return view
+    
+    def as_background(self):
+        """Blocking view for speculative work: lowest scheduler priority, and cancel() stops it"""
+        view = self.cancellable()
+        view.async_agent = self.async_agent.as_background()
+        return view
+    
+    def cancel(self):
+        """Cancel everything a cancellable or background view is running or waiting for"""
+        if isinstance(self._runner, _CancellableRunner):
+            self._runner.cancel()
+    
+    def queue_status(self) -> Dict:
+        """This view's session's place in the scheduler queue and estimated wait"""
+        return self._runner.run(self.async_agent.queue_status())
+    
+    def find_working_model(self, force: bool = False):
+        """Find qwen2.5:0.5b model specifically"""
+        return self._runner.run(self.async_agent.find_working_model(force))
+    
+    def health(self) -> Dict:
+        """Readiness status; re-warms in the background if Ollama has unloaded the model"""
+        status = self._runner.run(self.async_agent.health())
+        warming = self._warmup is not None and not self._warmup.done()
+        if status["resident"] is False and status["state"] != "error" and not warming:
+            self._warmup = self._runner.submit(self.async_agent.warm_up())
+            status["state"] = "warming"
+        return status
+    
+    def refresh_model(self, force: bool = False):
+        """Refresh the discovered model if the cached discovery has expired"""
+        self.model = self._runner.run(self.async_agent.refresh_model(force))
+        return self.model
+    
+    def analyze_context_agentically(self, bullet_points: str) -> Dict:
+        """AGENTIC: Let AI autonomously analyze and decide context"""
+        return self._runner.run(self.async_agent.analyze_context_agentically(bullet_points))
+    
+    def simple_analysis_prompt(self, bullet_points: str) -> Dict:
+        """Backup agentic analysis if JSON fails"""
+        return self._runner.run(self.async_agent.simple_analysis_prompt(bullet_points))
+    
+    def generate_email_agentically(self, bullet_points: str, context: Dict = None) -> Dict:
+        """AGENTIC: Let AI autonomously craft the entire email strategy and content"""
+        return self._runner.run(self.async_agent.generate_email_agentically(bullet_points, context))
+    
+    def stream_email_agentically(self, bullet_points: str, context: Dict = None):
+        """AGENTIC: Yield subject/body events as the draft decodes, then a done event"""
+        return self._runner.iterate(self.async_agent.stream_email_agentically(bullet_points, context))
+    
+    def generate_smart_subject(self, bullet_points: str, context: Dict) -> str:
+        """AGENTIC: Let AI decide the optimal subject line"""
+        return self._runner.run(self.async_agent.generate_smart_subject(bullet_points, context))
+    
+    def improve_email_agentically(self, email_content: str) -> List[str]:
+        """AGENTIC: AI analyzes and suggests intelligent improvements"""
+        return self._runner.run(self.async_agent.improve_email_agentically(email_content))
+    
+    def generate_tone_variations_agentically(self, bullet_points: str) -> List[Dict]:
+        """AGENTIC: AI autonomously creates variations with different strategic approaches"""
+        return self._runner.run(self.async_agent.generate_tone_variations_agentically(bullet_points))
+    
+    def stream_tone_variations_agentically(self, bullet_points: str):
+        """AGENTIC: Yield approach-tagged subject/body events for all variations, then a done event"""
+        return self._runner.iterate(self.async_agent.stream_tone_variations_agentically(bullet_points))
+    
+    def fallback_variations(self, bullet_points: str) -> List[Dict]:
+        """Create variations if parsing fails"""
+        return self._runner.run(self.async_agent.fallback_variations(bullet_points))
+    
+    def generate_email_structured(self, bullet_points: str) -> Dict:
+        """AGENTIC: Analysis, email and suggestions from one JSON-constrained model call"""
+        return self._runner.run(self.async_agent.generate_email_structured(bullet_points))
+    
+    def generate_email_package(self, bullet_points: str) -> Dict:
+        """AGENTIC: Analysis, draft, subject and suggestions in one call"""
+        return self._runner.run(self.async_agent.generate_email_package(bullet_points))
+    
+    def autonomous_email_strategy(self, bullet_points: str) -> Dict:
+        """AGENTIC: AI creates complete communication strategy"""
+        return self._runner.run(self.async_agent.autonomous_email_strategy(bullet_points))
+
 # Test the agentic behavior
 def test_agentic_agent():
     try:
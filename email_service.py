@@ -0,0 +1,229 @@
+"""Headless HTTP service for the email agent.
+
+One AsyncAgenticEmailAgent, with its connection pool, response cache and
+fair scheduler, serves every request in the process. Endpoints take and
+return JSON; the /stream variants send the agent's subject/body/done
+events as server-sent events.
+
+    POST /analyze              {"bullet_points"}
+    POST /email                {"bullet_points", "context"?}
+    POST /email/stream         {"bullet_points", "context"?}          (SSE)
+    POST /improve              {"email"}
+    POST /variations           {"bullet_points"}
+    POST /variations/stream    {"bullet_points"}                       (SSE)
+    POST /strategy             {"bullet_points"}
+    POST /structured           {"bullet_points"}
+    GET  /health, GET /queue?session=..., GET /metrics
+
+Every POST also accepts "session" (fair-queuing id), "creativity" /
+"max_length" (token budgets, as the UI sliders), "background" (true
+for speculative work, queued behind interactive calls) and
+"deadline_seconds" (time limit for every model call of the request). A
+full queue answers 503 with Retry-After, a missed deadline 504.
+
+Usage:
+    python email_service.py --port 8600
+"""
+import argparse
+import asyncio
+import json
+import math
+from contextlib import asynccontextmanager
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from deadlines import DeadlineExceeded
+from email_agent import AsyncAgenticEmailAgent, DEFAULT_MAX_CONCURRENCY
+from scheduler import DEFAULT_MAX_QUEUE, SchedulerBusy
+from token_budgets import DEFAULT_CREATIVITY, DEFAULT_MAX_LENGTH, TokenBudgets
+
+DEFAULT_PORT = 8600
+
+
+class RequestError(Exception):
+    """Malformed request body; answered with 400"""
+
+
+def create_app(
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    max_queue: int = DEFAULT_MAX_QUEUE,
+    host=None,
+    use_cache: bool = True,
+    warm_up: bool = True
+) -> Starlette:
+    """Build the service; the agent is created and warmed when the app starts"""
+    state = {"agent": None, "warmup": None}
+
+    @asynccontextmanager
+    async def lifespan(app):
+        agent = AsyncAgenticEmailAgent(
+            max_concurrency=max_concurrency, use_cache=use_cache, host=host, max_queue=max_queue
+        )
+        await agent.setup()
+        state["agent"] = agent
+        if warm_up:
+            state["warmup"] = asyncio.ensure_future(agent.warm_up())
+        yield
+        if state["warmup"]:
+            state["warmup"].cancel()
+
+    async def request_agent(request: Request):
+        """Parse the JSON body and return (agent view for this request, body)"""
+        try:
+            body = await request.json()
+        except ValueError:
+            raise RequestError("body must be JSON")
+        if not isinstance(body, dict):
+            raise RequestError("body must be a JSON object")
+
+        agent = state["agent"]
+        if body.get("session") is not None:
+            agent = agent.for_session(str(body["session"]))
+        if "creativity" in body or "max_length" in body:
+            try:
+                budgets = TokenBudgets(
+                    float(body.get("creativity", DEFAULT_CREATIVITY)),
+                    int(body.get("max_length", DEFAULT_MAX_LENGTH))
+                )
+            except (TypeError, ValueError):
+                raise RequestError("'creativity' and 'max_length' must be numbers")
+            agent = agent.with_budgets(budgets)
+        if body.get("background"):
+            agent = agent.as_background()
+        if body.get("deadline_seconds") is not None:
+            try:
+                agent = agent.with_deadline(float(body["deadline_seconds"]))
+            except (TypeError, ValueError):
+                raise RequestError("'deadline_seconds' must be a number")
+        if body.get("context") is not None and not isinstance(body["context"], dict):
+            raise RequestError("'context' must be an object or null")
+        return agent, body
+
+    def field(body, name: str):
+        value = body.get(name)
+        if not isinstance(value, str) or not value.strip():
+            raise RequestError(f"'{name}' must be a non-empty string")
+        return value
+
+    def endpoint(call):
+        """JSON endpoint around `call(agent, body)`"""
+        async def handle(request: Request):
+            try:
+                agent, body = await request_agent(request)
+                return JSONResponse(await call(agent, body))
+            except RequestError as e:
+                return JSONResponse({"error": str(e)}, status_code=400)
+            except SchedulerBusy as e:
+                return busy_response(e)
+            except DeadlineExceeded as e:
+                return JSONResponse({"error": str(e)}, status_code=504)
+            except Exception as e:
+                return JSONResponse({"error": str(e)}, status_code=502)
+        return handle
+
+    def stream_endpoint(stream):
+        """Server-sent events endpoint around the async generator `stream(agent, body)`"""
+        async def handle(request: Request):
+            try:
+                agent, body = await request_agent(request)
+                events = stream(agent, body)
+                # Pull the first event now so a full queue or bad input still gets a proper status code
+                first = await events.__anext__()
+            except RequestError as e:
+                return JSONResponse({"error": str(e)}, status_code=400)
+            except SchedulerBusy as e:
+                return busy_response(e)
+            except DeadlineExceeded as e:
+                return JSONResponse({"error": str(e)}, status_code=504)
+            except Exception as e:
+                return JSONResponse({"error": str(e)}, status_code=502)
+
+            async def sse():
+                try:
+                    yield sse_event(first)
+                    async for event in events:
+                        yield sse_event(event)
+                except DeadlineExceeded as e:
+                    yield sse_event({"type": "error", "error": str(e), "status": 504})
+                except Exception as e:
+                    yield sse_event({"type": "error", "error": str(e)})
+                finally:
+                    # A client hanging up lands here; closing stops (or detaches from) the generation
+                    await events.aclose()
+
+            return StreamingResponse(sse(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+        return handle
+
+    async def health(request: Request):
+        agent = state["agent"]
+        status = await agent.health()
+        warming = state["warmup"] is not None and not state["warmup"].done()
+        if status["resident"] is False and status["state"] != "error" and not warming:
+            # Ollama has unloaded the model; reload it before the next request pays for it
+            state["warmup"] = asyncio.ensure_future(agent.warm_up())
+            status["state"] = "warming"
+        return JSONResponse(status)
+
+    async def queue(request: Request):
+        session = request.query_params.get("session")
+        return JSONResponse(await state["agent"].for_session(session).queue_status())
+
+    async def metrics(request: Request):
+        return PlainTextResponse(state["agent"].metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    routes = [
+        Route("/analyze", endpoint(lambda agent, body: agent.analyze_context_agentically(field(body, "bullet_points"))), methods=["POST"]),
+        Route("/email", endpoint(
+            lambda agent, body: agent.generate_email_agentically(field(body, "bullet_points"), body.get("context"))
+        ), methods=["POST"]),
+        Route("/email/stream", stream_endpoint(
+            lambda agent, body: agent.stream_email_agentically(field(body, "bullet_points"), body.get("context"))
+        ), methods=["POST"]),
+        Route("/improve", endpoint(lambda agent, body: agent.improve_email_agentically(field(body, "email"))), methods=["POST"]),
+        Route("/variations", endpoint(
+            lambda agent, body: agent.generate_tone_variations_agentically(field(body, "bullet_points"))
+        ), methods=["POST"]),
+        Route("/variations/stream", stream_endpoint(
+            lambda agent, body: agent.stream_tone_variations_agentically(field(body, "bullet_points"))
+        ), methods=["POST"]),
+        Route("/strategy", endpoint(lambda agent, body: agent.autonomous_email_strategy(field(body, "bullet_points"))), methods=["POST"]),
+        Route("/structured", endpoint(lambda agent, body: agent.generate_email_structured(field(body, "bullet_points"))), methods=["POST"]),
+        Route("/health", health),
+        Route("/queue", queue),
+        Route("/metrics", metrics),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
+def busy_response(error: SchedulerBusy) -> JSONResponse:
+    return JSONResponse(
+        {"error": str(error), "queued": error.queued, "eta_seconds": error.eta_seconds},
+        status_code=503,
+        headers={"Retry-After": str(max(1, math.ceil(error.eta_seconds)))}
+    )
+
+
+def sse_event(event) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the email agent over HTTP")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--ollama-host", help="Ollama URL, or several separated by commas (default: EMAIL_AGENT_OLLAMA_HOSTS, OLLAMA_HOST or localhost)")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help="model calls in flight at once per Ollama host")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE, help="waiting calls before answering 503")
+    args = parser.parse_args(argv)
+
+    app = create_app(args.max_concurrency, args.max_queue, args.ollama_host)
+    # A single process: the one agent, pool and cache are shared by every request it serves
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
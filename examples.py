@@ -0,0 +1,8 @@
+"""Built-in example scenarios: the UI's example buttons, also replayed by load_test.py"""
+
+EXAMPLES = {
+    "📅 Meeting Request": "• Meeting with Sarah next Friday\n• Discuss Q4 budget planning\n• Need her input on new proposals\n• Bring last quarter's financial reports",
+    "📋 Urgent Request": "• Need immediate approval for software purchase\n• $5,000 budget required for team tools\n• Will significantly improve productivity\n• Decision needed by end of week",
+    "📧 Follow-up": "• Following up on yesterday's strategy call\n• Discussed new marketing initiatives\n• Need decision on budget allocation\n• Timeline is critical for Q1 launch",
+    "🤝 Thank You": "• Thank you for the excellent presentation\n• Learned valuable insights about process improvement\n• Would like to discuss implementation\n• Coffee meeting next week?"
+}
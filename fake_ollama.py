@@ -0,0 +1,305 @@
+"""Local stand-in for the Ollama HTTP API, used by the benchmarks.
+
+Serves /api/tags, /api/ps, /api/show and /api/generate (blocking and
+streamed) with canned completions and a configurable per-token latency,
+and logs every request so callers can count model calls. With
+`num_parallel`, only that many generations decode at once and the rest
+wait, as with OLLAMA_NUM_PARALLEL on a real server; 1 serializes them.
+
+Usage:
+    python fake_ollama.py --port 11434 --token-latency 0.02 --num-parallel 1
+"""
+import argparse
+import json
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+from prompts import estimate_tokens
+
+FAKE_MODEL = "qwen2.5:0.5b"
+FAKE_DIGEST = "fake0000000000000000000000000000000000000000000000000000000000"
+
+# (prompt substring, completion); first match wins, the last entry is the default
+CANNED_RESPONSES = [
+    ("subject line optimization", "Q4 Budget Review: Input Needed Before Friday"),
+    ("email optimization agent", (
+        "1. Lead with the decision you need\n"
+        "2. State the deadline in the first paragraph\n"
+        "3. Attach the financial reports\n"
+        "4. Offer two concrete meeting slots"
+    )),
+    ("strategic communication agent", (
+        "Goal: secure budget approval before the deadline.\n"
+        "Obstacles: competing priorities and limited time.\n"
+        "Approach: be concise, quantify impact, propose next steps.\n"
+        "Follow-up: confirm the meeting the day before."
+    )),
+    ("analyze", "Purpose: meeting_request\nTone: formal\nUrgency: high\nRelationship: boss"),
+    ("", (
+        "Subject: Q4 Budget Planning Meeting\n\n"
+        "Dear Sarah,\n\n"
+        "I would like to meet next Friday to discuss the Q4 budget and hear your input on the new proposals. "
+        "I will bring last quarter's financial reports.\n\n"
+        "Best regards,\n[Your name]"
+    )),
+]
+
+CANNED_JSON_RESPONSE = json.dumps({
+    "purpose": "meeting_request",
+    "tone": "formal",
+    "urgency": "high",
+    "relationship": "boss",
+    "subject": "Q4 Budget Planning Meeting",
+    "body": "Dear Sarah,\n\nCould we meet next Friday to review the Q4 budget?\n\nBest regards,\n[Your name]",
+    "suggestions": ["State the deadline up front", "Attach the financial reports"]
+})
+
+TOKEN_PATTERN = re.compile(r"\S+\s*|\s+")
+
+
+def count_tokens(text: str) -> int:
+    """Rough token estimate good enough for fake timing fields; whitespace costs tokens, as with a real tokenizer"""
+    return max(1, estimate_tokens(text))
+
+
+class FakeOllamaServer:
+    """In-process Ollama stand-in running on a background thread"""
+
+    def __init__(
+        self,
+        port: int = 0,
+        token_latency: float = 0.0,
+        prompt_token_latency: float = 0.0,
+        responses: List = None,
+        json_response: str = CANNED_JSON_RESPONSE,
+        model: str = FAKE_MODEL,
+        num_parallel: int = None,
+        digest: str = FAKE_DIGEST
+    ):
+        self.token_latency = token_latency
+        self.prompt_token_latency = prompt_token_latency
+        self.responses = responses or CANNED_RESPONSES
+        self.json_response = json_response
+        self.model = model
+        self.digest = digest
+        self.num_parallel = num_parallel
+        # Decoding slots; None decodes every request at once
+        self._slots = threading.Semaphore(num_parallel) if num_parallel else None
+        self.requests = []
+        self._connections = set()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def host(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop listening and drop open keep-alive connections too, as a real server going down would"""
+        self._server.shutdown()
+        self._server.server_close()
+        with self._lock:
+            connections, self._connections = list(self._connections), set()
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset(self):
+        """Forget logged requests"""
+        with self._lock:
+            self.requests = []
+
+    def generate_calls(self) -> List[Dict]:
+        """Logged /api/generate requests"""
+        with self._lock:
+            return [entry for entry in self.requests if entry["path"] == "/api/generate"]
+
+    def completion_for(self, body: Dict) -> str:
+        """Pick the canned completion for a generate request"""
+        if body.get("format"):
+            return self.json_response
+        prompt = body.get("prompt", "").lower()
+        for needle, completion in self.responses:
+            if needle in prompt:
+                return completion
+        return self.responses[-1][1]
+
+    def _log(self, entry: Dict):
+        with self._lock:
+            self.requests.append(entry)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; without this Nagle adds ~40 ms per call
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server._connections.add(self.connection)
+
+            def finish(self):
+                with server._lock:
+                    server._connections.discard(self.connection)
+                super().finish()
+
+            def do_GET(self):
+                started = time.perf_counter()
+                if self.path == "/api/tags":
+                    self._send_json({"models": [{"name": server.model, "model": server.model, "digest": server.digest}]})
+                elif self.path == "/api/ps":
+                    self._send_json({"models": [{"name": server.model, "model": server.model, "digest": server.digest}]})
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+                server._log({"path": self.path, "start": started, "end": time.perf_counter()})
+
+            def do_POST(self):
+                started = time.perf_counter()
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+
+                queued = 0.0
+                if self.path == "/api/generate":
+                    queued = self._generate(body)
+                elif self.path == "/api/show":
+                    self._send_json({"modelfile": "", "details": {"family": "qwen2"}})
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+                server._log({
+                    "path": self.path, "start": started, "end": time.perf_counter(), "queued": queued, "body": body
+                })
+
+            def _generate(self, body: Dict) -> float:
+                """Answer a generate request; returns the seconds it waited for a decoding slot"""
+                if not body.get("prompt"):
+                    # Ollama's load-only request: nothing to decode
+                    self._send_json({"model": body.get("model", server.model), "response": "", "done": True,
+                                     "done_reason": "load", "load_duration": 0})
+                    return 0.0
+
+                waited = time.perf_counter()
+                if server._slots is not None:
+                    server._slots.acquire()
+                try:
+                    queued = time.perf_counter() - waited
+                    self._decode(body)
+                finally:
+                    if server._slots is not None:
+                        server._slots.release()
+                return queued
+
+            def _decode(self, body: Dict):
+                completion = server.completion_for(body)
+                options = body.get("options") or {}
+                for stop in options.get("stop") or []:
+                    if stop in completion:
+                        completion = completion[:completion.index(stop)]
+                limit = options.get("num_predict")
+                tokens = TOKEN_PATTERN.findall(completion)
+                if limit and limit > 0:
+                    tokens = tokens[:limit]
+                prompt_tokens = count_tokens(body.get("prompt", ""))
+
+                prompt_started = time.perf_counter()
+                time.sleep(server.prompt_token_latency * prompt_tokens)
+                prompt_seconds = time.perf_counter() - prompt_started
+
+                final = {
+                    "model": body.get("model", server.model),
+                    "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "done": True,
+                    "done_reason": "length" if limit and len(tokens) >= limit else "stop",
+                    "load_duration": 0,
+                    "prompt_eval_count": prompt_tokens,
+                    "prompt_eval_duration": int(prompt_seconds * 1e9),
+                    "eval_count": len(tokens),
+                    "context": list(range(prompt_tokens + len(tokens))),
+                }
+
+                decode_started = time.perf_counter()
+                if body.get("stream", True):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    try:
+                        for token in tokens:
+                            time.sleep(server.token_latency)
+                            self._send_chunk({"model": final["model"], "response": token, "done": False})
+                        final["response"] = ""
+                        final["eval_duration"] = int((time.perf_counter() - decode_started) * 1e9)
+                        final["total_duration"] = final["eval_duration"] + final["prompt_eval_duration"]
+                        self._send_chunk(final)
+                        self.wfile.write(b"0\r\n\r\n")
+                    except (BrokenPipeError, ConnectionResetError):
+                        # Client hung up mid-stream, which is how cancellation looks to Ollama
+                        pass
+                else:
+                    time.sleep(server.token_latency * len(tokens))
+                    final["response"] = "".join(tokens)
+                    final["eval_duration"] = int((time.perf_counter() - decode_started) * 1e9)
+                    final["total_duration"] = final["eval_duration"] + final["prompt_eval_duration"]
+                    try:
+                        self._send_json(final)
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass
+
+            def _send_json(self, payload: Dict, status: int = 200):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_chunk(self, payload: Dict):
+                data = (json.dumps(payload) + "\n").encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a fake Ollama server with canned responses")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--token-latency", type=float, default=0.02, help="seconds per decoded token")
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0, help="seconds per prompt token")
+    parser.add_argument("--num-parallel", type=int, help="generations decoded at once (default: unlimited)")
+    args = parser.parse_args(argv)
+
+    server = FakeOllamaServer(args.port, args.token_latency, args.prompt_token_latency, num_parallel=args.num_parallel)
+    print(f" Fake Ollama listening on {server.host}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List
+
+
+EVENT_POLL_SECONDS = 0.05
+
+
+class PlanTask:
+    """A single LLM task in a generation plan.
+
+    `stream`, when given, is used instead of `run` if the caller wants
+    progressive events; it must yield event dicts ending with a
+    {"type": "done", "result": ...} event. With `merge_result`, the task
+    returns a dict of several outputs that are merged into the plan results.
+    `deferred` marks a secondary output nothing else depends on, which
+    run_mode can leave out for the caller to compute later with run_deferred.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable,
+        depends_on: List[str] = None,
+        stream: Callable = None,
+        merge_result: bool = False,
+        deferred: bool = False
+    ):
+        self.name = name
+        self.run = run
+        self.depends_on = list(depends_on or [])
+        self.stream = stream
+        self.merge_result = merge_result
+        self.deferred = deferred
+
+
+class GenerationPlan:
+    """Small dependency graph of agent calls for one generation mode.
+
+    Each task runs exactly once, as soon as everything it depends on has
+    finished, so shared nodes (context analysis) are never repeated and
+    independent nodes (strategy and draft) run side by side.
+    """
+
+    def __init__(self, tasks: List[PlanTask]):
+        self.tasks = {task.name: task for task in tasks}
+        self._check_graph()
+
+    def _check_graph(self):
+        """Reject unknown dependencies, dependencies on deferred tasks and cycles up front"""
+        for task in self.tasks.values():
+            for dep in task.depends_on:
+                if dep not in self.tasks:
+                    raise ValueError(f"Task '{task.name}' depends on unknown task '{dep}'")
+                if self.tasks[dep].deferred:
+                    raise ValueError(f"Task '{task.name}' depends on deferred task '{dep}'")
+
+        visited, in_progress = set(), set()
+
+        def visit(name):
+            if name in in_progress:
+                raise ValueError(f"Dependency cycle detected at task '{name}'")
+            if name in visited:
+                return
+            in_progress.add(name)
+            for dep in self.tasks[name].depends_on:
+                visit(dep)
+            in_progress.discard(name)
+            visited.add(name)
+
+        for name in self.tasks:
+            visit(name)
+
+    def run(
+        self,
+        agent,
+        bullet_points: str,
+        max_workers: int = None,
+        on_event: Callable = None,
+        on_tick: Callable = None,
+        skip_deferred: bool = False
+    ) -> Dict[str, Any]:
+        """Execute the plan and return every task's result keyed by task name.
+
+        With `on_event`, streaming tasks forward their events to it as
+        on_event(task_name, event), always on the calling thread. `on_tick`
+        is called there too every EVENT_POLL_SECONDS while tasks run, e.g.
+        to refresh a progress display. `skip_deferred` leaves deferred tasks out.
+        If the run is abandoned (a task fails, or on_event/on_tick raise as
+        Streamlit does when the user moves on), a cancellable agent view is
+        cancelled so the calls still running stop at once.
+        """
+        results = {}
+        pending = {name: task for name, task in self.tasks.items() if not (skip_deferred and task.deferred)}
+        running = {}
+        events = queue.Queue()
+
+        def drain_events():
+            while True:
+                try:
+                    name, event = events.get_nowait()
+                except queue.Empty:
+                    return
+                on_event(name, event)
+
+        with ThreadPoolExecutor(max_workers=max_workers or len(self.tasks)) as pool:
+            try:
+                while pending or running:
+                    ready = [
+                        task for task in pending.values()
+                        if all(dep in results for dep in task.depends_on)
+                    ]
+                    for task in ready:
+                        del pending[task.name]
+                        deps = {dep: results[dep] for dep in task.depends_on}
+                        if on_event and task.stream:
+                            future = pool.submit(_consume_stream, task, agent, bullet_points, deps, events)
+                        else:
+                            future = pool.submit(task.run, agent, bullet_points, deps)
+                        running[future] = task.name
+
+                    done, _ = wait(
+                        running,
+                        timeout=EVENT_POLL_SECONDS if on_event or on_tick else None,
+                        return_when=FIRST_COMPLETED
+                    )
+                    if on_event:
+                        drain_events()
+                    if on_tick:
+                        on_tick()
+                    for future in done:
+                        name = running.pop(future)
+                        try:
+                            results[name] = future.result()
+                            if self.tasks[name].merge_result:
+                                results.update(results.pop(name))
+                        except Exception:
+                            for other in running:
+                                other.cancel()
+                            raise
+            except BaseException:
+                # Otherwise the pool would wait on calls nobody will read as it shuts down
+                cancel = getattr(agent, 'cancel', None)
+                if cancel:
+                    cancel()
+                raise
+
+        if on_event:
+            drain_events()
+        return results
+
+    def run_task(self, name: str, agent, bullet_points: str, results: Dict[str, Any]):
+        """Run a single task against the results of an earlier run, e.g. a deferred one"""
+        task = self.tasks[name]
+        return task.run(agent, bullet_points, {dep: results[dep] for dep in task.depends_on})
+
+
+def _consume_stream(task: PlanTask, agent, bullet_points: str, deps: Dict, events: queue.Queue):
+    """Run a streaming task on a worker, forwarding events and returning the final result"""
+    result = None
+    for event in task.stream(agent, bullet_points, deps):
+        if event["type"] == "done":
+            result = event["result"]
+        else:
+            events.put((task.name, event))
+    return result
+
+
+FULL_AUTONOMY_PLAN = GenerationPlan([
+    PlanTask("analysis", lambda agent, bullets, deps: agent.analyze_context_agentically(bullets)),
+    PlanTask(
+        "data",
+        lambda agent, bullets, deps: agent.generate_email_agentically(bullets, deps["analysis"]),
+        depends_on=["analysis"],
+        stream=lambda agent, bullets, deps: agent.stream_email_agentically(bullets, deps["analysis"])
+    ),
+    PlanTask(
+        "suggestions",
+        lambda agent, bullets, deps: agent.improve_email_agentically(deps["data"].get('full_email', '')),
+        depends_on=["data"],
+        deferred=True
+    ),
+])
+
+CREATIVE_VARIATIONS_PLAN = GenerationPlan([
+    PlanTask(
+        "data",
+        lambda agent, bullets, deps: agent.generate_tone_variations_agentically(bullets),
+        stream=lambda agent, bullets, deps: agent.stream_tone_variations_agentically(bullets)
+    ),
+])
+
+STRATEGIC_ANALYSIS_PLAN = GenerationPlan([
+    PlanTask("analysis", lambda agent, bullets, deps: agent.analyze_context_agentically(bullets)),
+    PlanTask("strategy", lambda agent, bullets, deps: agent.autonomous_email_strategy(bullets), deferred=True),
+    PlanTask(
+        "data",
+        lambda agent, bullets, deps: agent.generate_email_agentically(bullets, deps["analysis"]),
+        depends_on=["analysis"],
+        stream=lambda agent, bullets, deps: agent.stream_email_agentically(bullets, deps["analysis"])
+    ),
+])
+
+# One JSON-constrained call; the agent falls back to the multi-call path itself
+FAST_AUTONOMY_PLAN = GenerationPlan([
+    PlanTask(
+        "structured",
+        lambda agent, bullets, deps: agent.generate_email_structured(bullets),
+        merge_result=True
+    ),
+])
+
+MODE_PLANS = {
+    "full_autonomy": ("single", FULL_AUTONOMY_PLAN),
+    "fast_autonomy": ("single", FAST_AUTONOMY_PLAN),
+    "creative_variations": ("variations", CREATIVE_VARIATIONS_PLAN),
+    "strategic_analysis": ("strategic", STRATEGIC_ANALYSIS_PLAN),
+}
+
+
+def run_mode(
+    agent,
+    mode: str,
+    bullet_points: str,
+    on_event: Callable = None,
+    on_tick: Callable = None,
+    defer: bool = False,
+    deadline: float = None
+) -> Dict[str, Any]:
+    """Run the plan for a generation mode and shape it like the UI's email_result.
+
+    With `defer`, secondary outputs (suggestions, strategy) are skipped and
+    their names listed under "deferred", so the main email returns as soon
+    as its own calls finish; compute them afterwards with run_deferred.
+    `deadline` bounds the whole mode in seconds, queueing included: calls
+    still running by then fail with DeadlineExceeded.
+    """
+    if deadline is not None:
+        agent = agent.with_deadline(deadline)
+    result_type, plan = MODE_PLANS[mode]
+    started = time.perf_counter()
+    result = plan.run(agent, bullet_points, on_event=on_event, on_tick=on_tick, skip_deferred=defer)
+    
+    metrics = getattr(agent, 'metrics', None)
+    if metrics:
+        metrics.record_mode(mode, time.perf_counter() - started)
+    result['type'] = result_type
+    if defer:
+        result['deferred'] = [name for name, task in plan.tasks.items() if task.deferred]
+    return result
+
+
+def run_deferred(agent, mode: str, bullet_points: str, result: Dict[str, Any], name: str, deadline: float = None):
+    """Compute one output that run_mode(..., defer=True) left out, within `deadline` seconds if given"""
+    if deadline is not None:
+        agent = agent.with_deadline(deadline)
+    return MODE_PLANS[mode][1].run_task(name, agent, bullet_points, result)
@@ -0,0 +1,207 @@
+"""Routing of model calls across several Ollama servers.
+
+Every call goes to the healthy host with the fewest requests outstanding.
+A call that fails because of its host (unreachable, timed out, a 5xx or
+a missing model) is retried on the next host. Repeated failures eject a
+host until the background health check sees it answer again.
+"""
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import ollama
+
+# Comma-separated Ollama URLs, used when the agent is not given any
+HOSTS_ENV = "EMAIL_AGENT_OLLAMA_HOSTS"
+HEALTH_CHECK_INTERVAL_SECONDS = 10
+# Probes must not hang on a stalled box the way a long generation may
+HEALTH_CHECK_TIMEOUT_SECONDS = 3
+# Consecutive failed calls or probes before a host stops receiving traffic
+FAILURES_TO_EJECT = 2
+
+
+def parse_hosts(value=None) -> List[Optional[str]]:
+    """Host list from a list, a comma-separated string or EMAIL_AGENT_OLLAMA_HOSTS.
+
+    [None] means ollama's own default (OLLAMA_HOST or localhost).
+    """
+    if value is None:
+        value = os.environ.get(HOSTS_ENV)
+    if isinstance(value, str):
+        value = value.split(",")
+    hosts = [host.strip() for host in value or [] if host and host.strip()]
+    return hosts or [None]
+
+
+def is_host_failure(error: Exception) -> bool:
+    """Whether a call failed because of the host it went to, so another host may succeed"""
+    if isinstance(error, (ConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(error, ollama.ResponseError):
+        # -1: error line inside a stream; 404: this host doesn't have the model
+        return error.status_code < 0 or error.status_code == 404 or error.status_code >= 500
+    return False
+
+
+class OllamaHost:
+    """One Ollama server: its pooled client, a short-timeout probe client, load and health"""
+
+    def __init__(self, url: Optional[str], limits: httpx.Limits = None):
+        self.client = ollama.AsyncClient(host=url, limits=limits) if limits else ollama.AsyncClient(host=url)
+        self.probe = ollama.AsyncClient(host=url, timeout=HEALTH_CHECK_TIMEOUT_SECONDS)
+        self.url = str(self.client._client.base_url)
+        self.outstanding = 0
+        self.served = 0
+        self.failures = 0
+        self.ejected = False
+        self.error = None
+        # Set by model discovery on this host
+        self.model = None
+        self.digest = None
+
+    def status(self) -> Dict:
+        return {
+            "url": self.url,
+            "healthy": not self.ejected,
+            "outstanding": self.outstanding,
+            "served": self.served,
+            "failures": self.failures,
+            "error": self.error,
+            "model": self.model,
+        }
+
+
+class HostPool:
+    """Least-outstanding-requests routing with failover over a fixed set of Ollama hosts.
+
+    Not thread-safe: use it from the loop that owns it.
+    """
+
+    def __init__(self, hosts=None, limits: httpx.Limits = None):
+        self.hosts = [OllamaHost(url, limits) for url in parse_hosts(hosts)]
+        self._checker = None
+
+    def __len__(self) -> int:
+        return len(self.hosts)
+
+    def pick(self, exclude=()) -> OllamaHost:
+        """The least loaded healthy host not in `exclude`; ejected ones only if nothing else is left"""
+        candidates = [host for host in self.hosts if host not in exclude and not host.ejected]
+        if not candidates:
+            candidates = [host for host in self.hosts if host not in exclude]
+        return min(candidates, key=lambda host: (host.outstanding, host.served))
+
+    async def generate(self, **kwargs):
+        """client.generate() on the least loaded host, failing over to the others"""
+        tried = []
+        while True:
+            host = self.pick(tried)
+            host.outstanding += 1
+            try:
+                response = await host.client.generate(**kwargs)
+            except Exception as e:
+                tried.append(host)
+                if not is_host_failure(e):
+                    raise
+                self._failed(host, e)
+                if len(tried) == len(self.hosts):
+                    raise
+                continue
+            finally:
+                host.outstanding -= 1
+            self._succeeded(host)
+            return response
+
+    async def stream(self, **kwargs):
+        """Streamed client.generate() parts from the least loaded host.
+
+        Fails over only until the first part has arrived; after that a
+        failure is the caller's, since the text so far cannot be unsent.
+        """
+        tried = []
+        while True:
+            host = self.pick(tried)
+            host.outstanding += 1
+            produced = False
+            try:
+                parts = await host.client.generate(stream=True, **kwargs)
+                try:
+                    async for part in parts:
+                        produced = True
+                        yield part
+                finally:
+                    # Closing the ollama iterator closes the underlying HTTP stream
+                    await parts.aclose()
+            except Exception as e:
+                tried.append(host)
+                if not is_host_failure(e):
+                    raise
+                self._failed(host, e)
+                if produced or len(tried) == len(self.hosts):
+                    raise
+                continue
+            finally:
+                host.outstanding -= 1
+            self._succeeded(host)
+            return
+
+    def eject(self, host: OllamaHost, reason: str):
+        """Stop routing to a host until a health check reinstates it"""
+        if not host.ejected:
+            print(f" Ollama host {host.url} taken out of rotation: {reason}")
+        host.ejected = True
+        host.error = reason
+
+    def start_health_checks(
+        self,
+        recover: Callable[[OllamaHost], Awaitable[bool]],
+        interval: float = HEALTH_CHECK_INTERVAL_SECONDS
+    ):
+        """Probe every host in the background from now on.
+
+        A host that answers again after being ejected is passed to
+        `recover`, which re-runs discovery and warm-up; it rejoins the
+        rotation only if that returns True.
+        """
+        if self._checker is None or self._checker.done():
+            self._checker = asyncio.ensure_future(self._check_forever(recover, interval))
+
+    def stop_health_checks(self):
+        if self._checker is not None:
+            self._checker.cancel()
+
+    async def check(self, host: OllamaHost, recover: Callable[[OllamaHost], Awaitable[bool]]) -> bool:
+        """Probe one host, ejecting or reinstating it"""
+        try:
+            await host.probe.ps()
+        except Exception as e:
+            self._failed(host, e)
+            return False
+
+        if host.ejected:
+            if not await recover(host):
+                return False
+            print(f" Ollama host {host.url} back in rotation")
+        host.ejected, host.failures, host.error = False, 0, None
+        return True
+
+    def status(self) -> List[Dict]:
+        return [host.status() for host in self.hosts]
+
+    async def _check_forever(self, recover, interval: float):
+        while True:
+            await asyncio.gather(*[self.check(host, recover) for host in self.hosts])
+            await asyncio.sleep(interval)
+
+    def _failed(self, host: OllamaHost, error: Exception):
+        host.failures += 1
+        host.error = str(error) or type(error).__name__
+        if host.failures >= FAILURES_TO_EJECT:
+            self.eject(host, host.error)
+
+    def _succeeded(self, host: OllamaHost):
+        host.served += 1
+        host.failures = 0
+        if not host.ejected:
+            host.error = None
@@ -0,0 +1,206 @@
+"""Concurrent-user load test of the app's generation pipeline.
+
+Replays a seeded mix of user actions (a mode plus bullets from the
+built-in examples and test_emails.txt) the way the Streamlit app's
+generate_email runs them: the mode with its secondary outputs deferred,
+then those outputs. Every configuration gets its own fake Ollama whose
+decoding is serialized (or limited to --num-parallel generations), so
+queueing shows up as it would on one real GPU.
+
+Arrivals are open-loop Poisson at --rate actions per second, at most
+--concurrency in progress at once; --rate 0 runs closed-loop instead,
+--concurrency users each starting their next action as soon as the last
+one finishes. Latencies are measured from arrival.
+
+Usage:
+    python load_test.py                                    # every configuration
+    python load_test.py --configs concurrent,concurrent_cached --rate 2 --actions 100 --output load.json
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from batch_generate import read_cases
+from email_agent import AgenticEmailAgent, DEFAULT_MAX_CONCURRENCY
+from examples import EXAMPLES
+from fake_ollama import FakeOllamaServer
+from generation_plan import run_deferred, run_mode
+from metrics import LatencyHistogram
+from response_cache import ResponseCache
+from scheduler import SchedulerBusy
+
+DEFAULT_MODES = ("full_autonomy", "creative_variations", "strategic_analysis")
+DEFAULT_CASES_PATH = "test_emails.txt"
+# Agent settings per configuration; "sync" makes one model call at a time, like the original blocking client
+CONFIGS = {
+    "sync": {"max_concurrency": 1, "cached": False},
+    "concurrent": {"max_concurrency": DEFAULT_MAX_CONCURRENCY, "cached": False},
+    "sync_cached": {"max_concurrency": 1, "cached": True},
+    "concurrent_cached": {"max_concurrency": DEFAULT_MAX_CONCURRENCY, "cached": True},
+}
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def build_workload(actions: int, modes, cases_path: str = DEFAULT_CASES_PATH, seed: int = 0) -> List[Dict]:
+    """`actions` user actions drawn from the examples and cases, identical for every configuration"""
+    bullets = list(EXAMPLES.values())
+    if cases_path:
+        bullets += [text for _, text in read_cases(cases_path)]
+    rng = random.Random(seed)
+    return [{"mode": rng.choice(modes), "bullet_points": rng.choice(bullets)} for _ in range(actions)]
+
+
+def user_action(agent, action: Dict, session: str, arrived: float) -> Dict:
+    """One click on Generate, as generate_email runs it: the main email first, then the deferred outputs"""
+    view = agent.for_session(session)
+    mode, bullet_points = action["mode"], action["bullet_points"]
+    outcome = {"mode": mode}
+    try:
+        result = run_mode(view, mode, bullet_points, defer=True)
+        outcome["email_s"] = time.perf_counter() - arrived
+        for name in result.get("deferred", []):
+            result[name] = run_deferred(view, mode, bullet_points, result, name)
+        outcome["total_s"] = time.perf_counter() - arrived
+    except SchedulerBusy:
+        outcome["error"] = "rejected"
+    except Exception as e:
+        outcome["error"] = str(e) or type(e).__name__
+    return outcome
+
+
+def replay(agent, workload: List[Dict], rate: float, concurrency: int, seed: int = 0) -> List[Dict]:
+    """Run the workload against the agent and return one outcome per action"""
+    rng = random.Random(seed)
+    outcomes = [None] * len(workload)
+    users = threading.Semaphore(concurrency)
+
+    def run(index: int, arrived: float):
+        try:
+            if rate <= 0:
+                arrived = time.perf_counter()
+            outcomes[index] = user_action(agent, workload[index], f"user-{index % concurrency}", arrived)
+        finally:
+            users.release()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        next_arrival = time.perf_counter()
+        for index in range(len(workload)):
+            if rate > 0:
+                next_arrival += rng.expovariate(rate)
+                time.sleep(max(0.0, next_arrival - time.perf_counter()))
+                arrived = next_arrival
+            else:
+                arrived = None
+            # Beyond `concurrency` in progress, arrivals wait here; that wait counts toward their latency
+            users.acquire()
+            pool.submit(run, index, arrived)
+    return outcomes
+
+
+def run_config(name: str, workload: List[Dict], args) -> Dict:
+    """Replay the workload under one configuration against a fresh fake Ollama"""
+    config = CONFIGS[name]
+    with FakeOllamaServer(
+        token_latency=args.token_latency, prompt_token_latency=args.prompt_token_latency, num_parallel=args.num_parallel
+    ) as server:
+        agent = AgenticEmailAgent(
+            max_concurrency=config["max_concurrency"], host=server.host, warm_up=False,
+            cache=ResponseCache(path=None) if config["cached"] else None, use_cache=config["cached"],
+            reuse_analysis=config["cached"], max_queue=args.max_queue
+        )
+        server.reset()
+
+        started = time.perf_counter()
+        outcomes = replay(agent, workload, args.rate, args.concurrency, args.seed)
+        wall = time.perf_counter() - started
+        calls = server.generate_calls()
+
+    completed = [outcome for outcome in outcomes if "error" not in outcome]
+    errors = [outcome["error"] for outcome in outcomes if "error" in outcome]
+    client_queue = agent.metrics.queue_waits()
+    server_queue = [call.get("queued", 0.0) for call in calls]
+    cached = sum(row.get("cached", 0) + row.get("coalesced", 0) for row in agent.metrics.summary())
+    report = {
+        "config": name,
+        "actions": len(outcomes),
+        "completed": len(completed),
+        "rejected": errors.count("rejected"),
+        "failed": len(errors) - errors.count("rejected"),
+        "wall_s": round(wall, 2),
+        "throughput_per_s": round(len(completed) / wall, 2) if wall else 0.0,
+        "model_calls_per_action": round(len(calls) / len(outcomes), 2) if outcomes else 0.0,
+        "cache_hits_per_action": round(cached / len(outcomes), 2) if outcomes else 0.0,
+    }
+    report.update(percentiles("email", [outcome["email_s"] for outcome in completed]))
+    report.update(percentiles("total", [outcome["total_s"] for outcome in completed]))
+    report.update(percentiles("client_queue", client_queue))
+    report.update(percentiles("server_queue", server_queue))
+    if errors:
+        report["errors"] = sorted(set(errors))
+    return report
+
+
+def percentiles(prefix: str, samples: List[float]) -> Dict:
+    histogram = LatencyHistogram()
+    for seconds in samples:
+        histogram.observe(seconds)
+    return {f"{prefix}_p{round(fraction * 100)}_s": round(histogram.percentile(fraction), 3) for fraction in PERCENTILES}
+
+
+def print_report(reports: List[Dict]):
+    print(
+        f"{'config':<18} {'done':>5} {'rej':>4} {'fail':>4} {'actions/s':>9} {'calls/act':>9} "
+        f"{'email p50':>9} {'p95':>7} {'p99':>7} {'total p95':>9} {'queue p95':>9} {'server q p95':>12}"
+    )
+    for report in reports:
+        print(
+            f"{report['config']:<18} {report['completed']:>5} {report['rejected']:>4} {report['failed']:>4} "
+            f"{report['throughput_per_s']:>9} {report['model_calls_per_action']:>9} "
+            f"{report['email_p50_s']:>9} {report['email_p95_s']:>7} {report['email_p99_s']:>7} "
+            f"{report['total_p95_s']:>9} {report['client_queue_p95_s']:>9} {report['server_queue_p95_s']:>12}"
+        )
+    print("\nLatencies in seconds from arrival; queue = waiting for an agent scheduler slot, server q = for a decoding slot")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the generation pipeline against a fake Ollama")
+    parser.add_argument("--configs", default=",".join(CONFIGS), help=f"comma-separated, from: {', '.join(CONFIGS)}")
+    parser.add_argument("--modes", default=",".join(DEFAULT_MODES), help="comma-separated generation modes to mix")
+    parser.add_argument("--actions", type=int, default=40, help="user actions per configuration")
+    parser.add_argument("--rate", type=float, default=1.0, help="arrivals per second; 0 for closed-loop users")
+    parser.add_argument("--concurrency", type=int, default=8, help="user actions in progress at most")
+    parser.add_argument("--cases", default=DEFAULT_CASES_PATH, help="extra bullet lists, as batch_generate.py reads them")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="fake seconds per decoded token")
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0005, help="fake seconds per prompt token")
+    parser.add_argument("--num-parallel", type=int, default=1, help="generations the fake server decodes at once")
+    parser.add_argument("--max-queue", type=int, default=64, help="agent scheduler queue limit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="where to write the reports JSON")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.configs.split(",") if name.strip()]
+    unknown = [name for name in names if name not in CONFIGS]
+    if unknown:
+        parser.error(f"unknown configs: {', '.join(unknown)}")
+
+    workload = build_workload(args.actions, args.modes.split(","), args.cases, args.seed)
+    reports = []
+    for name in names:
+        print(f" Running {name}...")
+        reports.append(run_config(name, workload, args))
+    print_report(reports)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "reports": reports}, f, indent=2)
+        print(f"\n Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
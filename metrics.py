@@ -0,0 +1,287 @@
+import os
+import threading
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# Prometheus-style upper bounds, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+# Recent samples kept per series for percentile estimates
+SAMPLE_WINDOW = 1000
+NANOSECONDS = 1e9
+
+
+class LatencyHistogram:
+    """Cumulative bucket counts for export plus a window of raw samples for percentiles"""
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+
+    def percentile(self, fraction: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class TaskStats:
+    """Ollama timing fields accumulated for one task"""
+
+    def __init__(self):
+        self.wall = LatencyHistogram()
+        # Slot granted to first response chunk (streams) or full response, the basis for hedge delays
+        self.model = LatencyHistogram()
+        # Time spent waiting for a scheduler slot
+        self.queue_wait = LatencyHistogram()
+        self.cached = 0
+        self.coalesced = 0
+        self.truncated = 0
+        self.stopped_early = 0
+        self.timed_out = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.eval_count = 0
+        self.prompt_eval_count = 0
+        self.eval_seconds = 0.0
+        self.prompt_eval_seconds = 0.0
+        self.load_seconds = 0.0
+
+
+class MetricsRecorder:
+    """Per-call inference metrics for the agent.
+
+    Every generate call reports Ollama's eval/prompt_eval/load fields and
+    the client wall time under a task label; generation modes report their
+    own wall time. Thread-safe, since calls finish on the agent's loop
+    thread while modes finish on plan worker threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tasks = defaultdict(TaskStats)
+        self.modes = defaultdict(LatencyHistogram)
+
+    def record_call(
+        self,
+        task: str,
+        response,
+        wall_seconds: float,
+        cached: bool = False,
+        truncated: bool = False,
+        coalesced: bool = False,
+        stopped_early: bool = False
+    ):
+        """Record one generate call from its response and client-side wall time.
+
+        Cached and coalesced calls count towards latency only; their tokens
+        were already accounted to the call that produced them.
+        """
+        with self._lock:
+            stats = self.tasks[task]
+            stats.wall.observe(wall_seconds)
+            stats.truncated += truncated
+            stats.stopped_early += stopped_early
+            if cached or coalesced:
+                stats.cached += cached
+                stats.coalesced += coalesced
+                return
+            stats.eval_count += response.get('eval_count') or 0
+            stats.prompt_eval_count += response.get('prompt_eval_count') or 0
+            stats.eval_seconds += (response.get('eval_duration') or 0) / NANOSECONDS
+            stats.prompt_eval_seconds += (response.get('prompt_eval_duration') or 0) / NANOSECONDS
+            stats.load_seconds += (response.get('load_duration') or 0) / NANOSECONDS
+
+    def record_model_latency(self, task: str, seconds: float):
+        """Record how long Ollama took to start answering a call that had its slot"""
+        with self._lock:
+            self.tasks[task].model.observe(seconds)
+
+    def record_queue_wait(self, task: str, seconds: float):
+        """Record how long a call waited for a scheduler slot"""
+        with self._lock:
+            self.tasks[task].queue_wait.observe(seconds)
+
+    def queue_waits(self) -> List[float]:
+        """Recent scheduler waits of every task, e.g. for a load test's percentiles"""
+        with self._lock:
+            return [seconds for stats in self.tasks.values() for seconds in stats.queue_wait.samples]
+
+    def model_latency(self, task: str, fraction: float, min_samples: int) -> Optional[float]:
+        """Percentile of a task's model latency, or None until `min_samples` calls are recorded"""
+        with self._lock:
+            histogram = self.tasks[task].model
+            if len(histogram.samples) < min_samples:
+                return None
+            return histogram.percentile(fraction)
+
+    def record_timeout(self, task: str):
+        """Record a call abandoned at its deadline"""
+        with self._lock:
+            self.tasks[task].timed_out += 1
+
+    def record_hedge(self, task: str, won: bool):
+        """Record a hedged duplicate request, and whether it answered before the original"""
+        with self._lock:
+            stats = self.tasks[task]
+            stats.hedged += 1
+            stats.hedge_wins += won
+
+    def record_mode(self, mode: str, wall_seconds: float):
+        """Record the wall time of a whole generation mode"""
+        with self._lock:
+            self.modes[mode].observe(wall_seconds)
+
+    def summary(self) -> List[Dict]:
+        """One row per task and mode, ready for a table"""
+        rows = []
+        with self._lock:
+            for task, stats in sorted(self.tasks.items()):
+                model_seconds = stats.load_seconds + stats.prompt_eval_seconds + stats.eval_seconds
+                model_calls = stats.wall.count - stats.cached - stats.coalesced
+                rows.append({
+                    "series": task,
+                    "calls": stats.wall.count,
+                    "cached": stats.cached,
+                    "coalesced": stats.coalesced,
+                    "truncated": stats.truncated,
+                    "stopped_early": stats.stopped_early,
+                    "timed_out": stats.timed_out,
+                    "hedged": stats.hedged,
+                    "hedge_wins": stats.hedge_wins,
+                    "p50_s": round(stats.wall.percentile(0.5), 3),
+                    "p95_s": round(stats.wall.percentile(0.95), 3),
+                    "queue_p95_s": round(stats.queue_wait.percentile(0.95), 3),
+                    "tokens_per_s": round(stats.eval_count / stats.eval_seconds, 1) if stats.eval_seconds else 0.0,
+                    "prompt_tokens": stats.prompt_eval_count,
+                    "prompt_tokens_per_call": round(stats.prompt_eval_count / model_calls, 1) if model_calls > 0 else 0.0,
+                    "load_share": round(stats.load_seconds / model_seconds, 2) if model_seconds else 0.0,
+                    "prompt_share": round(stats.prompt_eval_seconds / model_seconds, 2) if model_seconds else 0.0,
+                    "decode_share": round(stats.eval_seconds / model_seconds, 2) if model_seconds else 0.0,
+                })
+            for mode, histogram in sorted(self.modes.items()):
+                rows.append({
+                    "series": f"mode:{mode}",
+                    "calls": histogram.count,
+                    "p50_s": round(histogram.percentile(0.5), 3),
+                    "p95_s": round(histogram.percentile(0.95), 3),
+                })
+        return rows
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition of every series"""
+        lines = []
+        with self._lock:
+            lines += _histogram_lines(
+                "email_agent_generate_seconds", "Client wall time per generate call",
+                {f'task="{task}"': stats.wall for task, stats in self.tasks.items()}
+            )
+            lines += _histogram_lines(
+                "email_agent_queue_wait_seconds", "Time a generate call waited for a scheduler slot",
+                {f'task="{task}"': stats.queue_wait for task, stats in self.tasks.items()}
+            )
+            lines += _histogram_lines(
+                "email_agent_mode_seconds", "Client wall time per generation mode",
+                {f'mode="{mode}"': histogram for mode, histogram in self.modes.items()}
+            )
+
+            lines.append("# HELP email_agent_cache_hits_total Generate calls served from the response cache")
+            lines.append("# TYPE email_agent_cache_hits_total counter")
+            for task, stats in self.tasks.items():
+                lines.append(f'email_agent_cache_hits_total{{task="{task}"}} {stats.cached}')
+
+            lines.append("# HELP email_agent_coalesced_total Generate calls that joined an identical call in flight")
+            lines.append("# TYPE email_agent_coalesced_total counter")
+            for task, stats in self.tasks.items():
+                lines.append(f'email_agent_coalesced_total{{task="{task}"}} {stats.coalesced}')
+
+            lines.append("# HELP email_agent_truncated_total Generate calls that stopped at their token budget")
+            lines.append("# TYPE email_agent_truncated_total counter")
+            for task, stats in self.tasks.items():
+                lines.append(f'email_agent_truncated_total{{task="{task}"}} {stats.truncated}')
+
+            lines.append("# HELP email_agent_stopped_early_total Generate calls cut short once every field they need was parsed")
+            lines.append("# TYPE email_agent_stopped_early_total counter")
+            for task, stats in self.tasks.items():
+                lines.append(f'email_agent_stopped_early_total{{task="{task}"}} {stats.stopped_early}')
+
+            lines.append("# HELP email_agent_timed_out_total Generate calls abandoned at their deadline")
+            lines.append("# TYPE email_agent_timed_out_total counter")
+            for task, stats in self.tasks.items():
+                lines.append(f'email_agent_timed_out_total{{task="{task}"}} {stats.timed_out}')
+
+            lines.append("# HELP email_agent_hedged_total Duplicate requests sent for slow generate calls")
+            lines.append("# TYPE email_agent_hedged_total counter")
+            for task, stats in self.tasks.items():
+                lines.append(f'email_agent_hedged_total{{task="{task}"}} {stats.hedged}')
+
+            lines.append("# HELP email_agent_hedge_wins_total Hedged requests that answered before the original")
+            lines.append("# TYPE email_agent_hedge_wins_total counter")
+            for task, stats in self.tasks.items():
+                lines.append(f'email_agent_hedge_wins_total{{task="{task}"}} {stats.hedge_wins}')
+
+            lines.append("# HELP email_agent_tokens_total Tokens processed by Ollama")
+            lines.append("# TYPE email_agent_tokens_total counter")
+            for task, stats in self.tasks.items():
+                lines.append(f'email_agent_tokens_total{{task="{task}",phase="prompt_eval"}} {stats.prompt_eval_count}')
+                lines.append(f'email_agent_tokens_total{{task="{task}",phase="eval"}} {stats.eval_count}')
+
+            lines.append("# HELP email_agent_model_seconds_total Ollama-reported time by phase")
+            lines.append("# TYPE email_agent_model_seconds_total counter")
+            for task, stats in self.tasks.items():
+                lines.append(f'email_agent_model_seconds_total{{task="{task}",phase="load"}} {stats.load_seconds:.6f}')
+                lines.append(f'email_agent_model_seconds_total{{task="{task}",phase="prompt_eval"}} {stats.prompt_eval_seconds:.6f}')
+                lines.append(f'email_agent_model_seconds_total{{task="{task}",phase="eval"}} {stats.eval_seconds:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Write the exposition to a file, e.g. for node_exporter's textfile collector"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def serve_prometheus(self, port: int, address: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve the exposition at http://address:port/metrics on a daemon thread"""
+        recorder = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                data = recorder.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        server = ThreadingHTTPServer((address, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="email-agent-metrics", daemon=True).start()
+        return server
+
+
+def _histogram_lines(name: str, help_text: str, series: Dict[str, LatencyHistogram]) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram in series.items():
+        for bound, count in zip(LATENCY_BUCKETS, histogram.buckets):
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.total:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
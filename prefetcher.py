@@ -0,0 +1,150 @@
+"""Speculative generation ahead of the user.
+
+The Prefetcher runs generation modes on background views of the agent:
+they only start a model call while no interactive call is running or
+waiting, one at a time, an interactive call joining one of their model
+calls lifts it to normal priority, and cancel() stops them mid-call. Finished results are handed
+out once through take(); everything they computed also stays in the
+response cache and analysis shortcuts for later runs.
+"""
+import concurrent.futures
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Hashable, Iterable, Optional
+
+from generation_plan import MODE_PLANS, run_mode
+from token_budgets import TokenBudgets
+
+# One speculative mode at a time; each mode already runs its own calls side by side
+DEFAULT_PREFETCH_WORKERS = 1
+# Finished results kept for take(), oldest dropped first
+DEFAULT_MAX_RESULTS = 64
+SPECULATIVE_SESSION = "speculative"
+
+
+class Prefetcher:
+    """Background runs of generation modes, keyed by mode, bullets and token budgets.
+
+    Jobs belong to an `owner` (e.g. a UI session) so that owner's stale
+    speculation can be cancelled when it moves on; owner None is shared
+    work such as the built-in examples.
+    """
+
+    def __init__(self, agent, max_workers: int = DEFAULT_PREFETCH_WORKERS, max_results: int = DEFAULT_MAX_RESULTS):
+        self.agent = agent.for_session(SPECULATIVE_SESSION)
+        self.max_results = max_results
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="email-prefetch")
+        # key -> (future, background agent view, owner)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"started": 0, "completed": 0, "taken": 0, "cancelled": 0, "failed": 0}
+
+    def prefetch(self, mode: str, bullet_points: str, budgets: TokenBudgets = None, owner: Hashable = None):
+        """Start a mode for these bullets unless it is already running or finished"""
+        key = _job_key(mode, bullet_points, budgets)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job and not (job[0].done() and _failed(job[0])):
+                return job[0]
+
+            view = self.agent.with_budgets(budgets) if budgets else self.agent
+            view = view.as_background()
+            future = self._pool.submit(run_mode, view, mode, bullet_points)
+            self._jobs[key] = (future, view, owner)
+            self.counters["started"] += 1
+            self._trim()
+        future.add_done_callback(self._count)
+        return future
+
+    def prefetch_examples(self, examples: Iterable[str], modes: Iterable[str] = None):
+        """Queue every example in every mode, each mode across all examples before the next"""
+        examples = list(examples)
+        for mode in modes or MODE_PLANS:
+            for bullet_points in examples:
+                self.prefetch(mode, bullet_points)
+
+    def speculate(self, bullet_points: str, done_mode: str, budgets: TokenBudgets = None, owner: Hashable = None):
+        """After `done_mode` ran for these bullets, start the other modes the user may try next.
+
+        The owner's earlier speculation about other bullets is cancelled first.
+        """
+        self.cancel(owner=owner, keep=bullet_points)
+        for mode in MODE_PLANS:
+            if mode != done_mode:
+                self.prefetch(mode, bullet_points, budgets, owner)
+
+    def take(self, mode: str, bullet_points: str, budgets: TokenBudgets = None) -> Optional[Dict]:
+        """A finished speculative result, handed out once; None if there is none yet.
+
+        A matching job still running is left to finish: the caller's own
+        interactive run joins whatever model calls it has in flight (lifting
+        them to interactive priority), finds the ones it finished in the
+        response cache, and the job in turn joins the calls the interactive
+        run starts first.
+        """
+        key = _job_key(mode, bullet_points, budgets)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or not job[0].done():
+                return None
+            del self._jobs[key]
+
+        future, _, _ = job
+        if _failed(future):
+            return None
+        with self._lock:
+            self.counters["taken"] += 1
+        return future.result()
+
+    def cancel(self, owner: Hashable = None, keep: str = None):
+        """Cancel unfinished jobs of `owner`, except those for the `keep` bullets"""
+        with self._lock:
+            doomed = [
+                key for key, (future, _, job_owner) in self._jobs.items()
+                if job_owner == owner and not future.done() and (keep is None or key[1] != keep.strip())
+            ]
+            jobs = [self._jobs.pop(key) for key in doomed]
+        for future, view, _ in jobs:
+            future.cancel()
+            view.cancel()
+
+    def shutdown(self):
+        """Cancel everything and stop the worker threads"""
+        with self._lock:
+            jobs, self._jobs = list(self._jobs.values()), OrderedDict()
+        for future, view, _ in jobs:
+            future.cancel()
+            view.cancel()
+        self._pool.shutdown(wait=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+            counters["pending"] = sum(not future.done() for future, _, _ in self._jobs.values())
+            counters["ready"] = sum(future.done() and not _failed(future) for future, _, _ in self._jobs.values())
+        return counters
+
+    def _count(self, future):
+        outcome = "cancelled" if future.cancelled() or _was_cancelled(future) else "failed" if _failed(future) else "completed"
+        with self._lock:
+            self.counters[outcome] += 1
+
+    def _trim(self):
+        """Drop the oldest finished results beyond max_results; running jobs are kept"""
+        finished = [key for key, (future, _, _) in self._jobs.items() if future.done()]
+        for key in finished[:max(0, len(finished) - self.max_results)]:
+            del self._jobs[key]
+
+
+def _job_key(mode: str, bullet_points: str, budgets: TokenBudgets = None):
+    budgets = budgets or TokenBudgets()
+    return mode, bullet_points.strip(), budgets.creativity, budgets.max_length
+
+
+def _failed(future) -> bool:
+    return future.cancelled() or future.exception() is not None
+
+
+def _was_cancelled(future) -> bool:
+    return isinstance(future.exception(), concurrent.futures.CancelledError)
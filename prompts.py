@@ -0,0 +1,224 @@
+"""Prompt templates for every kind of model call.
+
+Each template is whitespace-normalized once, at import: the indentation,
+trailing spaces and repeated blank lines of its source never reach the
+model, and every call only fills in its fields. A template's version is a
+hash of its normalized text, so a reworded prompt gets a new version id.
+Prompts follow the agent's request prefix (the bullets), which is left
+out of the token estimates here.
+
+Usage:
+    python prompts.py              # version and estimated prompt tokens of every template
+"""
+import hashlib
+import re
+import string
+import sys
+import textwrap
+from typing import Dict, List
+
+# Qwen2's pre-tokenizer split, which every token boundary respects: words with one leading
+# character, single digits, punctuation runs, line breaks with the whitespace before them,
+# and indentation as a piece of its own
+TOKEN_PATTERN = re.compile(
+    r"'(?:s|t|re|ve|m|ll|d)|[^\r\n\w]?[A-Za-z]+|\d| ?[^\s\w]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt token count, whitespace included; exact counts come back from Ollama"""
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def normalize(source: str) -> str:
+    """Dedent, drop trailing spaces and collapse blank lines to one"""
+    lines = []
+    for line in textwrap.dedent(source).strip().splitlines():
+        line = line.rstrip()
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    return "\n".join(lines)
+
+
+class PromptTemplate:
+    """One normalized prompt with `{field}` placeholders filled in by render()"""
+
+    def __init__(self, name: str, source: str):
+        self.name = name
+        self.text = normalize(source)
+        self.version = hashlib.sha256(self.text.encode("utf-8")).hexdigest()[:8]
+        self.fields = sorted({field for _, field, _, _ in string.Formatter().parse(self.text) if field})
+        # Fixed cost of the template itself; filled-in fields come on top
+        self.tokens = estimate_tokens(self.text.format(**{field: "" for field in self.fields}))
+
+    def render(self, **fields) -> str:
+        return self.text.format(**fields) if self.fields else self.text
+
+
+# Analysis field -> (question line, answer line), as worded in the full analysis template
+ANALYSIS_LINES = {
+    "purpose": ("- Purpose: (meeting_request, follow_up, request, complaint, etc.)", "Purpose: [your analysis]"),
+    "tone": ("- Tone: (formal, casual, urgent, persuasive, etc.)", "Tone: [your decision]"),
+    "urgency": ("- Urgency: (low, medium, high, critical)", "Urgency: [your assessment]"),
+    "relationship": ("- Relationship: (boss, colleague, client, vendor)", "Relationship: [your judgment]"),
+}
+
+TEMPLATES = [
+    PromptTemplate("analysis", """
+        Analyze this email request and determine the appropriate context.
+
+        Please analyze and determine:
+        - Purpose: (meeting_request, follow_up, request, complaint, etc.)
+        - Tone: (formal, casual, urgent, persuasive, etc.)
+        - Urgency: (low, medium, high, critical)
+        - Relationship: (boss, colleague, client, vendor)
+
+        Respond in this format:
+        Purpose: [your analysis]
+        Tone: [your decision]
+        Urgency: [your assessment]
+        Relationship: [your judgment]
+    """),
+    # The analysis fields the keyword rules left open; {questions} and {answers} come from ANALYSIS_LINES
+    PromptTemplate("analysis_fields", """
+        Analyze this email request and determine:
+        {questions}
+
+        Respond in this format:
+        {answers}
+    """),
+    PromptTemplate("simple_analysis", """
+        Analyze it:
+        Purpose: [your decision]
+        Tone: [your choice]
+        Relationship: [your assessment]
+        Urgency: [your judgment]
+    """),
+    PromptTemplate("email", """
+        Write a professional business email based on these requirements.
+
+        Context: {tone} tone, {urgency} urgency
+
+        Please write a complete email with:
+        1. An effective subject line
+        2. Proper greeting
+        3. Clear, professional body
+        4. Appropriate closing
+
+        Format:
+        Subject: [your subject line]
+
+        Dear [Name],
+
+        [Your email content here]
+
+        Best regards,
+        [Your name]
+    """),
+    PromptTemplate("subject", """
+        You are a subject line optimization agent. Create the most effective subject line for this email.
+        CONTEXT: {purpose}, {tone}, {urgency}
+        Consider:
+        - What will get opened first in a busy inbox?
+        - What conveys the right urgency without being spammy?
+        - What gives enough context without being too long?
+        Return ONLY the subject line, no quotes or explanations.
+    """),
+    PromptTemplate("suggestions", """
+        You are an email optimization agent. Analyze this email and suggest intelligent improvements.
+        EMAIL: {email}
+        As an intelligent agent, assess:
+        1. Clarity and effectiveness
+        2. Tone appropriateness
+        3. Structure and flow
+        4. Professional impact
+        5. Likelihood of achieving goals
+        Provide 3-5 specific, actionable suggestions that demonstrate intelligent analysis.
+        Return as a simple list, one suggestion per line.
+    """),
+    # Follows the draft's own context tokens, so the email itself is not sent again
+    PromptTemplate("suggestions_followup", """
+        You are an email optimization agent. Analyze the email you just wrote and suggest intelligent improvements.
+        As an intelligent agent, assess:
+        1. Clarity and effectiveness
+        2. Tone appropriateness
+        3. Structure and flow
+        4. Professional impact
+        5. Likelihood of achieving goals
+        Provide 3-5 specific, actionable suggestions that demonstrate intelligent analysis.
+        Return as a simple list, one suggestion per line.
+    """),
+    PromptTemplate("variation", """
+        Write a {approach} email from these points.
+
+        Make it {approach} style.
+
+        Subject: [write subject]
+
+        Dear [Name],
+
+        [Write email body]
+
+        Best regards,
+        [Your name]
+
+        Write the email:
+    """),
+    PromptTemplate("structured", """
+        Analyze this email request and write the email in one step.
+
+        Return JSON with:
+        - purpose: (meeting_request, follow_up, request, complaint, etc.)
+        - tone: (formal, casual, urgent, persuasive, etc.)
+        - urgency: (low, medium, high, critical)
+        - relationship: (boss, colleague, client, vendor)
+        - subject: an effective subject line
+        - body: the complete email, from greeting to closing
+        - suggestions: 3-5 specific, actionable improvements for the email
+    """),
+    PromptTemplate("strategy", """
+        You are a strategic communication agent. Develop a complete email strategy for this email request.
+        AUTONOMOUS STRATEGIC ANALYSIS:
+        1. What is the sender trying to achieve?
+        2. What obstacles might prevent success?
+        3. What approach will be most effective?
+        4. What follow-up actions should be planned?
+        5. How can this email strengthen the relationship?
+        Provide your strategic assessment and recommendations.
+    """),
+]
+PROMPTS: Dict[str, PromptTemplate] = {template.name: template for template in TEMPLATES}
+
+
+def render(name: str, **fields) -> str:
+    """Fill in the registered template `name`"""
+    return PROMPTS[name].render(**fields)
+
+
+def analysis_fields_prompt(fields) -> str:
+    """The analysis prompt narrowed to `fields`"""
+    lines = [ANALYSIS_LINES[field] for field in ANALYSIS_LINES if field in fields]
+    return render(
+        "analysis_fields",
+        questions="\n".join(question for question, _ in lines),
+        answers="\n".join(answer for _, answer in lines)
+    )
+
+
+def report() -> List[Dict]:
+    """One row per template: version id and estimated fixed prompt tokens"""
+    return [
+        {"template": template.name, "version": template.version, "tokens": template.tokens, "fields": template.fields}
+        for template in TEMPLATES
+    ]
+
+
+def main():
+    print(f"{'template':<22} {'version':<9} {'tokens':>6}  fields")
+    for row in report():
+        print(f"{row['template']:<22} {row['version']:<9} {row['tokens']:>6}  {', '.join(row['fields'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+DEFAULT_CACHE_PATH = os.environ.get("EMAIL_AGENT_CACHE_PATH", ".email_agent_cache.sqlite3")
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_DISK_ENTRIES = 10000
+# Ollama samples at 0.8 when no temperature is given, so option-less calls bypass too
+DEFAULT_MAX_CACHEABLE_TEMPERATURE = 0.5
+OLLAMA_DEFAULT_TEMPERATURE = 0.8
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse indentation and runs of whitespace so cosmetic differences share a key"""
+    return "\n".join(" ".join(line.split()) for line in prompt.strip().splitlines())
+
+
+class ResponseCache:
+    """Two-tier cache for generate() results.
+
+    An in-memory LRU sits in front of a SQLite table; both tiers honour
+    the same TTL and evict oldest entries beyond their size limits.
+    Calls sampled above `max_cacheable_temperature` are never cached
+    because their output is not meant to be reproducible.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = DEFAULT_CACHE_PATH,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+        disk_entries: int = DEFAULT_DISK_ENTRIES,
+        max_cacheable_temperature: float = DEFAULT_MAX_CACHEABLE_TEMPERATURE
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.max_cacheable_temperature = max_cacheable_temperature
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "evictions": 0}
+
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._db.commit()
+
+    def make_key(self, model_digest: str, prompt: str, options: Dict = None, **extra) -> str:
+        """Stable key over (model digest, normalized prompt, options)"""
+        payload = json.dumps(
+            {"model": model_digest, "prompt": normalize_prompt(prompt), "options": options or {}, **extra},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, options: Dict = None) -> bool:
+        """High-temperature calls are not deterministic and skip the cache"""
+        temperature = (options or {}).get("temperature", OLLAMA_DEFAULT_TEMPERATURE)
+        if temperature > self.max_cacheable_temperature:
+            with self._lock:
+                self.counters["bypassed"] += 1
+            return False
+        return True
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached response dict, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[0] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return entry[1]
+            if entry:
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row and now - row[1] <= self.ttl_seconds:
+                    self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    value = json.loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.counters["disk_hits"] += 1
+                    return value
+                if row:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, key: str, value: Dict):
+        """Store a response in both tiers"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now)
+                )
+                self._evict_disk(now)
+                self._db.commit()
+
+    def clear(self):
+        """Drop every cached response"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters plus current tier sizes"""
+        with self._lock:
+            stats = dict(self.counters)
+            stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"] = (
+                self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] if self._db is not None else 0
+            )
+        return stats
+
+    def _remember(self, key: str, created: float, value: Dict):
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _evict_disk(self, now: float):
+        self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        overflow = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.disk_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                (overflow,)
+            )
+            self.counters["evictions"] += overflow
@@ -0,0 +1,223 @@
+"""Incremental parsers for the agent's line-oriented completions.
+
+Each parser consumes a completion chunk by chunk and knows which fields
+its task needs. Once they are all captured and the model goes on writing
+anyway, feed() returns True so the caller can hang up on Ollama instead
+of decoding text nobody reads. The same parsers turn finished
+completions into results, so the streamed and blocking paths agree.
+"""
+from typing import Dict, List, Optional, Tuple
+
+ANALYSIS_FIELDS = ("purpose", "tone", "urgency", "relationship")
+MAX_SUGGESTIONS = 5
+# done_reason recorded for completions the agent cut short once their fields were in
+FIELDS_COMPLETE = "parsed"
+# Lines that close a letter; the next non-empty line is the sender's name
+SIGN_OFFS = {
+    "best", "best regards", "kind regards", "warm regards", "regards", "sincerely", "yours sincerely",
+    "thanks", "thank you", "many thanks", "cheers", "respectfully",
+}
+
+
+class CompletionParser:
+    """Line-by-line parser that notices when the completion runs past what its task needs.
+
+    Subclasses handle complete lines in _line() and set `complete` once
+    every required field is captured. Whitespace after that point may
+    still be the model finishing naturally; the first other text is not,
+    and feed() reports it with `overflow` set to how many characters of
+    the chunk belong to it.
+    """
+
+    def __init__(self):
+        self.complete = False
+        self.overflow = 0
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> bool:
+        """Consume one chunk; True once the completion has run past the required fields"""
+        if not self.complete:
+            self._buffer += chunk
+            while not self.complete:
+                newline = self._buffer.find('\n')
+                if newline == -1:
+                    return False
+                line, self._buffer = self._buffer[:newline], self._buffer[newline + 1:]
+                self._line(line)
+            chunk, self._buffer = self._buffer, ""
+
+        extra = chunk.lstrip()
+        self.overflow = len(extra)
+        return bool(extra)
+
+    def finish(self):
+        """Parse the last, unterminated line once the completion has ended"""
+        if not self.complete and self._buffer:
+            line, self._buffer = self._buffer, ""
+            self._line(line)
+        return self
+
+    def parse(self, completion: str):
+        """Parse a finished completion in one go"""
+        self.feed(completion)
+        return self.finish()
+
+    def _line(self, line: str):
+        raise NotImplementedError
+
+
+class FieldParser(CompletionParser):
+    """`Key: value` lines; complete once every field in `fields` has a value"""
+
+    def __init__(self, fields=ANALYSIS_FIELDS):
+        super().__init__()
+        self.fields = fields
+        self.values = {}
+
+    def _line(self, line: str):
+        if ':' in line:
+            key, value = line.split(':', 1)
+            self.values[key.strip().lower()] = value.strip()
+            self.complete = all(self.values.get(field) for field in self.fields)
+
+
+class EmailParser(CompletionParser):
+    """Subject line and letter body; complete once the sign-off and the name under it are in"""
+
+    def __init__(self, default_subject: str = "Professional Email"):
+        super().__init__()
+        self.default_subject = default_subject
+        self.subject = None
+        self.lines = []
+        self._content_lines = 0
+        self._signed_off = False
+
+    def _line(self, line: str):
+        if self.subject is None and line.lower().startswith('subject:'):
+            # Anything before the subject is preamble, not body
+            self.subject = subject_text(line)
+            self.lines, self._content_lines, self._signed_off = [], 0, False
+            return
+
+        self.lines.append(line)
+        text = line.strip()
+        if not text:
+            return
+        if self._signed_off:
+            self.complete = True
+        elif self._content_lines >= 2 and text.rstrip(',!.').lower() in SIGN_OFFS:
+            # Greeting and at least one paragraph first, so a "Thanks," opener doesn't count
+            self._signed_off = True
+        else:
+            self._content_lines += 1
+
+    def email(self) -> Tuple[str, str]:
+        """(subject, body) of what has been parsed so far"""
+        body = '\n'.join(self.lines + [self._buffer]).strip()
+        return self.subject or self.default_subject, body
+
+
+class SuggestionParser(CompletionParser):
+    """One suggestion per non-empty line; complete at `limit` suggestions"""
+
+    def __init__(self, limit: int = MAX_SUGGESTIONS):
+        super().__init__()
+        self.limit = limit
+        self.suggestions = []
+
+    def _line(self, line: str):
+        if line.strip():
+            self.suggestions.append(line.strip().lstrip('•-*123456789.').strip())
+            self.complete = len(self.suggestions) >= self.limit
+
+
+# Tasks whose completions can be cut short; the rest (free-form strategy, single-line
+# subjects already ended by a stop sequence, JSON) always run to the model's own end
+TASK_PARSERS = {
+    "analysis": FieldParser,
+    "simple_analysis": FieldParser,
+    "email": EmailParser,
+    "variation": EmailParser,
+    "suggestions": SuggestionParser,
+}
+
+
+def parser_for(task: str) -> Optional[CompletionParser]:
+    """A fresh early-stop parser for a task, or None if it always runs to the end"""
+    parser_class = TASK_PARSERS.get(task)
+    return parser_class() if parser_class else None
+
+
+def subject_text(line: str) -> str:
+    return line.replace('Subject:', '').replace('subject:', '').strip()
+
+
+class StreamingEmailParser:
+    """Incrementally split a streamed completion into subject and body events.
+
+    Text is held back only until the Subject: line is complete; everything
+    after it is passed straight through as body chunks. If no subject shows
+    up within a few lines the default subject is used and buffering stops.
+    """
+
+    MAX_PREAMBLE_LINES = 3
+
+    def __init__(self, default_subject: str):
+        self.default_subject = default_subject
+        self.subject = None
+        self._buffer = ""
+        self._scanned = 0
+        self._preamble_lines = 0
+        self._body_started = False
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Consume one streamed chunk and return the events it completes"""
+        if self.subject is not None:
+            return self._body(chunk)
+
+        if not self._buffer:
+            # Mirror the blocking path, which strips the completion first
+            chunk = chunk.lstrip()
+        self._buffer += chunk
+        while True:
+            newline = self._buffer.find('\n', self._scanned)
+            if newline == -1:
+                return []
+
+            line = self._buffer[self._scanned:newline]
+            if line.lower().startswith('subject:'):
+                rest, self._buffer = self._buffer[newline + 1:], ""
+                return self._subject(line) + self._body(rest)
+
+            self._scanned = newline + 1
+            if line.strip():
+                self._preamble_lines += 1
+            if self._preamble_lines >= self.MAX_PREAMBLE_LINES:
+                buffered, self._buffer = self._buffer, ""
+                return self._subject(None) + self._body(buffered)
+
+    def finish(self) -> List[Dict]:
+        """Flush whatever is still buffered once the stream has ended"""
+        if self.subject is not None:
+            return []
+
+        buffered, self._buffer = self._buffer, ""
+        last_line = buffered[self._scanned:]
+        if last_line.lower().startswith('subject:'):
+            return self._subject(last_line)
+        return self._subject(None) + self._body(buffered)
+
+    def _subject(self, line: str) -> List[Dict]:
+        if line is None:
+            self.subject = self.default_subject
+        else:
+            self.subject = subject_text(line) or self.default_subject
+        return [{"type": "subject", "text": self.subject}]
+
+    def _body(self, text: str) -> List[Dict]:
+        if not self._body_started:
+            text = text.lstrip()
+            if not text:
+                return []
+            self._body_started = True
+        return [{"type": "body", "text": text}] if text else []
@@ -0,0 +1,240 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Dict, Hashable
+
+# Waiting calls beyond this are rejected rather than queued
+DEFAULT_MAX_QUEUE = 32
+# Assumed slot hold time before any call has finished, in seconds
+DEFAULT_HOLD_SECONDS = 2.0
+# Weight of the newest sample in the moving average of hold times
+HOLD_TIME_SMOOTHING = 0.2
+# Slots spare-capacity work (hedged duplicates) always leaves free for interactive calls
+BACKGROUND_RESERVED_SLOTS = 1
+# Background (speculative) calls running at once, at most; with OLLAMA_NUM_PARALLEL=1 each one
+# running is a decode an interactive call may have to wait behind
+BACKGROUND_SLOTS = 1
+# Quiet time after the last interactive call before background calls may start, so they don't
+# slip in between the steps of one generation
+BACKGROUND_IDLE_SECONDS = 0.5
+
+
+class SchedulerBusy(Exception):
+    """Raised instead of queueing a call when too many are already waiting"""
+
+    def __init__(self, queued: int, eta_seconds: float):
+        super().__init__(f"Server busy: {queued} requests already queued, try again in about {eta_seconds:.0f}s")
+        self.queued = queued
+        self.eta_seconds = eta_seconds
+
+
+class FairScheduler:
+    """Process-wide admission control for model calls.
+
+    At most `max_concurrency` calls run at once. Waiting calls queue per
+    session and freed slots are handed out round-robin across sessions, so
+    a mode that issues several calls cannot starve a single-call one.
+    Beyond `max_queue` waiting calls, new ones fail fast with
+    SchedulerBusy. Background calls only start once no interactive call
+    has run or waited for BACKGROUND_IDLE_SECONDS, BACKGROUND_SLOTS at a
+    time. Not thread-safe: use it from the loop that owns it.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int = DEFAULT_MAX_QUEUE):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.running = 0
+        self.rejected = 0
+        self.hold_seconds = DEFAULT_HOLD_SECONDS
+        # session -> waiting futures; dict order is the round-robin rotation
+        self._queues: "OrderedDict[Hashable, deque]" = OrderedDict()
+        self._running_by_session: Dict[Hashable, int] = {}
+        self.background_running = 0
+        # (session, future, ticket) of waiting background calls, first come first served
+        self._background = deque()
+        self._interactive_done_at = float("-inf")
+        self._wakeup = None
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiters) for waiters in self._queues.values())
+
+    @property
+    def background_limit(self) -> int:
+        """Slots background calls may fill"""
+        return min(BACKGROUND_SLOTS, self.max_concurrency)
+
+    @property
+    def spare_limit(self) -> int:
+        """Slots in use beyond which no spare capacity is lent out; with a single slot it may still be lent when idle"""
+        return max(1, self.max_concurrency - BACKGROUND_RESERVED_SLOTS)
+
+    @asynccontextmanager
+    async def slot(self, session: Hashable = None, background: bool = False, ticket: Hashable = None):
+        """Hold one of the concurrency slots for the duration of the block.
+
+        A `background` slot is for speculative work; while it waits,
+        promote(ticket) moves it up to interactive priority.
+        """
+        as_background = await self.acquire(session, background, ticket)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            held = time.perf_counter() - started
+            self.hold_seconds += HOLD_TIME_SMOOTHING * (held - self.hold_seconds)
+            self.release(session, as_background)
+
+    async def acquire(self, session: Hashable = None, background: bool = False, ticket: Hashable = None) -> bool:
+        """Wait for a slot; returns True if it was granted at background priority"""
+        if background:
+            return await self._acquire_background(session, ticket)
+
+        if self.running < self.max_concurrency and not self._queues:
+            self._start(session)
+            return False
+
+        queued = self.queued
+        if queued >= self.max_queue:
+            self.rejected += 1
+            raise SchedulerBusy(queued, self.estimate_wait(len(self._queues)))
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(session, deque()).append(waiter)
+        return await self._wait(session, waiter)
+
+    def try_acquire_spare(self, session: Hashable = None) -> bool:
+        """Take an idle slot at background priority without waiting, for optional work like hedged requests.
+
+        Returns False when anything is waiting or the background share is
+        in use; otherwise release it with release(session, background=True).
+        """
+        if self._queues or self._background or self.running >= self.spare_limit:
+            return False
+        self._start(session, background=True)
+        return True
+
+    async def _acquire_background(self, session: Hashable, ticket: Hashable) -> bool:
+        if not self._background and self._admits_background():
+            self._start(session, background=True)
+            return True
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._background.append((session, waiter, ticket))
+        self._dispatch()
+        return await self._wait(session, waiter)
+
+    async def _wait(self, session: Hashable, waiter: asyncio.Future) -> bool:
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled; pass it on
+                self.release(session, waiter.result())
+            else:
+                self._discard(session, waiter)
+            raise
+
+    def promote(self, ticket: Hashable) -> bool:
+        """Move a waiting background call to interactive priority, e.g. once a user's call joins it"""
+        for entry in self._background:
+            session, waiter, entry_ticket = entry
+            if entry_ticket == ticket and not waiter.done():
+                self._background.remove(entry)
+                self._queues.setdefault(session, deque()).append(waiter)
+                self._dispatch()
+                return True
+        return False
+
+    def release(self, session: Hashable = None, background: bool = False):
+        self.running -= 1
+        if background:
+            self.background_running -= 1
+        else:
+            self._interactive_done_at = time.monotonic()
+        remaining = self._running_by_session[session] - 1
+        if remaining:
+            self._running_by_session[session] = remaining
+        else:
+            del self._running_by_session[session]
+        self._dispatch()
+
+    def status(self, session: Hashable = None) -> Dict:
+        """Where a session stands: its calls running and queued, place in line and estimated wait.
+
+        `position` counts the sessions served before this one's next call
+        (0 means next in line) and is None when nothing of it is waiting.
+        """
+        waiters = self._queues.get(session)
+        position = list(self._queues).index(session) if waiters else None
+        return {
+            "running": self._running_by_session.get(session, 0),
+            "queued": len(waiters) if waiters else 0,
+            "position": position,
+            "eta_seconds": self.estimate_wait(position) if waiters else 0.0,
+            "total_running": self.running,
+            "total_queued": self.queued,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "background_running": self.background_running,
+            "background_queued": len(self._background),
+        }
+
+    def estimate_wait(self, ahead: int) -> float:
+        """Seconds until a call with `ahead` calls in front of it gets a slot"""
+        return round((ahead + 1) * self.hold_seconds / self.max_concurrency, 1)
+
+    def _start(self, session: Hashable, background: bool = False):
+        self.running += 1
+        self.background_running += background
+        self._running_by_session[session] = self._running_by_session.get(session, 0) + 1
+
+    def _dispatch(self):
+        while self.running < self.max_concurrency and self._queues:
+            session, waiters = self._queues.popitem(last=False)
+            waiter = waiters.popleft()
+            if waiters:
+                # Back of the rotation until every other waiting session has had a turn
+                self._queues[session] = waiters
+            if waiter.cancelled():
+                # Its caller gave up and has not yet woken to remove it
+                continue
+            self._start(session)
+            waiter.set_result(False)
+
+        # Speculative work only runs while the scheduler has nothing interactive to do
+        while self._background and self._admits_background():
+            session, waiter, _ = self._background.popleft()
+            if waiter.cancelled():
+                continue
+            self._start(session, background=True)
+            waiter.set_result(True)
+
+        if self._background and self._wakeup is None and not self._queues and self.running == self.background_running:
+            # Only the quiet time holds them back; look again once it has passed
+            delay = BACKGROUND_IDLE_SECONDS - (time.monotonic() - self._interactive_done_at)
+            if delay > 0:
+                self._wakeup = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _wake(self):
+        self._wakeup = None
+        self._dispatch()
+
+    def _admits_background(self) -> bool:
+        interactive = self.running - self.background_running
+        return (
+            not self._queues and not interactive and self.background_running < self.background_limit
+            and time.monotonic() - self._interactive_done_at >= BACKGROUND_IDLE_SECONDS
+        )
+
+    def _discard(self, session: Hashable, waiter: asyncio.Future):
+        waiters = self._queues.get(session)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del self._queues[session]
+        for entry in self._background:
+            if entry[1] is waiter:
+                self._background.remove(entry)
+                break
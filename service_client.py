@@ -0,0 +1,231 @@
+"""Blocking client for email_service.py.
+
+RemoteEmailAgent exposes the methods run_mode and the Streamlit app use,
+so either can talk to a running service instead of Ollama directly:
+
+    EMAIL_AGENT_SERVICE_URL=http://127.0.0.1:8600 streamlit run streamlit_app.py
+"""
+import concurrent.futures
+import copy
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+import httpx
+
+from deadlines import DeadlineExceeded, deadline_after, time_left
+from scheduler import SchedulerBusy
+from token_budgets import TokenBudgets
+
+DEFAULT_TIMEOUT_SECONDS = 300
+# The UI polls queue status on every plan tick; ask the service at most this often
+QUEUE_STATUS_INTERVAL_SECONDS = 0.5
+
+
+class RemoteEmailAgent:
+    """AgenticEmailAgent look-alike that forwards every call to the HTTP service.
+
+    The response cache, analysis shortcuts and metrics live in the service,
+    so they are None here; scrape the service's /metrics instead.
+    """
+
+    def __init__(self, base_url: str, timeout: float = DEFAULT_TIMEOUT_SECONDS):
+        self.base_url = base_url.rstrip("/")
+        self._client = httpx.Client(base_url=self.base_url, timeout=timeout)
+        self.model = None
+        self.cache = None
+        self.analysis_index = None
+        self.classifier = None
+        self.metrics = None
+        self.session = None
+        self.budgets = None
+        self.background = False
+        self.deadline = None
+        # Set on cancellable views: the connections of their requests in flight
+        self._requests = None
+        self._queue_status = None
+        self._queue_checked = 0.0
+
+    def with_budgets(self, budgets: TokenBudgets):
+        """View of this client that sends different token budgets with each call"""
+        view = copy.copy(self)
+        view.budgets = budgets
+        return view
+
+    def for_session(self, session):
+        """View of this client whose calls queue fairly under `session` in the service"""
+        view = copy.copy(self)
+        view.session = session
+        view._queue_status = None
+        return view
+
+    def with_deadline(self, seconds: float):
+        """View of this client whose calls the service abandons `seconds` from now"""
+        view = copy.copy(self)
+        view.deadline = deadline_after(seconds, self.deadline)
+        return view
+
+    def cancellable(self):
+        """View whose cancel() hangs up on every request made through it"""
+        view = copy.copy(self)
+        view._requests = _CancellableRequests(self.base_url, self._client.timeout)
+        return view
+
+    def as_background(self):
+        """View for speculative calls, queued behind interactive ones in the service; cancel() hangs up"""
+        view = self.cancellable()
+        view.background = True
+        return view
+
+    def cancel(self):
+        """Abort the requests of a cancellable or background view"""
+        if self._requests is not None:
+            self._requests.cancel()
+
+    def queue_status(self) -> Dict:
+        """This view's session's place in the service's queue, refreshed at most every half second"""
+        if self._queue_status is None or time.monotonic() - self._queue_checked >= QUEUE_STATUS_INTERVAL_SECONDS:
+            params = {"session": self.session} if self.session is not None else {}
+            self._queue_status = self._get("/queue", params)
+            self._queue_checked = time.monotonic()
+        return self._queue_status
+
+    def health(self) -> Dict:
+        """The service's model readiness status"""
+        return self._get("/health")
+
+    def refresh_model(self, force: bool = False):
+        """Ask the service which model it is serving"""
+        self.model = self.health().get("model")
+        return self.model
+
+    def find_working_model(self, force: bool = False):
+        return self.refresh_model(force)
+
+    def analyze_context_agentically(self, bullet_points: str) -> Dict:
+        return self._post("/analyze", bullet_points=bullet_points)
+
+    def generate_email_agentically(self, bullet_points: str, context: Dict = None) -> Dict:
+        return self._post("/email", bullet_points=bullet_points, context=context)
+
+    def stream_email_agentically(self, bullet_points: str, context: Dict = None):
+        return self._stream("/email/stream", bullet_points=bullet_points, context=context)
+
+    def improve_email_agentically(self, email_content: str) -> List[str]:
+        return self._post("/improve", email=email_content)
+
+    def generate_tone_variations_agentically(self, bullet_points: str) -> List[Dict]:
+        return self._post("/variations", bullet_points=bullet_points)
+
+    def stream_tone_variations_agentically(self, bullet_points: str):
+        return self._stream("/variations/stream", bullet_points=bullet_points)
+
+    def generate_email_structured(self, bullet_points: str) -> Dict:
+        return self._post("/structured", bullet_points=bullet_points)
+
+    def autonomous_email_strategy(self, bullet_points: str) -> Dict:
+        return self._post("/strategy", bullet_points=bullet_points)
+
+    def _payload(self, fields: Dict) -> Dict:
+        if self.session is not None:
+            fields["session"] = self.session
+        if self.background:
+            fields["background"] = True
+        if self.budgets is not None:
+            fields["creativity"] = self.budgets.creativity
+            fields["max_length"] = self.budgets.max_length
+        if self.deadline is not None:
+            fields["deadline_seconds"] = round(max(0.0, time_left(self.deadline)), 3)
+        return fields
+
+    @contextmanager
+    def _connection(self):
+        """The client for one request: the shared one, or on a cancellable view a client of its own"""
+        if self._requests is None:
+            yield self._client
+        else:
+            with self._requests.client() as client:
+                yield client
+
+    def _get(self, path: str, params: Dict = None):
+        with self._connection() as client:
+            response = client.get(path, params=params)
+        _raise_for_error(response)
+        return response.json()
+
+    def _post(self, path: str, **fields):
+        with self._connection() as client:
+            response = client.post(path, json=self._payload(fields))
+        _raise_for_error(response)
+        return response.json()
+
+    def _stream(self, path: str, **fields):
+        """Yield the events of a server-sent event endpoint; closing early hangs up on the service"""
+        with self._connection() as client, client.stream("POST", path, json=self._payload(fields)) as response:
+            if response.status_code != 200:
+                response.read()
+                _raise_for_error(response)
+            for line in response.iter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[len("data: "):])
+                if event["type"] == "error":
+                    if event.get("status") == 504:
+                        raise DeadlineExceeded(event["error"])
+                    raise Exception(f" Email service error: {event['error']}")
+                yield event
+
+
+class _CancellableRequests:
+    """Requests of a cancellable view, each on a client of its own so cancel() can hang up on them.
+
+    A client is closed as soon as its request finishes, so views that are
+    never cancelled hold no connections once they are idle.
+    """
+
+    def __init__(self, base_url: str, timeout):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.cancelled = False
+        self._clients = set()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def client(self):
+        client = httpx.Client(base_url=self.base_url, timeout=self.timeout)
+        with self._lock:
+            if self.cancelled:
+                client.close()
+                raise concurrent.futures.CancelledError()
+            self._clients.add(client)
+        try:
+            yield client
+        finally:
+            with self._lock:
+                self._clients.discard(client)
+            client.close()
+
+    def cancel(self):
+        """Hang up on every request in flight and refuse new ones"""
+        with self._lock:
+            self.cancelled = True
+            clients, self._clients = list(self._clients), set()
+        for client in clients:
+            client.close()
+
+
+def _raise_for_error(response: httpx.Response):
+    """Turn the service's error answers back into the exceptions the agent would raise"""
+    if response.status_code == 200:
+        return
+    try:
+        error = response.json()
+    except ValueError:
+        error = {"error": response.text}
+    if response.status_code == 503:
+        raise SchedulerBusy(error.get("queued", 0), error.get("eta_seconds", 0.0))
+    if response.status_code == 504:
+        raise DeadlineExceeded(error.get("error"))
+    raise Exception(f" Email service error ({response.status_code}): {error.get('error')}")
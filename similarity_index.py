@@ -0,0 +1,162 @@
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+DEFAULT_SIMILARITY_THRESHOLD = float(os.environ.get("EMAIL_AGENT_ANALYSIS_SIMILARITY", "0.8"))
+# Under 2 KB per entry; the shared app and long batches keep one index for their whole lifetime
+DEFAULT_MAX_ENTRIES = int(os.environ.get("EMAIL_AGENT_ANALYSIS_INDEX_ENTRIES", "20000"))
+SHINGLE_SIZE = 4
+# 12 LSH bands of 5 rows: inputs at 0.8 similarity share a band 99% of the time, while
+# unrelated lists (which still share common shingles like "ing ") almost never do, so a
+# lookup only compares against a handful of candidates
+NUM_PERMUTATIONS = 64
+BAND_ROWS = 5
+NUM_BANDS = NUM_PERMUTATIONS // BAND_ROWS
+# Signatures are stored packed, one uint32 per permutation
+BAND_BYTES = BAND_ROWS * 4
+
+# Fixed seed so signatures stay comparable between runs; odd multipliers for multiply-shift hashing
+_rng = np.random.default_rng(1729)
+_MULTIPLIERS = _rng.integers(1, 2 ** 63, NUM_PERMUTATIONS, dtype=np.uint64)[:, None] | np.uint64(1)
+_OFFSETS = _rng.integers(0, 2 ** 63, NUM_PERMUTATIONS, dtype=np.uint64)[:, None]
+
+BULLET_PATTERN = re.compile(r"^\s*(?:[-*•·–—>]+|\d+[.)])\s*")
+
+
+def shingles(text: str) -> Set[str]:
+    """Character shingles of each normalised line, so line order and bullet style don't matter"""
+    result = set()
+    for line in text.lower().splitlines():
+        line = " ".join(BULLET_PATTERN.sub("", line).split())
+        if len(line) <= SHINGLE_SIZE:
+            if line:
+                result.add(line)
+            continue
+        result.update(line[i:i + SHINGLE_SIZE] for i in range(len(line) - SHINGLE_SIZE + 1))
+    return result
+
+
+def minhash(shingle_set: Set[str]) -> Optional[bytes]:
+    """MinHash signature of a shingle set as packed uint32s, or None for empty input.
+
+    Each shingle is hashed once; the 64 hash functions are multiply-shift
+    permutations of that value, applied to every shingle at once in numpy.
+    """
+    if not shingle_set:
+        return None
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingle_set), dtype=np.uint64, count=len(shingle_set)
+    )
+    # uint64 arithmetic wraps, which is exactly the mod 2**64 multiply-shift needs
+    permuted = (_MULTIPLIERS * hashes + _OFFSETS) >> np.uint64(32)
+    return permuted.min(axis=1).astype(np.uint32).tobytes()
+
+
+def _band_keys(signature: bytes) -> List[int]:
+    """One hashed int per band; a collision only adds a candidate, which the similarity check rejects"""
+    return [hash(signature[i:i + BAND_BYTES]) for i in range(0, NUM_BANDS * BAND_BYTES, BAND_BYTES)]
+
+
+def _similarity(signature: np.ndarray, stored: bytes) -> float:
+    return np.count_nonzero(signature == np.frombuffer(stored, dtype=np.uint32)) / NUM_PERMUTATIONS
+
+
+class AnalysisIndex:
+    """Near-duplicate lookup of previously analysed bullet lists.
+
+    Each input is reduced to a MinHash signature over per-line character
+    shingles and bucketed by LSH bands, so a lookup only compares against
+    entries sharing a band, however large the index grows. The best
+    candidate whose estimated Jaccard similarity reaches `threshold`
+    returns its stored analysis. Least recently used entries are evicted
+    beyond `max_entries`. A band bucket holding a single entry stores its
+    id alone rather than a set, which is nearly every bucket.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_SIMILARITY_THRESHOLD, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # entry id -> (signature, analysis)
+        self._bands = [{} for _ in range(NUM_BANDS)]  # band key -> entry id, or a set of them
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, text: str) -> Optional[Dict]:
+        """Analysis of the most similar stored input at or above the threshold, else None"""
+        signature = minhash(shingles(text))
+        with self._lock:
+            best_id, best_similarity = None, self.threshold
+            if signature is not None:
+                unpacked = np.frombuffer(signature, dtype=np.uint32)
+                for entry_id in self._candidates(signature):
+                    similarity = _similarity(unpacked, self._entries[entry_id][0])
+                    if similarity >= best_similarity:
+                        best_id, best_similarity = entry_id, similarity
+
+            if best_id is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["hits"] += 1
+            self._entries.move_to_end(best_id)
+            return dict(self._entries[best_id][1])
+
+    def add(self, text: str, analysis: Dict):
+        """Remember the analysis of an input"""
+        signature = minhash(shingles(text))
+        if signature is None:
+            return
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (signature, dict(analysis))
+            for band, key in zip(self._bands, _band_keys(signature)):
+                bucket = band.setdefault(key, entry_id)
+                if isinstance(bucket, set):
+                    bucket.add(entry_id)
+                elif bucket != entry_id:
+                    band[key] = {bucket, entry_id}
+
+            while len(self._entries) > self.max_entries:
+                old_id, (old_signature, _) = self._entries.popitem(last=False)
+                for band, key in zip(self._bands, _band_keys(old_signature)):
+                    bucket = band[key]
+                    if not isinstance(bucket, set):
+                        del band[key]
+                        continue
+                    bucket.discard(old_id)
+                    if len(bucket) == 1:
+                        band[key] = bucket.pop()
+                self.counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for band in self._bands:
+                band.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+            counters["entries"] = len(self._entries)
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = counters["hits"] / lookups if lookups else 0.0
+        return counters
+
+    def _candidates(self, signature: bytes) -> Set[int]:
+        candidates = set()
+        for band, key in zip(self._bands, _band_keys(signature)):
+            bucket = band.get(key)
+            if isinstance(bucket, set):
+                candidates.update(bucket)
+            elif bucket is not None:
+                candidates.add(bucket)
+        return candidates
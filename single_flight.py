@@ -0,0 +1,115 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable
+
+
+class _Flight:
+    """One call in progress, the chunks it has produced and how many callers wait on it"""
+
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.task = None
+        self.waiters = 0
+        self.chunks = []
+        self.final = {}
+        self.updated = asyncio.Event()
+
+    def notify(self):
+        """Wake every caller waiting for the next chunk or the end"""
+        updated, self.updated = self.updated, asyncio.Event()
+        updated.set()
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one.
+
+    The first caller for a key starts the work as a task of its own;
+    callers arriving while it runs attach to it and receive the same
+    result, chunks or exception. The work is cancelled only once every
+    caller has gone away, so one session abandoning a request never breaks
+    the others. Not thread-safe: use it from the loop that owns it.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable]):
+        """Await `call()`, or the identical call already in flight under `key`"""
+        flight = self._join(key, lambda flight: call())
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            self._leave(flight)
+
+    async def stream(
+        self,
+        key: Hashable,
+        start: Callable[[Dict], AsyncIterator[str]],
+        final: Dict = None
+    ) -> AsyncIterator[str]:
+        """Yield the chunks of `start(final)`, or of the identical stream already in flight.
+
+        Late joiners first replay the chunks produced so far. `final`, if
+        given, receives the producer's final response once the stream ends.
+        """
+        flight = self._join(key, lambda flight: self._pump(flight, start))
+        try:
+            position = 0
+            while True:
+                updated = flight.updated
+                if position < len(flight.chunks):
+                    yield flight.chunks[position]
+                    position += 1
+                elif flight.task.done():
+                    break
+                else:
+                    await updated.wait()
+
+            flight.task.result()  # re-raise the producer's failure
+            if final is not None:
+                final.update(flight.final)
+        finally:
+            self._leave(flight)
+
+    def _join(self, key: Hashable, start: Callable[[_Flight], Awaitable]) -> _Flight:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(key)
+            self._flights[key] = flight
+            flight.task = asyncio.ensure_future(start(flight))
+            flight.task.add_done_callback(lambda task: self._finish(flight))
+        flight.waiters += 1
+        return flight
+
+    def _leave(self, flight: _Flight):
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            # Nobody is left to read the result; stop the work and let new callers start afresh
+            self._forget(flight)
+            flight.task.cancel()
+
+    def _finish(self, flight: _Flight):
+        self._forget(flight)
+        if not flight.task.cancelled():
+            # Mark any failure retrieved; the waiters that need it re-raise it themselves
+            flight.task.exception()
+        flight.notify()
+
+    def _forget(self, flight: _Flight):
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    async def _pump(self, flight: _Flight, start: Callable[[Dict], AsyncIterator[str]]):
+        chunks = start(flight.final)
+        try:
+            async for chunk in chunks:
+                flight.chunks.append(chunk)
+                flight.notify()
+        finally:
+            # Close explicitly so a cancelled stream releases its HTTP connection now, not at GC
+            await chunks.aclose()
@@ -0,0 +1,191 @@
+"""Cold-start times of the Streamlit app.
+
+Every trial runs in a fresh interpreter, so nothing is imported yet:
+
+  import_ms       importing one module on its own
+  first_paint_ms  the app's first script run under streamlit.testing, i.e.
+                  until the page shell (title, sidebar, input) has been sent
+  ready_ms        until the sidebar shows the discovered model
+
+First paint is measured against a responsive fake Ollama and against a
+stalled one that accepts connections but never answers.
+
+Usage:
+    python startup_benchmark.py --output startup_results.json
+    python startup_benchmark.py --baseline startup_baseline.json --threshold 0.25
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+from fake_ollama import FakeOllamaServer
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "streamlit_app.py")
+# streamlit itself is the floor the app's own imports add to
+IMPORT_MODULES = ("streamlit", "streamlit_app", "email_agent")
+# Absolute floors in milliseconds, so interpreter noise never fails a run
+MIN_REGRESSION = {"import_ms": 20.0, "first_paint_ms": 50.0, "ready_ms": 100.0}
+DEFAULT_PAINT_TIMEOUT_SECONDS = 10.0
+# Allowance on top of the paint timeout for starting the interpreter and importing streamlit
+PROCESS_GRACE_SECONDS = 20.0
+
+IMPORT_SNIPPET = """
+import sys, time
+started = time.perf_counter()
+__import__(sys.argv[1])
+print((time.perf_counter() - started) * 1000)
+"""
+
+PAINT_SNIPPET = """
+import json, os, sys, time
+from streamlit.testing.v1 import AppTest
+
+def model_shown(app):
+    return any("AI Model" in element.value for element in app.sidebar.success)
+
+app = AppTest.from_file(sys.argv[1], default_timeout=float(sys.argv[2]))
+started = time.perf_counter()
+app.run()
+result = {"first_paint_ms": (time.perf_counter() - started) * 1000, "ready_ms": None}
+while sys.argv[3] == "wait" and time.perf_counter() - started < float(sys.argv[2]):
+    if model_shown(app):
+        result["ready_ms"] = (time.perf_counter() - started) * 1000
+        break
+    time.sleep(0.05)
+    app.run()
+print(json.dumps(result), flush=True)
+os._exit(0)
+"""
+
+
+def app_env(ollama_host: str) -> Dict[str, str]:
+    """Environment for an app subprocess talking to `ollama_host` with nothing running in the background"""
+    env = dict(os.environ, OLLAMA_HOST=ollama_host, EMAIL_AGENT_PREFETCH="0")
+    for name in ("EMAIL_AGENT_OLLAMA_HOSTS", "EMAIL_AGENT_SERVICE_URL", "EMAIL_AGENT_METRICS_PORT"):
+        env.pop(name, None)
+    return env
+
+
+def time_import(module: str, trials: int) -> Dict:
+    samples = []
+    for _ in range(trials):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET, module], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(APP_PATH)
+        ).stdout
+        samples.append(float(output.strip().splitlines()[-1]))
+    return {"import_ms": round(statistics.median(samples), 1)}
+
+
+def time_paint(ollama_host: str, trials: int, timeout: float, wait_ready: bool) -> Dict:
+    """Median first paint (and time to ready) of fresh app processes; None if a run timed out"""
+    runs = []
+    for _ in range(trials):
+        try:
+            output = subprocess.run(
+                [sys.executable, "-c", PAINT_SNIPPET, APP_PATH, str(timeout), "wait" if wait_ready else "paint"],
+                capture_output=True, text=True, check=True, cwd=os.path.dirname(APP_PATH), env=app_env(ollama_host),
+                timeout=timeout + PROCESS_GRACE_SECONDS
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        except (subprocess.TimeoutExpired, subprocess.CalledProcessError):
+            # A script run blocked on Ollama never finishes, and streamlit.testing may not give up on it either
+            runs.append({"first_paint_ms": None, "ready_ms": None})
+
+    case = {}
+    for metric in ("first_paint_ms", "ready_ms") if wait_ready else ("first_paint_ms",):
+        samples = [run[metric] for run in runs]
+        case[metric] = round(statistics.median(samples), 1) if None not in samples else None
+    return case
+
+
+def stalled_ollama() -> socket.socket:
+    """A listening socket that never accepts: connections succeed, requests never get an answer"""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(64)
+    return listener
+
+
+def run_benchmarks(trials: int = 3, paint_timeout: float = DEFAULT_PAINT_TIMEOUT_SECONDS) -> Dict:
+    results = {"trials": trials, "cases": {}}
+    for module in IMPORT_MODULES:
+        results["cases"][f"import:{module}"] = time_import(module, trials)
+
+    with FakeOllamaServer() as server:
+        results["cases"]["paint:responsive_ollama"] = time_paint(server.host, trials, paint_timeout, wait_ready=True)
+
+    listener = stalled_ollama()
+    try:
+        host = f"http://127.0.0.1:{listener.getsockname()[1]}"
+        results["cases"]["paint:stalled_ollama"] = time_paint(host, trials, paint_timeout, wait_ready=False)
+    finally:
+        listener.close()
+    return results
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """List every metric that regressed beyond `threshold` relative to the baseline"""
+    regressions = []
+    for name, base in baseline.get("cases", {}).items():
+        current = results["cases"].get(name)
+        if current is None:
+            continue
+
+        for metric, floor in MIN_REGRESSION.items():
+            if metric not in base or metric not in current:
+                continue
+            if current[metric] is None and base[metric] is not None:
+                regressions.append(f"{name}: {metric} {base[metric]} -> timed out")
+            elif None not in (current[metric], base[metric]):
+                if current[metric] > base[metric] * (1 + threshold) and current[metric] - base[metric] > floor:
+                    regressions.append(f"{name}: {metric} {base[metric]} -> {current[metric]}")
+    return regressions
+
+
+def print_report(results: Dict):
+    print(f"{'case':<30} {'import ms':>10} {'first paint ms':>15} {'ready ms':>10}")
+    for name, case in results["cases"].items():
+        values = [case.get(metric, '') for metric in ("import_ms", "first_paint_ms", "ready_ms")]
+        values = ["timed out" if value is None else value for value in values]
+        print(f"{name:<30} {values[0]:>10} {values[1]:>15} {values[2]:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cold start of the Streamlit app")
+    parser.add_argument("--output", default="startup_results.json", help="where to write the results JSON")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown before failing")
+    parser.add_argument("--trials", type=int, default=3, help="fresh processes per case; the median is reported")
+    parser.add_argument(
+        "--paint-timeout", type=float, default=DEFAULT_PAINT_TIMEOUT_SECONDS,
+        help="seconds before a script run counts as timed out"
+    )
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.trials, args.paint_timeout)
+    print_report(results)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print("\n❌ Regressions against baseline:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            return 1
+        print(" No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
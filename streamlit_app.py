@@ -1,11 +1,120 @@
 import streamlit as st
-import json
-from email_agent import AgenticEmailAgent
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from deadlines import DeadlineExceeded
+from examples import EXAMPLES
+from generation_plan import run_deferred, run_mode
+from prefetcher import Prefetcher
+from scheduler import SchedulerBusy
+from token_budgets import TokenBudgets
+# email_agent (ollama, httpx) and service_client are imported by get_shared_agent, off the first paint
+
+MODE_KEYS = {
+    " Full Autonomy": "full_autonomy",
+    " Fast Autonomy (single call)": "fast_autonomy",
+    " Creative Variations": "creative_variations",
+    " Strategic Analysis": "strategic_analysis",
+}
+# Secondary outputs (suggestions, strategy) computing after the main email is shown
+BACKGROUND_WORKERS = 4
+DEFERRED_POLL_SECONDS = 0.5
+# How often the page checks whether the agent has finished connecting, and when it gives up
+STARTUP_POLL_SECONDS = 0.25
+STARTUP_TIMEOUT_SECONDS = float(os.environ.get("EMAIL_AGENT_STARTUP_TIMEOUT", "30"))
+# How stale the sidebar health status may get; it is refreshed off the rerun, so no page waits on Ollama's probe
+HEALTH_REFRESH_SECONDS = 10
+# Longest a generation (and each output computed after it) may take before the UI gives up on it
+MODE_DEADLINE_SECONDS = float(os.environ.get("EMAIL_AGENT_MODE_DEADLINE", "180"))
+
+@st.cache_resource(show_spinner=False)
+def get_shared_agent():
+    """One agent, connection pool and response cache shared by every session in this process"""
+    service_url = os.environ.get("EMAIL_AGENT_SERVICE_URL")
+    if service_url:
+        # Generation runs in email_service.py; this process is just a client of it
+        from service_client import RemoteEmailAgent
+        return RemoteEmailAgent(service_url)
+    
+    from email_agent import AgenticEmailAgent
+    agent = AgenticEmailAgent()
+    
+    metrics_port = os.environ.get("EMAIL_AGENT_METRICS_PORT")
+    if metrics_port:
+        agent.metrics.serve_prometheus(int(metrics_port))
+    return agent
+
+@st.cache_resource(show_spinner=False)
+def start_agent():
+    """Build the shared agent on a background thread, so the page renders while Ollama answers.
+
+    Returns {"future", "started_at"}; the future holds the agent, or the error that prevented it.
+    """
+    startup = {"started_at": time.monotonic()}
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="email-agent-startup")
+    startup["future"] = executor.submit(get_shared_agent)
+    executor.shutdown(wait=False)
+    return startup
+
+@st.cache_resource(show_spinner=False)
+def get_background_pool():
+    """Worker threads shared by every session for outputs computed after the main email"""
+    return ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix="email-deferred")
+
+@st.cache_resource(show_spinner=False)
+def get_prefetcher():
+    """Background generation of the examples, and of other modes for bullets just generated.
+
+    Set EMAIL_AGENT_PREFETCH=0 to turn it off, e.g. on a busy shared server.
+    """
+    if os.environ.get("EMAIL_AGENT_PREFETCH", "1") == "0":
+        return None
+    prefetcher = Prefetcher(get_shared_agent())
+    prefetcher.prefetch_examples(EXAMPLES.values())
+    return prefetcher
+
+@st.cache_resource(show_spinner=False)
+def get_health_monitor():
+    """The shared agent's last health status, refreshed on a thread of its own"""
+    return {
+        "status": None, "checked_at": 0.0, "future": None, "lock": threading.Lock(),
+        "executor": ThreadPoolExecutor(max_workers=1, thread_name_prefix="email-agent-health"),
+    }
+
+def read_health(agent):
+    """The agent's latest health status; only the very first check is waited for"""
+    monitor = get_health_monitor()
+    
+    def store(done):
+        with monitor["lock"]:
+            monitor["future"], monitor["checked_at"] = None, time.monotonic()
+            if done.exception() is None:
+                monitor["status"] = done.result()
+    
+    with monitor["lock"]:
+        future = monitor["future"]
+        stale = monitor["status"] is None or time.monotonic() - monitor["checked_at"] >= HEALTH_REFRESH_SECONDS
+        started = future is None and stale
+        if started:
+            future = monitor["future"] = monitor["executor"].submit(agent.health)
+        status = monitor["status"]
+    if started:
+        future.add_done_callback(store)
+    # Until the first check completes there is nothing to show, so that one is waited for
+    return status if status is not None else future.result()
 
 def initialize_agent():
-    """Initialize the agentic email agent"""
+    """The agentic email agent, or (None, None) while it is still connecting"""
+    startup = start_agent()
+    if not startup["future"].done():
+        if time.monotonic() - startup["started_at"] > STARTUP_TIMEOUT_SECONDS:
+            return None, f"❌ Error initializing agent: no answer from Ollama after {STARTUP_TIMEOUT_SECONDS:.0f}s"
+        return None, None
     try:
-        agent = AgenticEmailAgent()
+        agent = startup["future"].result()
+        agent.refresh_model()
         return agent, None
     except Exception as e:
         error_msg = str(e)
@@ -24,15 +133,18 @@ def main():
     st.title(" Agentic Email Generator")
     st.markdown("**AI-powered autonomous email creation  using *qwen2.5:0.5b*")
     
-    # Initialize agent
+    # Connect in the background; everything below renders without the agent until it is ready
     if 'agent' not in st.session_state or 'agent_error' not in st.session_state:
-        with st.spinner(" Initializing AI agent..."):
-            agent, error = initialize_agent()
+        agent, error = initialize_agent()
+        if agent or error:
             st.session_state.agent = agent
             st.session_state.agent_error = error
     
-    agent = st.session_state.agent
-    error = st.session_state.agent_error
+    agent = st.session_state.get('agent')
+    error = st.session_state.get('agent_error')
+    # Identifies this browser session to the shared agent's fair scheduler
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
     
     # Show status
     if error:
@@ -40,6 +152,9 @@ def main():
         st.info(" Make sure you have run: `ollama pull tinyllama`")
         
         if st.button("🔄 Retry Connection"):
+            start_agent.clear()
+            get_shared_agent.clear()
+            get_health_monitor.clear()
             del st.session_state.agent
             del st.session_state.agent_error
             st.rerun()
@@ -53,6 +168,39 @@ def main():
         if agent and agent.model:
             st.success(f" AI Model: {agent.model}")
             st.info(" Truly agentic behavior - AI makes all decisions")
+            show_model_health(agent)
+        elif not agent:
+            show_connecting()
+        
+        if agent and agent.cache:
+            cache_stats = agent.cache.stats()
+            st.caption(
+                f"Response cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                f"({cache_stats['hit_rate']:.0%}), {cache_stats['bypassed']} bypassed"
+            )
+        
+        if agent and agent.analysis_index is not None:
+            index_stats = agent.analysis_index.stats()
+            st.caption(
+                f"Analysis reuse: {index_stats['hits']} near-duplicate hits across "
+                f"{index_stats['entries']} remembered inputs"
+            )
+        
+        prefetcher = get_prefetcher() if agent else None
+        if prefetcher:
+            prefetch_stats = prefetcher.stats()
+            st.caption(
+                f"Prefetch: {prefetch_stats['ready']} results ready, {prefetch_stats['pending']} in progress, "
+                f"{prefetch_stats['taken']} served instantly"
+            )
+        
+        if agent and agent.classifier is not None:
+            rule_stats = agent.classifier.stats()
+            st.caption(
+                f"Keyword rules answered {rule_stats['answered']} of "
+                f"{rule_stats['answered'] + rule_stats['partial'] + rule_stats['fell_through']} analyses without the model, "
+                f"{rule_stats['partial']} in part"
+            )
         
         st.markdown("###  Agentic Features:")
         st.markdown("• **Autonomous Analysis** - AI decides context")
@@ -60,11 +208,20 @@ def main():
         st.markdown("• **Creative Writing** - AI crafts content")
         st.markdown("• **Smart Optimization** - AI improves results")
         
+        if agent and agent.metrics:
+            with st.expander("📊 Inference Metrics"):
+                rows = agent.metrics.summary()
+                if rows:
+                    st.dataframe(rows, hide_index=True, use_container_width=True)
+                    st.caption("Shares split Ollama time into model load, prompt processing and decoding")
+                else:
+                    st.caption("No model calls yet")
+        
         # Generation modes
         st.header("⚙️ Generation Mode")
         mode = st.selectbox(
             "Choose mode:",
-            [" Full Autonomy", " Creative Variations", " Strategic Analysis"]
+            list(MODE_KEYS)
         )
         
         # Advanced settings
@@ -83,30 +240,24 @@ def main():
             "Enter your bullet points:",
             placeholder="• Meeting with John tomorrow at 2pm\n• Discuss Q4 budget planning\n• Need approval for new project\n• Bring financial reports and proposals",
             height=200,
-            help="Enter the key points you want to communicate"
+            help="Enter the key points you want to communicate",
+            key="bullet_input"
         )
         
         # Generate button
         if st.button(" Generate Agentic Email", type="primary", use_container_width=True):
             if not agent:
-                st.error("❌ AI agent not available")
+                st.warning("⏳ Still connecting to Ollama, try again in a moment")
             elif bullet_points.strip():
-                with st.spinner("🤖 AI is autonomously analyzing and crafting your email..."):
-                    generate_email(agent, bullet_points, mode, creativity, max_length)
+                generate_email(agent, bullet_points, mode, creativity, max_length, col2)
             else:
                 st.error("Please enter some bullet points first!")
         
         # Quick examples
         st.subheader("💡 Example Scenarios")
         
-        examples = {
-            "📅 Meeting Request": "• Meeting with Sarah next Friday\n• Discuss Q4 budget planning\n• Need her input on new proposals\n• Bring last quarter's financial reports",
-            "📋 Urgent Request": "• Need immediate approval for software purchase\n• $5,000 budget required for team tools\n• Will significantly improve productivity\n• Decision needed by end of week",
-            "📧 Follow-up": "• Following up on yesterday's strategy call\n• Discussed new marketing initiatives\n• Need decision on budget allocation\n• Timeline is critical for Q1 launch",
-            "🤝 Thank You": "• Thank you for the excellent presentation\n• Learned valuable insights about process improvement\n• Would like to discuss implementation\n• Coffee meeting next week?"
-        }
         
-        for label, example in examples.items():
+        for label, example in EXAMPLES.items():
             if st.button(label, use_container_width=True):
                 st.session_state.example_text = example
                 st.rerun()
@@ -114,9 +265,8 @@ def main():
         # Show selected example
         if 'example_text' in st.session_state:
             st.text_area("Selected Example:", value=st.session_state.example_text, height=100, disabled=True)
-            if st.button(" Use This Example"):
-                st.session_state.bullet_input = st.session_state.example_text
-                st.rerun()
+            # A callback, because the input widget above already exists in this run
+            st.button(" Use This Example", on_click=use_example)
     
     with col2:
         st.header(" AI-Generated Results")
@@ -128,50 +278,190 @@ def main():
         else:
             display_results(st.session_state.email_result)
 
-def generate_email(agent, bullet_points, mode, creativity, max_length):
+def use_example():
+    st.session_state.bullet_input = st.session_state.example_text
+
+def show_connecting():
+    """Sidebar connection state while the agent starts; reruns the page once it is ready"""
+    startup = start_agent()
+    
+    @st.fragment(run_every=STARTUP_POLL_SECONDS)
+    def poll():
+        waited = time.monotonic() - startup["started_at"]
+        if startup["future"].done() or waited > STARTUP_TIMEOUT_SECONDS:
+            st.rerun()
+        st.info(f"🟡 Connecting to Ollama and finding the model... ({waited:.0f}s)")
+    
+    poll()
+
+def show_model_health(agent):
+    """Sidebar readiness indicator fed by the agent's warm-up and keep-alive status"""
+    health = read_health(agent)
+    
+    if health['state'] == 'error':
+        st.error(f"🔴 Model warm-up failed: {health['error']}")
+    elif health['state'] == 'ready' and health['resident'] is not False:
+        st.success("🟢 Model loaded and ready")
+    else:
+        st.warning("🟡 Loading model into memory in the background...")
+    
+    details = [f"keep_alive: {health['keep_alive']}"]
+    if health.get('warmup_seconds') is not None:
+        details.append(f"warm-up took {health['warmup_seconds']}s")
+    if health.get('expires_at'):
+        details.append(f"resident until {health['expires_at']}")
+    st.caption(" · ".join(details))
+
+def generate_email(agent, bullet_points, mode, creativity, max_length, results_column):
     """Generate email using agentic AI"""
+    status = QueueStatus(st.empty())
     try:
-        if mode == " Full Autonomy":
-            # Full autonomous generation
-            result = agent.generate_email_agentically(bullet_points)
-            analysis = agent.analyze_context_agentically(bullet_points)
-            suggestions = agent.improve_email_agentically(result.get('full_email', ''))
-            
-            st.session_state.email_result = {
-                'type': 'single',
-                'data': result,
-                'analysis': analysis,
-                'suggestions': suggestions
-            }
-            
-        elif mode == " Creative Variations":
-            # Multiple agentic approaches
-            variations = agent.generate_tone_variations_agentically(bullet_points)
-            
-            st.session_state.email_result = {
-                'type': 'variations',
-                'data': variations
-            }
-            
-        elif mode == " Strategic Analysis":
-            # Strategic analysis + email
-            strategy = agent.autonomous_email_strategy(bullet_points)
-            result = agent.generate_email_agentically(bullet_points)
-            analysis = agent.analyze_context_agentically(bullet_points)
-            
-            st.session_state.email_result = {
-                'type': 'strategic',
-                'data': result,
-                'analysis': analysis,
-                'strategy': strategy
-            }
+        preview = StreamingPreview(results_column.container())
+        budgets = TokenBudgets(creativity, max_length)
+        cancel_deferred()
+        # Cancelled as a whole once this result is replaced or the script is interrupted
+        session_agent = agent.for_session(st.session_state.session_id).with_budgets(budgets).cancellable()
+        st.session_state.request_agent = session_agent
+        prefetcher = get_prefetcher()
+        result = prefetcher.take(MODE_KEYS[mode], bullet_points, budgets) if prefetcher else None
+        if result is None:
+            result = run_mode(
+                session_agent, MODE_KEYS[mode], bullet_points,
+                on_event=preview, on_tick=lambda: status.update(session_agent.queue_status()), defer=True,
+                deadline=MODE_DEADLINE_SECONDS
+            )
+        st.session_state.email_result = result
+        # The main email is ready; suggestions and strategy follow in the background
+        pool = get_background_pool()
+        st.session_state.deferred_outputs = {
+            name: pool.submit(
+                run_deferred, session_agent, MODE_KEYS[mode], bullet_points, result, name, MODE_DEADLINE_SECONDS
+            )
+            for name in result.get('deferred', [])
+        }
+        if prefetcher:
+            # Whichever mode the user tries next for these bullets is likely done by then
+            prefetcher.speculate(bullet_points, MODE_KEYS[mode], budgets, owner=st.session_state.session_id)
+        
+        metrics_file = os.environ.get("EMAIL_AGENT_METRICS_FILE")
+        if metrics_file and agent.metrics:
+            agent.metrics.write_prometheus(metrics_file)
         
         st.rerun()
         
+    except SchedulerBusy as e:
+        status.clear()
+        st.warning(f"⏳ {e}")
+    except DeadlineExceeded as e:
+        status.clear()
+        st.warning(f"⏳ Generation took too long and was stopped:{e}. Try again, or lower the max length.")
     except Exception as e:
+        status.clear()
         st.error(f" AI generation failed: {str(e)}")
         st.info(" Make sure TinyLlama is running: `ollama list` should show tinyllama")
 
+def cancel_deferred():
+    """Drop background work for a result that is being replaced, stopping its model calls"""
+    for future in st.session_state.pop('deferred_outputs', {}).values():
+        future.cancel()
+    request_agent = st.session_state.pop('request_agent', None)
+    if request_agent is not None:
+        request_agent.cancel()
+
+def show_deferred(result, name, label, render):
+    """Render a secondary output, waiting on its background call until the result is memoized.
+
+    While the call runs only a small fragment polls it; once it lands in
+    the session's email_result the whole page reruns and renders it directly.
+    """
+    if name in result:
+        render(result[name])
+        return
+    
+    future = st.session_state.get('deferred_outputs', {}).get(name)
+    if future is None:
+        return
+    
+    @st.fragment(run_every=DEFERRED_POLL_SECONDS)
+    def poll():
+        if not future.done():
+            st.caption(f"⏳ {label}...")
+            return
+        
+        st.session_state.get('deferred_outputs', {}).pop(name, None)
+        try:
+            result[name] = future.result()
+        except Exception as e:
+            result[name] = None
+            result.setdefault('deferred_errors', {})[name] = str(e)
+        st.rerun()
+    
+    poll()
+
+class QueueStatus:
+    """Queue position and estimated wait, shown in place of a spinner while a mode runs"""
+    
+    def __init__(self, placeholder):
+        self.placeholder = placeholder
+        self.message = None
+        self.update({'position': None})
+    
+    def update(self, status):
+        if status['position'] is not None:
+            message = f"⏳ Waiting in queue: position {status['position'] + 1}, estimated wait ~{status['eta_seconds']:.0f}s"
+        else:
+            message = "🤖 AI is autonomously analyzing and crafting your email..."
+        # Only touch the page when the text changes; this is called every poll
+        if message != self.message:
+            self.placeholder.info(message)
+            self.message = message
+    
+    def clear(self):
+        self.placeholder.empty()
+
+class StreamingPreview:
+    """Progressively renders streamed subject/body events while a mode runs.
+
+    Called from the generation plan on the script thread; the final
+    display_results render replaces it on the following rerun.
+    """
+    
+    def __init__(self, container):
+        self.container = container
+        self.slots = {}
+    
+    def __call__(self, task_name, event):
+        key = event.get('approach', task_name)
+        if key not in self.slots:
+            with self.container:
+                if 'approach' in event:
+                    st.markdown(f"**AI's {key.title()} Approach (writing...)**")
+                else:
+                    st.markdown("**AI is writing your email...**")
+                self.slots[key] = {'subject': st.empty(), 'body': st.empty(), 'text': ''}
+        
+        slot = self.slots[key]
+        if event['type'] == 'subject':
+            slot['subject'].markdown(f"**Subject:** {event['text']}")
+        elif event['type'] == 'body':
+            slot['text'] += event['text']
+            slot['body'].text(slot['text'])
+
+def show_truncation_warning(email_data):
+    """Flag drafts that stopped at their token budget instead of finishing"""
+    if email_data.get('truncated'):
+        st.warning("✂️ This draft hit its token budget and may be cut off. Raise 'Response Length' in Advanced AI Settings.")
+
+def show_suggestions(suggestions):
+    if suggestions:
+        with st.expander(" AI's Improvement Suggestions"):
+            st.markdown("** Autonomous optimization recommendations:**")
+            for i, suggestion in enumerate(suggestions, 1):
+                st.write(f"{i}. {suggestion}")
+
+def show_strategy(strategy):
+    st.markdown((strategy or {}).get('strategy_analysis', 'No strategic analysis available'))
+
 def display_results(result):
     """Display the AI-generated results"""
     
@@ -179,7 +469,6 @@ def display_results(result):
         # Single email with AI analysis
         email_data = result['data']
         analysis = result.get('analysis', {})
-        suggestions = result.get('suggestions', [])
         
         # Show AI's autonomous decisions
         with st.expander(" AI's Autonomous Analysis & Decisions", expanded=True):
@@ -198,6 +487,7 @@ def display_results(result):
         # Subject line
         subject = email_data.get('subject', 'No Subject')
         st.text_input(" AI-Optimized Subject:", value=subject, disabled=True)
+        show_truncation_warning(email_data)
         
         # Email content
         email_body = email_data.get('full_email', 'Error generating email')
@@ -223,11 +513,7 @@ def display_results(result):
             )
         
         # AI suggestions
-        if suggestions:
-            with st.expander(" AI's Improvement Suggestions"):
-                st.markdown("** Autonomous optimization recommendations:**")
-                for i, suggestion in enumerate(suggestions, 1):
-                    st.write(f"{i}. {suggestion}")
+        show_deferred(result, 'suggestions', "AI is reviewing the draft for improvements", show_suggestions)
     
     elif result['type'] == 'variations':
         # Multiple agentic variations
@@ -246,6 +532,7 @@ def display_results(result):
                     key=f"subj_{variation.get('tone_used', 'var')}"
                 )
                 
+                show_truncation_warning(variation)
                 email_content = variation.get('full_email', 'Error')
                 st.text_area(
                     f"AI's {variation.get('approach', 'Creative')} Approach:",
@@ -266,17 +553,17 @@ def display_results(result):
         # Strategic analysis + email
         email_data = result['data']
         analysis = result.get('analysis', {})
-        strategy = result.get('strategy', {})
         
         # Strategic analysis
         st.subheader(" AI's Strategic Communication Analysis")
-        st.markdown(strategy.get('strategy_analysis', 'No strategic analysis available'))
+        show_deferred(result, 'strategy', "AI is developing the communication strategy", show_strategy)
         
         # Generated email
         st.subheader(" Strategically Optimized Email")
         
         subject = email_data.get('subject', 'No Subject')
         st.text_input("Subject:", value=subject, disabled=True)
+        show_truncation_warning(email_data)
         
         email_body = email_data.get('full_email', 'Error')
         st.text_area(
@@ -292,12 +579,16 @@ def display_results(result):
             mime="text/plain"
         )
     
+    for name, error in result.get('deferred_errors', {}).items():
+        st.warning(f" Could not generate {name}: {error}")
+    
     # Action buttons
     col_btn1, col_btn2 = st.columns(2)
     with col_btn1:
         if st.button("🔄 Generate New", use_container_width=True):
             if 'email_result' in st.session_state:
                 del st.session_state.email_result
+            cancel_deferred()
             st.rerun()
     
     with col_btn2:
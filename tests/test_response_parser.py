@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from email_agent import AsyncAgenticEmailAgent
+from fake_ollama import CANNED_RESPONSES, FakeOllamaServer
+from response_parser import EmailParser, FieldParser, StreamingEmailParser, SuggestionParser, parser_for
+
+ANALYSIS = "Purpose: complaint\nTone: apologetic\nUrgency: critical\nRelationship: client"
+EXPECTED = {"purpose": "complaint", "tone": "apologetic", "urgency": "critical", "relationship": "client"}
+LETTER = (
+    "Subject: Q4 Budget Review\n\nDear Sarah,\n\nCould we meet on Friday to review the budget?\n\n"
+    "Best regards,\nAlex"
+)
+
+
+def feed_all(parser, text: str, size: int = 3) -> bool:
+    """Feed text in small chunks, as a stream arrives; True once the parser asks to stop"""
+    for start in range(0, len(text), size):
+        if parser.feed(text[start:start + size]):
+            return True
+    return False
+
+
+def test_field_parser_stops_at_text_past_the_last_field():
+    parser = FieldParser()
+    assert feed_all(parser, ANALYSIS + "\n\nThis email is about a refund")
+    assert parser.complete
+    assert parser.values == EXPECTED
+    assert parser.overflow > 0
+
+
+def test_field_parser_lets_trailing_whitespace_finish_naturally():
+    parser = FieldParser()
+    assert not feed_all(parser, ANALYSIS + "\n\n  \n")
+    assert parser.values == EXPECTED
+
+
+def test_field_parser_reads_past_a_preamble_and_blank_lines():
+    parser = FieldParser()
+    completion = "Here is the analysis:\n\n" + ANALYSIS.replace("\n", "\n\n")
+    assert not feed_all(parser, completion)
+    parser.finish()
+    assert {field: parser.values[field] for field in EXPECTED} == EXPECTED
+
+
+def test_field_parser_waits_for_every_field():
+    parser = FieldParser()
+    assert not feed_all(parser, "Purpose: complaint\nTone: apologetic\nMore text\n")
+    assert not parser.complete
+
+
+def test_field_parser_takes_the_last_unterminated_line_on_finish():
+    parser = FieldParser().parse(ANALYSIS)
+    assert parser.values == EXPECTED
+
+
+def test_email_parser_stops_after_the_name_under_the_sign_off():
+    parser = EmailParser()
+    assert feed_all(parser, LETTER + "\n\nP.S. let me know if anything else is needed")
+    assert parser.email() == (
+        "Q4 Budget Review", "Dear Sarah,\n\nCould we meet on Friday to review the budget?\n\nBest regards,\nAlex"
+    )
+
+
+def test_email_parser_does_not_take_a_thanks_opener_for_the_sign_off():
+    parser = EmailParser()
+    assert not feed_all(parser, "Subject: Hi\n\nThanks,\nfor the notes yesterday.\n")
+    assert not parser.complete
+
+
+def test_email_parser_drops_preamble_before_the_subject():
+    subject, body = EmailParser().parse("Sure! Here is your email:\n" + LETTER).email()
+    assert subject == "Q4 Budget Review"
+    assert body.startswith("Dear Sarah,")
+
+
+def test_email_parser_falls_back_to_the_default_subject():
+    subject, _ = EmailParser("Professional Email").parse("Dear Sarah,\nHello").email()
+    assert subject == "Professional Email"
+
+
+def test_suggestion_parser_stops_at_its_limit():
+    parser = SuggestionParser(limit=2)
+    assert feed_all(parser, "1. Lead with the ask\n- Name the deadline\n3. Attach the report\n")
+    assert parser.suggestions == ["Lead with the ask", "Name the deadline"]
+
+
+@pytest.mark.parametrize("task, parser_class", [
+    ("analysis", FieldParser), ("simple_analysis", FieldParser), ("email", EmailParser),
+    ("variation", EmailParser), ("suggestions", SuggestionParser), ("strategy", type(None)),
+])
+def test_parser_for_task(task, parser_class):
+    assert isinstance(parser_for(task), parser_class)
+
+
+def test_streaming_email_parser_events():
+    parser = StreamingEmailParser("Professional Email")
+    events = []
+    for start in range(0, len(LETTER), 4):
+        events += parser.feed(LETTER[start:start + 4])
+    events += parser.finish()
+
+    assert events[0] == {"type": "subject", "text": "Q4 Budget Review"}
+    assert "".join(event["text"] for event in events[1:]) == LETTER.split("\n\n", 1)[1]
+
+
+def test_streaming_email_parser_gives_up_on_a_missing_subject():
+    parser = StreamingEmailParser("Professional Email")
+    events = parser.feed("Dear Sarah,\nLine one\nLine two\n")
+    assert events[0] == {"type": "subject", "text": "Professional Email"}
+    assert events[1]["text"].startswith("Dear Sarah,")
+
+
+def analyze_against(completion: str):
+    """Analysis of the agent against a fake Ollama answering `completion`; returns (result, metrics row, server calls)"""
+    async def run(host: str):
+        agent = AsyncAgenticEmailAgent(host=host, use_cache=False, reuse_analysis=False, fast_classify=False)
+        await agent.setup()
+        result = await agent.analyze_context_agentically("refund for the broken order\nclient is upset")
+        row = next(row for row in agent.metrics.summary() if row["series"] == "analysis")
+        return result, row
+
+    with FakeOllamaServer(responses=[("analyze", completion)] + CANNED_RESPONSES) as server:
+        result, row = asyncio.run(run(server.host))
+        return result, row, server.generate_calls()
+
+
+def test_agent_hangs_up_once_the_analysis_fields_are_in():
+    result, row, calls = analyze_against(ANALYSIS + "\n\nExplanation: " + "the client wants a refund. " * 40)
+    assert {field: result[field] for field in EXPECTED} == EXPECTED
+    assert row["stopped_early"] == 1
+    assert len(calls) == 1
+
+
+def test_agent_keeps_the_model_fields_after_a_preamble():
+    # A blank-line stop sequence would end this before any field and leave the defaults
+    result, row, _ = analyze_against("Here is the analysis:\n\n" + ANALYSIS.replace("\n", "\n\n"))
+    assert {field: result[field] for field in EXPECTED} == EXPECTED
+    assert row["stopped_early"] == 0
@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+
+import scheduler
+from scheduler import FairScheduler, SchedulerBusy
+
+
+async def settle():
+    """Let every task that is ready run until it blocks"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def hold(sched: FairScheduler, session, order, name, background=False, ticket=None):
+    async with sched.slot(session, background, ticket):
+        order.append(name)
+        await asyncio.sleep(0)
+
+
+def test_free_slot_is_granted_at_once():
+    async def run():
+        sched = FairScheduler(max_concurrency=2)
+        assert await sched.acquire("a") is False
+        assert sched.status("a")["running"] == 1
+        sched.release("a")
+        assert sched.running == 0
+
+    asyncio.run(run())
+
+
+def test_freed_slots_go_round_robin_across_sessions():
+    async def run():
+        sched = FairScheduler(max_concurrency=1)
+        await sched.acquire("holder")
+        order = []
+        tasks = [
+            asyncio.create_task(hold(sched, session, order, name))
+            for session, name in [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1")]
+        ]
+        await settle()
+        assert sched.status("a")["queued"] == 3
+        assert sched.status("b")["position"] == 1
+
+        sched.release("holder")
+        await asyncio.gather(*tasks)
+        return order
+
+    # Session a's burst does not keep b waiting until it is done
+    assert asyncio.run(run()) == ["a1", "b1", "a2", "a3"]
+
+
+def test_full_queue_raises_scheduler_busy():
+    async def run():
+        sched = FairScheduler(max_concurrency=1, max_queue=2)
+        await sched.acquire("holder")
+        waiting = [asyncio.create_task(sched.acquire(session)) for session in ("a", "b")]
+        await settle()
+
+        with pytest.raises(SchedulerBusy) as busy:
+            await sched.acquire("c")
+        assert busy.value.queued == 2
+        assert sched.rejected == 1
+        assert sched.queued == 2
+
+        for task in waiting:
+            task.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        sched = FairScheduler(max_concurrency=1)
+        await sched.acquire("holder")
+        waiter = asyncio.create_task(sched.acquire("a"))
+        await settle()
+        assert sched.queued == 1
+
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert sched.queued == 0
+        sched.release("holder")
+        assert sched.running == 0
+
+    asyncio.run(run())
+
+
+def test_background_call_waits_for_interactive_work_and_quiet_time(monkeypatch):
+    monkeypatch.setattr(scheduler, "BACKGROUND_IDLE_SECONDS", 0.05)
+
+    async def run():
+        sched = FairScheduler(max_concurrency=4)
+        await sched.acquire("user")
+        background = asyncio.create_task(sched.acquire("speculative", background=True))
+        await settle()
+        # Three slots are free, but a user's call is running
+        assert not background.done()
+
+        sched.release("user")
+        await settle()
+        assert not background.done()
+
+        assert await asyncio.wait_for(background, 1) is True
+        assert sched.background_running == 1
+        sched.release("speculative", background=True)
+
+    asyncio.run(run())
+
+
+def test_background_calls_run_one_at_a_time(monkeypatch):
+    monkeypatch.setattr(scheduler, "BACKGROUND_IDLE_SECONDS", 0)
+
+    async def run():
+        sched = FairScheduler(max_concurrency=4)
+        assert await sched.acquire("speculative", background=True) is True
+        second = asyncio.create_task(sched.acquire("speculative", background=True))
+        await settle()
+        assert not second.done()
+
+        sched.release("speculative", background=True)
+        assert await asyncio.wait_for(second, 1) is True
+        sched.release("speculative", background=True)
+
+    asyncio.run(run())
+
+
+def test_interactive_call_waits_ahead_of_background_ones(monkeypatch):
+    monkeypatch.setattr(scheduler, "BACKGROUND_IDLE_SECONDS", 0)
+
+    async def run():
+        sched = FairScheduler(max_concurrency=1)
+        await sched.acquire("holder")
+        order = []
+        background = asyncio.create_task(hold(sched, "speculative", order, "background", background=True))
+        await settle()
+        interactive = asyncio.create_task(hold(sched, "user", order, "interactive"))
+        await settle()
+
+        sched.release("holder")
+        await asyncio.gather(background, interactive)
+        return order
+
+    assert asyncio.run(run()) == ["interactive", "background"]
+
+
+def test_promote_lifts_a_waiting_background_call_to_interactive_priority():
+    async def run():
+        sched = FairScheduler(max_concurrency=1)
+        await sched.acquire("holder")
+        waiter = asyncio.create_task(sched.acquire("speculative", background=True, ticket="flight"))
+        await settle()
+        assert sched.status()["background_queued"] == 1
+
+        assert sched.promote("flight") is True
+        assert sched.status()["background_queued"] == 0
+        sched.release("holder")
+        # Granted as an interactive slot, without waiting out the quiet time
+        assert await asyncio.wait_for(waiter, 1) is False
+        assert sched.promote("flight") is False
+
+    asyncio.run(run())
+
+
+def test_spare_capacity_is_lent_only_when_idle_enough():
+    async def run():
+        sched = FairScheduler(max_concurrency=2)
+        assert sched.try_acquire_spare("hedge") is True
+        # The last slot stays free for interactive calls
+        assert sched.try_acquire_spare("hedge") is False
+        sched.release("hedge", background=True)
+        assert sched.running == 0
+
+    asyncio.run(run())
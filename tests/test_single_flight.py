@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+async def settle():
+    """Let every task that is ready run until it blocks"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class Work:
+    """A call that counts its starts and finishes when released"""
+
+    def __init__(self, result="done", error: Exception = None):
+        self.result = result
+        self.error = error
+        self.started = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.started += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def test_concurrent_identical_calls_run_once():
+    async def run():
+        flights, work = SingleFlight(), Work()
+        callers = [asyncio.create_task(flights.do("key", work)) for _ in range(3)]
+        await settle()
+        assert "key" in flights
+
+        work.release.set()
+        assert await asyncio.gather(*callers) == ["done"] * 3
+        assert work.started == 1
+        assert len(flights) == 0
+
+    asyncio.run(run())
+
+
+def test_different_keys_do_not_coalesce():
+    async def run():
+        flights, first, second = SingleFlight(), Work("first"), Work("second")
+        callers = [asyncio.create_task(flights.do("a", first)), asyncio.create_task(flights.do("b", second))]
+        await settle()
+        first.release.set()
+        second.release.set()
+        assert await asyncio.gather(*callers) == ["first", "second"]
+
+    asyncio.run(run())
+
+
+def test_error_reaches_every_follower_and_the_next_call_starts_afresh():
+    async def run():
+        flights, failing = SingleFlight(), Work(error=ValueError("model down"))
+        callers = [asyncio.create_task(flights.do("key", failing)) for _ in range(3)]
+        await settle()
+
+        failing.release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        assert all(isinstance(result, ValueError) and str(result) == "model down" for result in results)
+        assert failing.started == 1
+
+        retry = Work("recovered")
+        retry.release.set()
+        assert await flights.do("key", retry) == "recovered"
+
+    asyncio.run(run())
+
+
+def test_one_caller_leaving_does_not_cancel_the_others():
+    async def run():
+        flights, work = SingleFlight(), Work()
+        leaving = asyncio.create_task(flights.do("key", work))
+        staying = asyncio.create_task(flights.do("key", work))
+        await settle()
+
+        leaving.cancel()
+        await settle()
+        assert work.cancelled == 0
+
+        work.release.set()
+        assert await staying == "done"
+        assert leaving.cancelled()
+
+    asyncio.run(run())
+
+
+def test_work_is_cancelled_once_every_caller_has_left():
+    async def run():
+        flights, work = SingleFlight(), Work()
+        callers = [asyncio.create_task(flights.do("key", work)) for _ in range(2)]
+        await settle()
+
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await settle()
+        assert work.cancelled == 1
+        assert "key" not in flights
+
+    asyncio.run(run())
+
+
+def test_late_stream_joiner_replays_earlier_chunks():
+    async def run():
+        flights = SingleFlight()
+        more = asyncio.Event()
+
+        async def produce(final):
+            yield "Subject: "
+            await more.wait()
+            yield "Hello"
+            final["done"] = True
+
+        async def read(final=None):
+            return [chunk async for chunk in flights.stream("key", produce, final)]
+
+        first = asyncio.create_task(read())
+        await settle()
+        final = {}
+        late = asyncio.create_task(read(final))
+        await settle()
+
+        more.set()
+        assert await first == ["Subject: ", "Hello"]
+        assert await late == ["Subject: ", "Hello"]
+        assert final == {"done": True}
+
+    asyncio.run(run())
+
+
+def test_stream_error_reaches_every_follower():
+    async def run():
+        flights = SingleFlight()
+        fail = asyncio.Event()
+
+        async def produce(final):
+            yield "partial"
+            await fail.wait()
+            raise ConnectionError("stream dropped")
+
+        async def read():
+            chunks = []
+            with pytest.raises(ConnectionError):
+                async for chunk in flights.stream("key", produce):
+                    chunks.append(chunk)
+            return chunks
+
+        readers = [asyncio.create_task(read()) for _ in range(2)]
+        await settle()
+        fail.set()
+        assert await asyncio.gather(*readers) == [["partial"], ["partial"]]
+
+    asyncio.run(run())
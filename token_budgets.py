@@ -0,0 +1,75 @@
+from typing import Dict, List
+
+# The sidebar defaults; budgets are expressed relative to them so defaults reproduce the tuned values
+DEFAULT_CREATIVITY = 0.4
+DEFAULT_MAX_LENGTH = 400
+
+
+class TaskBudget:
+    """Decode limits for one kind of model call.
+
+    `num_predict` is the token budget at the default response length;
+    `scales_with_length` tasks grow or shrink with the UI length slider.
+    `temperature` is the value at the default creativity and scales with
+    the creativity slider; None leaves Ollama's own default in place.
+    """
+
+    def __init__(
+        self,
+        num_predict: int,
+        stop: List[str] = None,
+        temperature: float = None,
+        scales_with_length: bool = False
+    ):
+        self.num_predict = num_predict
+        self.stop = list(stop or [])
+        self.temperature = temperature
+        self.scales_with_length = scales_with_length
+
+
+TASK_BUDGETS = {
+    # Four short "Key: value" lines. No blank-line stop: a preamble or blank lines between fields
+    # would end it before the fields, and the field parser already ends it once all four are in
+    "analysis": TaskBudget(80, temperature=0.2),
+    "simple_analysis": TaskBudget(80),
+    # A subject is a single line
+    "subject": TaskBudget(24, stop=["\n"]),
+    "email": TaskBudget(300, temperature=0.3, scales_with_length=True),
+    "variation": TaskBudget(200, temperature=0.4, scales_with_length=True),
+    "suggestions": TaskBudget(200),
+    "strategy": TaskBudget(400, scales_with_length=True),
+    "structured": TaskBudget(500, temperature=0.3, scales_with_length=True),
+}
+
+
+class TokenBudgets:
+    """Per-task Ollama options derived from the UI's creativity and length sliders"""
+
+    def __init__(
+        self,
+        creativity: float = DEFAULT_CREATIVITY,
+        max_length: int = DEFAULT_MAX_LENGTH,
+        budgets: Dict[str, TaskBudget] = None
+    ):
+        self.creativity = creativity
+        self.max_length = max_length
+        self.budgets = budgets or TASK_BUDGETS
+
+    def options_for(self, task: str) -> Dict:
+        """Ollama `options` for a task: num_predict, stop sequences and temperature"""
+        budget = self.budgets[task]
+        num_predict = budget.num_predict
+        if budget.scales_with_length:
+            num_predict = max(1, round(num_predict * self.max_length / DEFAULT_MAX_LENGTH))
+
+        options = {"num_predict": num_predict}
+        if budget.temperature is not None:
+            options["temperature"] = round(min(1.0, budget.temperature * self.creativity / DEFAULT_CREATIVITY), 2)
+        if budget.stop:
+            options["stop"] = budget.stop
+        return options
+
+
+def hit_budget(response) -> bool:
+    """True when Ollama stopped because the token budget ran out rather than naturally"""
+    return bool(response) and response.get('done_reason') == 'length'